@@ -0,0 +1,127 @@
+"""Dict-loop analysis vs the columnar HomesFrame engine at 10k/100k/1M rows.
+
+Run from the repo root:  python benchmarks/bench_analysis.py [--sizes 10000 100000]
+"""
+import argparse
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from synthetic import generate_items
+from utils.homes_frame import HomesFrame
+from utils.data_analysis import (
+    normalize_items, compute_kpis, summarize_by_city, bed_bath_distribution, rank_best_value
+)
+
+
+#-------------- Reference (per-item loops the engine replaced) ----------------#
+def loop_buckets(prices, num_buckets=5):
+    if not prices:
+        return {}
+    mn, mx = min(prices), max(prices)
+    step = (mx - mn) / num_buckets
+    edges = [mn + i * step for i in range(num_buckets + 1)]
+    buckets = {f"${int(edges[i]):,} - ${int(edges[i + 1]):,}": 0 for i in range(num_buckets)}
+    for p in prices:
+        idx = min(int((p - mn) / step), num_buckets - 1)
+        buckets[f"${int(edges[idx]):,} - ${int(edges[idx + 1]):,}"] += 1
+    return buckets
+
+def loop_kpis(data):
+    prices = [i["price"] for i in data if i["price"]]
+    sqfts = [i["sqft"] for i in data if i["sqft"]]
+    beds = [i["beds"] for i in data if i["beds"]]
+    price_per_bed = defaultdict(list)
+    for item in data:
+        if item["price"] and item["beds"]:
+            price_per_bed[item["beds"]].append(item["price"])
+    return {
+        "count": len(data),
+        "avg_price": round(sum(prices) / len(prices)) if prices else 0,
+        "median_price": int(np.median(prices)) if prices else 0,
+        "min_price": round(min(prices, default=0)),
+        "max_price": round(max(prices, default=0)),
+        "avg_sqft": round(sum(sqfts) / len(sqfts)) if sqfts else 0,
+        "price_buckets": loop_buckets(prices),
+        "most_common_beds": Counter(beds).most_common(1)[0][0] if beds else 0,
+        "avg_price_per_bedroom": {b: round(sum(v) / len(v)) for b, v in price_per_bed.items()},
+        "percent_in_budget": None,
+    }
+
+def loop_city(data):
+    stats = defaultdict(lambda: {"count": 0, "prices": []})
+    for i in data:
+        city = i["city"] or "Unknown"
+        stats[city]["count"] += 1
+        if i["price"]:
+            stats[city]["prices"].append(i["price"])
+    summary = [{
+        "city": city,
+        "count": s["count"],
+        "avg_price": round(sum(s["prices"]) / len(s["prices"])) if s["prices"] else None,
+        "median_price": float(np.median(s["prices"])) if s["prices"] else None,
+    } for city, s in stats.items()]
+    return sorted(summary, key=lambda x: x["count"], reverse=True)
+
+def loop_bed_bath(data):
+    beds, baths = defaultdict(int), defaultdict(int)
+    for i in data:
+        if i.get("beds"):
+            beds[i["beds"]] += 1
+        if i.get("baths"):
+            baths[i["baths"]] += 1
+    return dict(beds), dict(baths)
+
+def loop_best_value(data, min_sqft=200):
+    """Top 5 by $/sqft, as the dashboard shows them."""
+    deals = []
+    for i in data:
+        if not i["price"] or not i["sqft"] or i["sqft"] < min_sqft:
+            continue
+        deals.append({**i, "price_per_sqft": round(i["price"] / i["sqft"], 2)})
+    return sorted(deals, key=lambda x: x["price_per_sqft"])[:5]
+
+
+#-------------- Benchmark ----------------#
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def run(size: int):
+    normalized = normalize_items(generate_items(size, seed=size))
+
+    loops = {}
+    loop_results = {}
+    for name, fn in [("kpis", loop_kpis), ("city", loop_city), ("bed_bath", loop_bed_bath), ("best_value", loop_best_value)]:
+        loop_results[name], loops[name] = timed(fn, normalized)
+
+    frame, build = timed(HomesFrame.from_records, normalized)
+    vector = {}
+    vector_results = {}
+    for name, fn in [("kpis", compute_kpis), ("city", summarize_by_city), ("bed_bath", bed_bath_distribution), ("best_value", lambda f: rank_best_value(f, limit=5))]:
+        vector_results[name], vector[name] = timed(fn, frame)
+
+    # same outputs, not just same speed
+    for name in loop_results:
+        if name == "best_value":
+            same = [h["zpid"] for h in loop_results[name]] == [h["zpid"] for h in vector_results[name]]
+        else:
+            same = loop_results[name] == vector_results[name]
+        assert same, f"{name} differs at {size:,} rows"
+
+    loop_total = sum(loops.values())
+    vector_total = build + sum(vector.values())
+    print(f"\n## {size:,} rows   (frame build {build * 1000:,.1f} ms)")
+    print(f"{'stage':<12}{'loops ms':>12}{'frame ms':>12}{'speedup':>10}")
+    for name in loops:
+        print(f"{name:<12}{loops[name] * 1000:>12,.1f}{vector[name] * 1000:>12,.1f}{loops[name] / vector[name]:>9.1f}x")
+    print(f"{'total':<12}{loop_total * 1000:>12,.1f}{vector_total * 1000:>12,.1f}{loop_total / vector_total:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000, 1_000_000])
+    for size in parser.parse_args().sizes:
+        run(size)
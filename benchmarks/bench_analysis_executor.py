@@ -0,0 +1,79 @@
+"""Analysis off the script thread: how long a script run blocks, when each section lands, queueing under load.
+
+For one dataset: `analyze_frame` inline (what a script run used to wait
+for) vs submitting `analyze_sections` to an `AnalysisExecutor`, with the
+time each section becomes available. Then `--sessions` sessions submit
+an analysis each at once, and the executor's queue wait & run time
+percentiles are reported, plus how many were turned away by the bound.
+
+Run from the repo root:  python benchmarks/bench_analysis_executor.py [--size 100000] [--sessions 12] [--workers 2]
+"""
+import argparse
+import time
+
+from synthetic import generate_items
+from utils.analysis_executor import AnalysisExecutor, QueueFull
+from utils.data_analysis import analyze_frame, analyze_sections
+from utils.homes_frame import HomesFrame
+from utils.normalize import normalize_batch
+
+
+def sections_timeline(frame: HomesFrame, workers: int):
+    executor = AnalysisExecutor(workers=workers)
+    start = time.perf_counter()
+    task = executor.submit("timeline", "session", lambda: analyze_sections(frame))
+    submitted = time.perf_counter() - start
+
+    landed = {}
+    while not task.done.is_set():
+        for name in task.sections:
+            landed.setdefault(name, time.perf_counter() - start)
+        time.sleep(0.001)
+    for name in task.sections:
+        landed.setdefault(name, time.perf_counter() - start)
+    executor.close()
+    return submitted, landed
+
+def under_load(frames: list[HomesFrame], workers: int, queue_depth: int) -> dict:
+    executor = AnalysisExecutor(workers=workers, queue_depth=queue_depth)
+    tasks = []
+    for i, frame in enumerate(frames):
+        try:
+            tasks.append(executor.submit(f"dataset-{i}", f"session-{i}", lambda frame=frame: analyze_sections(frame)))
+        except QueueFull:
+            pass
+    for task in tasks:
+        task.done.wait()
+    metrics = executor.metrics()
+    executor.close()
+    return metrics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--sessions", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--queue-depth", type=int, default=8)
+    args = parser.parse_args()
+
+    frame = HomesFrame.from_records(normalize_batch(generate_items(args.size, seed=args.size))[0])
+    start = time.perf_counter()
+    analyze_frame(frame)
+    inline = time.perf_counter() - start
+    submitted, landed = sections_timeline(frame, args.workers)
+
+    print(f"\n## {args.size:,} homes")
+    print(f"{'script run blocked, inline analyze_frame':<44}{inline * 1000:>10.1f} ms")
+    print(f"{'script run blocked, submit to executor':<44}{submitted * 1000:>10.1f} ms")
+    for name, seconds in landed.items():
+        print(f"{'  section ' + repr(name) + ' available after':<44}{seconds * 1000:>10.1f} ms")
+
+    size = max(args.size // 10, 1000)
+    frames = [
+        HomesFrame.from_records(normalize_batch(generate_items(size, seed=i))[0]) for i in range(args.sessions)
+    ]
+    metrics = under_load(frames, args.workers, args.queue_depth)
+    print(f"\n## {args.sessions} sessions x {size:,} homes at once, {args.workers} workers, queue depth {args.queue_depth}")
+    for key in ("submitted", "done", "rejected", "wait_p50_ms", "wait_p95_ms", "run_p50_ms", "run_p95_ms"):
+        print(f"{key:<44}{metrics[key]:>10}")
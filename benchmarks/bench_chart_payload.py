@@ -0,0 +1,58 @@
+"""Chart payload (Vega-Lite JSON sent to the browser) vs row count: raw points vs server-side aggregation.
+
+Run from the repo root:  python benchmarks/bench_chart_payload.py [--sizes 1000 10000 100000 1000000]
+"""
+import argparse
+import time
+
+import altair as alt
+import pandas as pd
+
+from synthetic import generate_items
+from utils.homes_frame import HomesFrame
+from utils.normalize import normalize_batch
+from utils.data_analysis import price_sqft_chart, days_listed_chart, _priced
+
+
+# Altair refuses more than 5,000 rows by default; lift that to measure what raw charts would ship
+alt.data_transformers.disable_max_rows()
+
+def raw_scatter(frame: HomesFrame):
+    """What a naive price vs sqft chart would ship: one mark per home."""
+    sqft, price = _priced(frame, "sqft")
+    return alt.Chart(pd.DataFrame({"x": sqft, "y": price})).mark_circle().encode(x="x:Q", y="y:Q")
+
+def raw_days_line(frame: HomesFrame):
+    days, price = _priced(frame, "days_listed")
+    return alt.Chart(pd.DataFrame({"x": days, "y": price})).mark_line().encode(x="x:Q", y="y:Q")
+
+def payload(build) -> tuple[int, float]:
+    """Bytes of the chart's JSON spec, and seconds to build + serialize it."""
+    start = time.perf_counter()
+    spec = build().to_json()
+    return len(spec), time.perf_counter() - start
+
+def run(size: int, raw_max: int):
+    frame = HomesFrame.from_records(normalize_batch(generate_items(size, seed=size))[0])
+    print(f"\n## {size:,} rows")
+    print(f"{'chart':<22}{'KB':>12}{'ms':>12}")
+    for name, build in [
+        ("price_sqft (raw)", lambda: raw_scatter(frame)),
+        ("price_sqft", lambda: price_sqft_chart(frame)),
+        ("days_listed (raw)", lambda: raw_days_line(frame)),
+        ("days_listed", lambda: days_listed_chart(frame)),
+    ]:
+        if "raw" in name and size > raw_max:
+            print(f"{name:<22}{'skipped':>12}")
+            continue
+        size_bytes, seconds = payload(build)
+        print(f"{name:<22}{size_bytes / 1024:>12,.1f}{seconds * 1000:>12,.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--raw-max", type=int, default=100_000, help="skip raw charts above this many rows")
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.raw_max)
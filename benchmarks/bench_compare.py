@@ -0,0 +1,63 @@
+"""Comparing stored runs: `compare_runs` vs loading & aggregating each run in turn.
+
+Saves N synthetic runs to a temporary RunStore, then times `compare_runs`
+(pooled loads, one grouped pass over the stacked rows) against the obvious
+loop: load a run, `to_records`, `compute_kpis` + `summarize_by_city` +
+`compute_dynamic_buckets` on it, next run. Both must agree on the KPIs.
+
+Run from the repo root:  python benchmarks/bench_compare.py [--runs 2 5 10] [--size 20000]
+"""
+import argparse
+import tempfile
+import time
+
+from synthetic import generate_items
+from utils.compare import compare_runs
+from utils.data_analysis import compute_dynamic_buckets, compute_kpis, summarize_by_city
+from utils.homes_frame import HomesFrame
+from utils.normalize import normalize_batch
+from utils.run_store import RunStore
+
+
+def per_run(store: RunStore, run_ids: list[str]) -> list[dict]:
+    results = []
+    for run_id in run_ids:
+        records = store.load(run_id).to_records()
+        results.append({
+            "kpis": compute_kpis(records),
+            "cities": summarize_by_city(records),
+            "buckets": compute_dynamic_buckets([r["price"] for r in records if r.get("price") is not None]),
+        })
+    return results
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def run(store: RunStore, n_runs: int, size: int):
+    run_ids = [f"run-{i}" for i in range(n_runs)]
+    t_compare, compared = timed(compare_runs, store, run_ids)
+    t_loop, looped = timed(per_run, store, run_ids)
+    for row, result in zip(compared["runs"], looped):
+        kpis = result["kpis"]
+        assert (row["count"], row["avg_price"], row["median_price"]) == (
+            kpis["count"], kpis["avg_price"], kpis["median_price"]
+        ), f"{row['run_id']}: compare_runs differs from compute_kpis"
+    print(f"{n_runs:>6}{n_runs * size:>12,}{t_compare:>14.3f}{t_loop:>14.3f}{t_loop / t_compare:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", nargs="+", type=int, default=[2, 5, 10])
+    parser.add_argument("--size", type=int, default=20_000, help="homes per run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        store = RunStore(root)
+        for i in range(max(args.runs)):
+            store.save(f"run-{i}", HomesFrame.from_records(normalize_batch(generate_items(args.size, seed=i))[0]))
+        print(f"{'runs':>6}{'rows':>12}{'compare s':>14}{'per-run s':>14}{'speedup':>10}")
+        for n_runs in args.runs:
+            run(store, n_runs, args.size)
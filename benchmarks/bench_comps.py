@@ -0,0 +1,78 @@
+"""Comparables for every home: blocked & batched vs scoring each home against all others.
+
+The brute-force side applies the same rules (band, 1 mile, size ratio,
+similarity score) to every other home, one home at a time, and is only run
+up to `--brute-max` rows; both sides must pick the same comps.
+
+Run from the repo root:  python benchmarks/bench_comps.py [--sizes 10000 100000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from synthetic import generate_items
+from utils import comps
+from utils.homes_frame import HomesFrame
+from utils.normalize import normalize_batch
+from utils.spatial import MILES_PER_DEGREE
+
+
+def brute_force(frame: HomesFrame, k: int = comps.COMP_K) -> np.ndarray:
+    sqft = frame["sqft"].astype(np.float64)
+    lat, lng = frame["lat"], frame["lng"]
+    with np.errstate(invalid="ignore"):
+        usable = frame.present("price") & (sqft > 0) & np.isfinite(frame["beds"]) & np.isfinite(frame["baths"])
+        usable &= np.isfinite(lat) & np.isfinite(lng)
+    band = np.clip(frame["beds"], 0, comps.MAX_BEDS_BAND) * comps.MAX_BATHS_BAND + np.clip(np.floor(frame["baths"]), 1, comps.MAX_BATHS_BAND)
+    log_sqft = np.log(sqft)
+
+    neighbors = np.full((len(frame), k), -1)
+    for i in np.flatnonzero(usable):
+        with np.errstate(invalid="ignore"):
+            miles = np.hypot((lat - lat[i]) * MILES_PER_DEGREE, (lng - lng[i]) * MILES_PER_DEGREE * np.cos(np.radians(lat[i])))
+            size_gap = np.abs(log_sqft - log_sqft[i])
+            ok = usable & (band == band[i]) & (miles <= comps.COMP_MAX_MILES) & (size_gap <= np.log(comps.COMP_MAX_SQFT_RATIO))
+        ok[i] = False
+        idx = np.flatnonzero(ok)
+        score = miles[idx] / comps.COMP_MILE_SCALE + size_gap[idx] / comps.COMP_SQFT_SCALE
+        best = idx[np.argsort(score, kind="stable")[:k]]
+        neighbors[i, :best.size] = best
+    return neighbors
+
+
+def run(size: int, brute_max: int):
+    frame = HomesFrame.from_records(normalize_batch(generate_items(size, seed=size))[0])
+    # the engine's cells can't reach this far, so keep the zip fallback out of the comparison
+    frame = frame.take(np.isfinite(frame["lat"]))
+
+    start = time.perf_counter()
+    result = comps.comparables(frame)
+    blocked = time.perf_counter() - start
+    priced = np.isfinite(result.estimate)
+    off_comps = np.median(np.abs(result.discount[priced])) if priced.any() else np.nan
+
+    line = f"{size:>9,}{blocked:>12.3f}"
+    if size <= brute_max:
+        start = time.perf_counter()
+        expected = brute_force(frame)
+        brute = time.perf_counter() - start
+        same = (np.sort(result.neighbors, axis=1) == np.sort(expected, axis=1)).all(axis=1).mean()
+        line += f"{brute:>12.3f}{brute / blocked:>9.0f}x{same:>9.1%}"
+    else:
+        line += f"{'-':>12}{'-':>10}{'-':>9}"
+    print(
+        f"{line}{priced.mean():>10.1%}"
+        f"{off_comps:>12.1%}{np.nanmedian(np.abs(result.zestimate_discount)):>12.1%}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000])
+    parser.add_argument("--brute-max", type=int, default=10_000, help="largest size also run brute force")
+    args = parser.parse_args()
+
+    print(f"{'rows':>9}{'blocked s':>12}{'brute s':>12}{'speedup':>10}{'same':>9}{'priced':>10}{'|vs comps|':>12}{'|vs zest|':>12}")
+    for size in args.sizes:
+        run(size, args.brute_max)
@@ -0,0 +1,133 @@
+"""Pooled client vs bare `requests` against a mock n8n that injects latency, errors and hangs.
+
+Scenarios (the mock's behaviour is picked by the request path):
+  healthy  every call answers after `--latency-ms`
+  flaky    `--failure-rate` of calls answer 503; polls are retried by the client
+  hung     calls never answer; the bare call waits out its timeout every
+           time, the client's breaker opens and the rest fail fast
+
+Run from the repo root:  python benchmarks/bench_http_client.py [--calls 200]
+"""
+import argparse
+import multiprocessing
+import random
+import statistics
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+import synthetic  # noqa: F401 - puts src/ on sys.path
+from utils import http_client
+from utils.http_client import CircuitOpenError, Endpoint, HttpClient
+
+
+class MockN8n(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # as n8n (Node) does; otherwise small keep-alive replies wait on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def respond(self):
+        # read any body, or it would be parsed as the next request on the kept-alive connection
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        query = parse_qs(urlparse(self.path).query)
+        latency = float(query.get("latency", ["0"])[0]) / 1000
+        if self.path.startswith("/hung"):
+            time.sleep(3600)
+        time.sleep(latency * random.uniform(0.5, 1.5))
+        if self.path.startswith("/flaky") and random.random() < float(query["rate"][0]):
+            status, body = 503, b'{"message": "Service Unavailable"}'
+        else:
+            status, body = 200, b'[{"homes": []}]'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        self.respond()
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockN8n)
+    server.daemon_threads = True
+    port.value = server.server_address[1]
+    server.serve_forever()
+
+
+def bare_call(method: str, url: str, timeout: float) -> bool:
+    # what the app did before: a new connection per call, no retries
+    try:
+        requests.request(method, url, json={"q": "homes"}, timeout=timeout).raise_for_status()
+        return True
+    except requests.RequestException:
+        return False
+
+def client_call(client: HttpClient, endpoint: str, method: str, url: str) -> bool:
+    try:
+        client.request(endpoint, method, url, json={"q": "homes"})
+        return True
+    except (requests.RequestException, CircuitOpenError):
+        return False
+
+def measure(label: str, calls: int, fn):
+    latencies, ok = [], 0
+    start = time.perf_counter()
+    for _ in range(calls):
+        t = time.perf_counter()
+        ok += fn()
+        latencies.append(time.perf_counter() - t)
+    wall = time.perf_counter() - start
+    latencies.sort()
+    print(
+        f"{label:<26}{statistics.median(latencies) * 1000:>9.1f}{latencies[int(len(latencies) * 0.95)] * 1000:>9.1f}"
+        f"{ok / calls:>9.0%}{wall:>9.1f}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--failure-rate", type=float, default=0.2)
+    parser.add_argument("--hung-timeout", type=float, default=1.0, help="read timeout for the hung scenario")
+    args = parser.parse_args()
+
+    port = multiprocessing.Value("i", 0)
+    server = multiprocessing.Process(target=serve, args=(port,), daemon=True)
+    server.start()
+    while not port.value:
+        time.sleep(0.05)
+    base = f"http://127.0.0.1:{port.value}"
+    client = HttpClient()
+    # the same timeouts for both sides, and a short read timeout so "hung" finishes
+    http_client.ENDPOINTS["bench_chat"] = Endpoint(5, 60)
+    http_client.ENDPOINTS["bench_poll"] = Endpoint(5, 60, retries=3)
+    http_client.ENDPOINTS["bench_hung"] = Endpoint(5, args.hung_timeout)
+
+    print(f"{'scenario':<26}{'p50 ms':>9}{'p95 ms':>9}{'ok':>9}{'wall s':>9}")
+    healthy = f"{base}/ok?latency={args.latency_ms}"
+    measure("healthy, bare", args.calls, lambda: bare_call("POST", healthy, 60))
+    measure("healthy, pooled", args.calls, lambda: client_call(client, "bench_chat", "POST", healthy))
+
+    flaky = f"{base}/flaky?rate={args.failure_rate}&latency={args.latency_ms}"
+    measure("flaky poll, bare", args.calls, lambda: bare_call("GET", flaky, 60))
+    measure("flaky poll, retried", args.calls, lambda: client_call(client, "bench_poll", "GET", flaky))
+
+    hung_calls = min(args.calls, 20)
+    hung = f"{base}/hung"
+    measure("hung, bare", hung_calls, lambda: bare_call("POST", hung, args.hung_timeout))
+    measure("hung, circuit breaker", hung_calls, lambda: client_call(client, "bench_hung", "POST", hung))
+
+    print()
+    for name, m in http_client.endpoint_metrics().items():
+        print(f"{name}: {m}")
+    server.terminate()
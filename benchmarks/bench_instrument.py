@@ -0,0 +1,55 @@
+"""Cost of the stage instrumentation: disabled, timing only, and timing + tracemalloc.
+
+Run from the repo root:  python benchmarks/bench_instrument.py [--rows 100000]
+"""
+import argparse
+import time
+
+from synthetic import generate_items
+from utils import instrument
+from utils.homes_frame import HomesFrame
+from utils.data_analysis import normalize_items, analyze_frame
+from utils.instrument import stage, timed
+
+
+@timed("noop")
+def noop(x):
+    return x
+
+def per_call_ns(fn, n: int = 1_000_000) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e9
+
+def pipeline_ms(items: list[dict]) -> float:
+    start = time.perf_counter()
+    frame = HomesFrame.from_records(normalize_items(items))
+    analyze_frame(frame)
+    return (time.perf_counter() - start) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+    items = generate_items(args.rows)
+    items_arg = [1]
+
+    print(f"{'mode':<18}{'@timed ns':>11}{'stage() ns':>12}{'pipeline ms':>13}")
+    for mode in ("off", "timing", "timing+memory"):
+        instrument.disable()
+        if mode != "off":
+            instrument.enable(memory=mode == "timing+memory")
+
+        def with_stage():
+            with stage("noop"):
+                pass
+
+        decorated = per_call_ns(lambda: noop(items_arg), 200_000) - per_call_ns(lambda: items_arg, 200_000)
+        block = per_call_ns(with_stage, 200_000)
+        pipeline = min(pipeline_ms(items) for _ in range(3))
+        print(f"{mode:<18}{decorated:>11,.0f}{block:>12,.0f}{pipeline:>13,.1f}")
+
+    print()
+    print(instrument.prometheus_text())
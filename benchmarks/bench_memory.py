@@ -0,0 +1,42 @@
+"""Memory held by normalized homes: list of dicts vs the columnar HomesFrame.
+
+Run from the repo root:  python benchmarks/bench_memory.py [--sizes 10000 50000]
+"""
+import argparse
+import gc
+import tracemalloc
+
+from synthetic import generate_items
+from utils.homes_frame import HomesFrame
+from utils.normalize import normalize_batch
+
+
+def traced(build):
+    """Bytes still allocated after `build()` returns, and the object it built."""
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return held, obj
+
+def run(size: int):
+    items = generate_items(size, seed=size)
+
+    dict_bytes, normalized = traced(lambda: normalize_batch(items)[0])
+    frame_bytes, frame = traced(lambda: HomesFrame.from_records(normalize_batch(items)[0]))
+    assert len(frame) == len(normalized)
+
+    print(f"\n## {size:,} homes")
+    print(f"{'layout':<16}{'MB':>10}{'bytes/home':>12}")
+    for name, held in [("list of dicts", dict_bytes), ("HomesFrame", frame_bytes)]:
+        print(f"{name:<16}{held / 1e6:>10.1f}{held / size:>12,.0f}")
+    print(f"{'saving':<16}{dict_bytes / frame_bytes:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 50_000])
+    for size in parser.parse_args().sizes:
+        run(size)
@@ -0,0 +1,83 @@
+"""Re-running a region: full normalize + frame build vs an incremental ListingStore merge.
+
+Each rerun also carries `--bad` malformed items (skipped by normalization)
+and `--no-zpid` listings without a zpid, which must not pile up in the
+store from one merge to the next; a tenth of those have a list for a
+price, so they can't be fingerprinted and are returned but not stored.
+The first line is the region's first run, a search the store hasn't seen
+(so it isn't stored until the untimed second run).
+
+Run from the repo root:  python benchmarks/bench_merge.py [--sizes 100000] [--changed 0.01 0.05 0.25] [--bad 10] [--no-zpid 100]
+"""
+import argparse
+import copy
+import time
+
+import numpy as np
+
+from synthetic import generate_items
+from utils.listing_store import ListingStore
+from utils.normalize import normalize_frame
+
+
+def strays(items: list[dict], bad: int, no_zpid: int) -> list[dict]:
+    """`no_zpid` copies of listings with their zpid removed, then `bad` unreadable items."""
+    copies = [{k: v for k, v in h.items() if k != "zpid"} for h in items[:no_zpid]]
+    for h in copies[::10]:
+        h["price"] = [h.get("price")]
+    return copies + [{"hdpData": "not a dict"}] * bad
+
+def timed_pair(store: ListingStore, batch: list[dict]):
+    """(normalize_frame seconds, merge seconds, merge result)."""
+    start = time.perf_counter()
+    full = normalize_frame(batch)[0]
+    full_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    merged = store.merge(batch)
+    merge_s = time.perf_counter() - start
+    assert merged.frame.to_records() == full.to_records()
+    return full_s, merge_s, merged
+
+def rerun(items: list[dict], changed: float, seed: int = 1) -> list[dict]:
+    """The same region days later: every listing 3 days older, a share of them repriced."""
+    rng = np.random.default_rng(seed)
+    items = copy.deepcopy(items)
+    for i in np.flatnonzero(rng.random(len(items)) < changed):
+        items[i]["unformattedPrice"] = int(items[i].get("unformattedPrice") or 0) + 5_000
+    for h in items:
+        h["hdpData"]["homeInfo"]["daysOnZillow"] += 3
+    return items
+
+def run(size: int, shares: list[float], bad: int, no_zpid: int):
+    items = generate_items(size, seed=size)
+    extra = strays(items, bad, no_zpid)
+    stored = size + no_zpid - len(extra[:no_zpid:10])
+    store = ListingStore()
+    normalize_frame(items[:1000])  # warm up
+
+    print(f"\n## {size:,} listings")
+    print(f"{'repriced':>9}{'full ms':>10}{'merge ms':>10}{'speedup':>9}{'normalized':>12}")
+    for share in ["new", *shares]:
+        again = items if share == "new" else rerun(items, share)
+        full_s, merge_s, merged = timed_pair(store, again + extra)
+        if share == "new":
+            # a new search isn't stored; its second run is, and the reruns below compare against that
+            assert len(store) == 0
+            store.merge(again + extra)
+        assert merged.skipped == bad and len(store) == stored
+        label = share if share == "new" else f"{share:.0%}"
+        print(f"{label:>9}{full_s * 1000:>10,.0f}{merge_s * 1000:>10,.0f}{full_s / merge_s:>8.1f}x"
+              f"{merged.new + merged.changed:>12,}")
+        items = again
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[100_000])
+    parser.add_argument("--changed", nargs="+", type=float, default=[0.01, 0.05, 0.25])
+    parser.add_argument("--bad", type=int, default=10)
+    parser.add_argument("--no-zpid", type=int, default=100)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.changed, args.bad, args.no_zpid)
@@ -0,0 +1,89 @@
+"""Normalization throughput (items/sec): original loop vs the dict and columnar paths, serial vs threads.
+
+Every mode ends in a `HomesFrame`, as every caller does. Each is timed
+best of `--repeat` after a warm-up run (price memo & pandas warm).
+
+Run from the repo root:  python benchmarks/bench_normalize.py [--sizes 20000 200000] [--workers 4] [--repeat 3]
+"""
+import argparse
+import re
+import time
+
+import numpy as np
+
+from synthetic import generate_items
+from utils.homes_frame import HomesFrame, COLUMNS, TEXT_COLUMNS
+from utils.normalize import normalize_batch, normalize_frame, normalize_parallel
+
+
+def original_normalize(items):
+    """The per-item version before the fast path (re.sub + nested .get chains)."""
+    def safe_price(h, hd):
+        if h.get("unformattedPrice") is not None:
+            return int(h["unformattedPrice"])
+        raw = h.get("price") or hd.get("price")
+        if raw:
+            cleaned = re.sub(r"[^\d]", "", raw)
+            if cleaned.isdigit():
+                return int(cleaned)
+        return 0
+
+    normalized, skipped = [], 0
+    for h in items:
+        try:
+            hd = h.get("hdpData", {}).get("homeInfo", {})
+            normalized.append({
+                "zpid": h.get("zpid"), "url": h.get("detailUrl"), "address": h.get("address"),
+                "city": h.get("addressCity"), "state": h.get("addressState"), "zip": h.get("addressZipcode"),
+                "price": safe_price(h, hd),
+                "beds": h.get("beds") or hd.get("bedrooms"),
+                "baths": h.get("baths") or hd.get("bathrooms"),
+                "sqft": h.get("area") or hd.get("livingArea"),
+                "lat": h.get("latLong", {}).get("latitude"), "lng": h.get("latLong", {}).get("longitude"),
+                "img": h.get("imgSrc"),
+                "zestimate": h.get("zestimate") or hd.get("zestimate"),
+                "broker": h.get("brokerName") or hd.get("listing_sub_type"),
+                "days_listed": hd.get("daysOnZillow"),
+            })
+        except Exception:
+            skipped += 1
+    return normalized, skipped
+
+
+def same(a: HomesFrame, b: HomesFrame) -> bool:
+    return all(
+        a[key].tolist() == b[key].tolist() if key in TEXT_COLUMNS else np.array_equal(a[key], b[key], equal_nan=True)
+        for key in COLUMNS
+    )
+
+def run(size: int, workers: int | None, repeat: int):
+    items = generate_items(size, seed=size)
+    expected = HomesFrame.from_records(original_normalize(items)[0])
+
+    modes = {
+        "original": lambda: HomesFrame.from_records(original_normalize(items)[0]),
+        "dicts": lambda: HomesFrame.from_records(normalize_batch(items)[0]),
+        "columns": lambda: normalize_frame(items)[0],
+        "threads": lambda: normalize_parallel(items, mode="thread", workers=workers, min_items=0)[0],
+    }
+
+    print(f"\n## {size:,} items")
+    print(f"{'mode':<14}{'seconds':>10}{'items/sec':>14}")
+    for name, fn in modes.items():
+        assert same(fn(), expected), f"{name} output differs"
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:<14}{best:>10.3f}{size / best:>14,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[20_000, 200_000])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.workers, args.repeat)
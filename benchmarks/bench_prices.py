@@ -0,0 +1,83 @@
+"""Formatted price parsing: `parse_prices` over a column vs the per-item regex it replaces.
+
+Prices are Zillow-style strings: mostly "$450,000", plus "$1.2M", "$385K",
+"From $300K", "$2,500/mo" and "Contact agent". The per-item version is
+`re.sub(r"[^\\d]", "", raw)` on each one, as `safe_price` did. It is also
+wrong on every K/M string ("$1.2M" -> 12), which is counted too.
+`parse_prices` is timed with a cold memo (memo=None) and warm (a second
+page of the same search: its strings were parsed on the first).
+
+Run from the repo root:  python benchmarks/bench_prices.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import re
+import time
+
+import numpy as np
+
+import synthetic  # noqa: F401 - puts src/ on sys.path
+from utils.prices import PriceMemo, parse_prices
+
+
+NON_DIGITS = re.compile(r"[^\d]")
+
+
+def formatted_prices(n: int, seed: int = 0) -> list[str]:
+    rng = np.random.default_rng(seed)
+    dollars = rng.lognormal(12.7, 0.5, n).round(-3).astype(int)
+    kind = rng.choice(6, size=n, p=[.70, .08, .08, .06, .05, .03])
+    prices = []
+    for value, k in zip(dollars.tolist(), kind.tolist()):
+        if k == 0:
+            prices.append(f"${value:,}")
+        elif k == 1:
+            prices.append(f"${value / 1e6:.2f}M" if value >= 1_000_000 else f"${value // 1000}K")
+        elif k == 2:
+            prices.append(f"${value // 1000}K")
+        elif k == 3:
+            prices.append(f"From ${value // 1000}K")
+        elif k == 4:
+            prices.append(f"${value // 200:,}/mo")
+        else:
+            prices.append("Contact agent")
+    return prices
+
+def per_item(prices: list[str]) -> list[int]:
+    parsed = []
+    for raw in prices:
+        cleaned = NON_DIGITS.sub("", raw)
+        parsed.append(int(cleaned) if cleaned.isdigit() else 0)
+    return parsed
+
+def timed(fn, *args, repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(size: int):
+    prices = formatted_prices(size, seed=size)
+    t_item, old = timed(per_item, prices)
+    t_cold, (new, reasons) = timed(lambda: parse_prices(prices, memo=None))
+    memo = PriceMemo()
+    parse_prices(formatted_prices(size, seed=size + 1), memo=memo)
+    t_warm, (warm, _) = timed(lambda: parse_prices(prices, memo=memo))
+    assert np.array_equal(new, warm)
+
+    wrong = int(np.count_nonzero(np.array(old) != new))
+    failed = int(np.count_nonzero(reasons != None))  # noqa: E711 - elementwise on an object array
+    print(f"\n## {size:,} prices   ({len(set(prices)):,} distinct, {failed:,} unparseable, "
+          f"{wrong:,} the per-item regex gets wrong)")
+    print(f"{'':<26}{'seconds':>10}{'M prices/s':>12}")
+    for label, seconds in [("per-item regex", t_item), ("parse_prices, cold memo", t_cold), ("parse_prices, warm memo", t_warm)]:
+        print(f"{label:<26}{seconds:>10.3f}{size / seconds / 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000, 1_000_000])
+    for size in parser.parse_args().sizes:
+        run(size)
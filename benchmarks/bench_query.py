@@ -0,0 +1,121 @@
+"""Dashboard filters: index selection & subset refresh vs masking the columns & re-analyzing.
+
+Random filter combinations (price / sqft / $/sqft / days ranges, min beds &
+baths, a few cities or zips), like slider moves. Zips are redrawn from
+`--zips` distinct codes, as in a state-wide search. For each: `QueryIndex.select` vs a
+boolean mask over the columns (both must keep the same rows), then
+`analyze_subset` vs running `analyze_frame` again on the kept homes.
+
+Run from the repo root:  python benchmarks/bench_query.py [--sizes 10000 100000] [--zips 2000]
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from synthetic import CITIES, generate_items
+from utils.data_analysis import analyze_frame, analyze_subset
+from utils.homes_frame import HomesFrame
+from utils.normalize import normalize_batch
+
+
+QUERIES = 50
+
+
+def random_filters(rng: np.random.Generator, zips: list[str]) -> dict:
+    filters = {}
+    if rng.random() < 0.8:
+        lo = int(rng.integers(50, 400)) * 1000
+        filters["price"] = (lo, lo + int(rng.integers(100, 600)) * 1000)
+    if rng.random() < 0.4:
+        filters["sqft"] = (int(rng.integers(500, 1500)), None)
+    if rng.random() < 0.3:
+        filters["price_per_sqft"] = (None, int(rng.integers(150, 300)))
+    if rng.random() < 0.4:
+        filters["days_listed"] = (None, int(rng.integers(7, 60)))
+    if rng.random() < 0.6:
+        filters["beds"] = (int(rng.integers(1, 5)), None)
+    if rng.random() < 0.3:
+        filters["baths"] = (int(rng.integers(1, 4)), None)
+    if rng.random() < 0.5:
+        filters["city"] = [c[0] for c in rng.choice(np.array(CITIES, dtype=object), size=int(rng.integers(1, 4)), replace=False)]
+    if rng.random() < 0.3:
+        filters["zip"] = [str(z) for z in rng.choice(zips, size=int(rng.integers(1, 20)))]
+    return filters
+
+def scan(frame: HomesFrame, filters: dict) -> np.ndarray:
+    """The same filters as a boolean mask over the columns."""
+    mask = np.ones(len(frame), dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = {
+            "price": np.where(frame.present("price"), frame["price"], np.nan),
+            "sqft": np.where(frame.present("sqft"), frame["sqft"], np.nan),
+            "price_per_sqft": np.where(frame.present("price") & frame.present("sqft"), frame["price"] / frame["sqft"], np.nan),
+            "days_listed": frame["days_listed"],
+            "beds": np.where(frame.present("beds"), frame["beds"], np.nan),
+            "baths": np.where(frame.present("baths"), frame["baths"], np.nan),
+        }
+        for key, wanted in filters.items():
+            if key in ("city", "zip"):
+                mask &= np.isin(frame[key], wanted)
+                continue
+            lo, hi = wanted
+            col = values[key]
+            mask &= ~np.isnan(col)
+            if lo is not None:
+                mask &= col >= lo
+            if hi is not None:
+                mask &= col <= hi
+    return np.flatnonzero(mask)
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def run(size: int, zip_count: int):
+    frame = HomesFrame.from_records(normalize_batch(generate_items(size, seed=size))[0])
+    rng = np.random.default_rng(7)
+    zips = [str(27000 + z) for z in range(zip_count)]
+    frame.columns["zip"] = np.array(zips, dtype=object)[rng.integers(0, zip_count, size)]
+    build, analysis = timed(analyze_frame, frame)
+    query = analysis["query"]
+
+    select_ms, scan_ms, subset_ms, full_ms, kept = [], [], [], [], []
+    for i in range(QUERIES):
+        filters = random_filters(rng, zips)
+        t_select, rows = timed(lambda: query.select(**filters))
+        t_scan, expected = timed(scan, frame, filters)
+        assert np.array_equal(rows, expected), f"select differs from the scan for {filters}"
+        t_subset, _ = timed(analyze_subset, analysis, rows)
+        select_ms.append(t_select * 1000)
+        scan_ms.append(t_scan * 1000)
+        subset_ms.append(t_subset * 1000)
+        kept.append(rows.size)
+        # re-analyzing from scratch is slow; a few samples are enough
+        if i < 5:
+            full_ms.append(timed(analyze_frame, frame.take(rows))[0] * 1000)
+
+    print(f"\n## {size:,} rows   (analyze_frame {build:.2f} s, query index {query.nbytes() / 1e6:.1f} MB, "
+          f"median {statistics.median(kept):,.0f} homes kept)")
+    print(f"{'':<28}{'p50 ms':>10}{'max ms':>10}")
+    for label, samples in [
+        ("select (indexes)", select_ms), ("mask scan", scan_ms),
+        ("analyze_subset", subset_ms), ("analyze_frame on subset", full_ms),
+    ]:
+        print(f"{label:<28}{statistics.median(samples):>10.1f}{max(samples):>10.1f}")
+    print("value indexes: " + ", ".join(
+        f"{key} {type(index).__name__} {len(index.values):,} values {index.nbytes() / 1e6:.1f} MB"
+        for key, index in query.by_value.items()
+    ))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000])
+    parser.add_argument("--zips", type=int, default=2000, help="distinct zip codes")
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.zips)
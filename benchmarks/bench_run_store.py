@@ -0,0 +1,65 @@
+"""Reopening a stored run: memory-mapped Arrow (RunStore) vs zlib JSON (ResultCache).
+
+Run from the repo root:  python benchmarks/bench_run_store.py [--sizes 100000 1000000]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from synthetic import generate_items
+from utils.homes_frame import HomesFrame
+from utils.normalize import normalize_batch
+from utils.result_cache import ResultCache
+from utils.run_store import RunStore
+from utils.data_analysis import compute_kpis, rank_homes
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def held(fn) -> int:
+    """Python/NumPy heap bytes still allocated by what `fn` returns (mapped pages aren't)."""
+    tracemalloc.start()
+    result = fn()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+def run(size: int, root: str):
+    normalized = normalize_batch(generate_items(size, seed=size))[0]
+    frame = HomesFrame.from_records(normalized)
+    store = RunStore(os.path.join(root, "runs"))
+    cache = ResultCache(os.path.join(root, "cache.sqlite"), max_bytes=10 ** 10)
+
+    _, store_save = timed(lambda: store.save(f"run{size}", frame))
+    _, cache_save = timed(lambda: cache.put(f"run{size}", normalized))
+
+    mapped, store_open = timed(lambda: store.load(f"run{size}"))
+    _, store_use = timed(lambda: (compute_kpis(mapped), rank_homes(mapped)))
+    decoded, cache_open = timed(lambda: HomesFrame.from_records(cache.get(f"run{size}")))
+    _, cache_use = timed(lambda: (compute_kpis(decoded), rank_homes(decoded)))
+    assert compute_kpis(mapped) == compute_kpis(decoded) and rank_homes(mapped) == rank_homes(decoded)
+
+    store_heap = held(lambda: store.load(f"run{size}"))
+    cache_heap = held(lambda: HomesFrame.from_records(cache.get(f"run{size}")))
+
+    print(f"\n## {size:,} homes")
+    print(f"{'format':<22}{'save ms':>10}{'open ms':>10}{'kpis+rank ms':>14}{'heap MB':>10}{'disk MB':>10}")
+    print(f"{'Arrow, mapped':<22}{store_save * 1000:>10,.0f}{store_open * 1000:>10,.1f}{store_use * 1000:>14,.1f}"
+          f"{store_heap / 1e6:>10,.1f}{os.path.getsize(store._path(f'run{size}')) / 1e6:>10,.1f}")
+    print(f"{'zlib JSON -> frame':<22}{cache_save * 1000:>10,.0f}{cache_open * 1000:>10,.1f}{cache_use * 1000:>14,.1f}"
+          f"{cache_heap / 1e6:>10,.1f}{os.path.getsize(cache.path) / 1e6:>10,.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[100_000, 1_000_000])
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as root:
+        for size in args.sizes:
+            run(size, root)
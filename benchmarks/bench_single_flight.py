@@ -0,0 +1,104 @@
+"""Runs started when many sessions confirm the same search at once, with and without single-flight.
+
+Each session is a thread that "confirms" one of `--searches` searches (the
+same canonical search under differently ordered URLs), then starts a run
+that takes `--start-ms` (the n8n chat call) unless it could join one.
+`--processes` > 1 splits the sessions over worker processes sharing the
+SQLite flights table, as several Streamlit workers on one host would.
+
+Run from the repo root:  python benchmarks/bench_single_flight.py [--sessions 200 --searches 5]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+import synthetic  # noqa: F401 - puts src/ on sys.path
+from utils.single_flight import SearchFlights
+from utils.zillow_converter import search_key
+
+
+def search_url(search: int, variant: int) -> str:
+    # the same filters with keys in a different order: one canonical search, many URLs
+    state = {"mapBounds": {"north": 40.9, "south": 40.5, "east": -73.7, "west": -74.2}, "pagination": {}, "search": search}
+    items = list(state.items())
+    random.Random(variant).shuffle(items)
+    return f"https://www.zillow.com/homes/?searchQueryState={quote(json.dumps(dict(items)))}"
+
+
+def sessions(count: int, searches: int, start_seconds: float, flights: SearchFlights | None, seed: int):
+    """Run `count` concurrent sessions; (runs started, seconds until each session had a run)."""
+    rng = random.Random(seed)
+    started, waits = [], []
+    lock = threading.Lock()
+    gate = threading.Barrier(count)
+
+    def session(i: int):
+        key = search_key(search_url(rng.randrange(searches), i))
+        gate.wait()
+        begin = time.perf_counter()
+        run = flights.join(key) if flights else None
+        if run is None:
+            time.sleep(start_seconds)
+            run = {"run_id": f"run-{key[:8]}-{i}"}
+            with lock:
+                started.append(run)
+            if flights:
+                flights.started(key, run)
+        with lock:
+            waits.append(time.perf_counter() - begin)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return len(started), waits
+
+
+def worker(count, searches, start_seconds, path, seed, out):
+    out.put(sessions(count, searches, start_seconds, SearchFlights(path), seed))
+
+
+def report(label: str, started: int, waits: list[float]):
+    waits.sort()
+    print(f"{label:<32}{started:>8}{waits[len(waits) // 2] * 1000:>10.0f}{waits[int(len(waits) * 0.95)] * 1000:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--searches", type=int, default=5, help="distinct canonical searches among the sessions")
+    parser.add_argument("--start-ms", type=float, default=300, help="time to start a run (the n8n chat call)")
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args()
+    start_seconds = args.start_ms / 1000
+
+    print(f"{'':<32}{'runs':>8}{'p50 ms':>10}{'p95 ms':>10}")
+    report("no coalescing", *sessions(args.sessions, args.searches, start_seconds, None, 0))
+    report("single-flight, 1 process", *sessions(args.sessions, args.searches, start_seconds, SearchFlights(None), 0))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "flights.sqlite")
+        SearchFlights(path)  # create the table before the workers race for it
+        out = multiprocessing.Queue()
+        per_process = args.sessions // args.processes
+        procs = [
+            multiprocessing.Process(target=worker, args=(per_process, args.searches, start_seconds, path, p, out))
+            for p in range(args.processes)
+        ]
+        for p in procs:
+            p.start()
+        results = [out.get() for _ in procs]
+        for p in procs:
+            p.join()
+        report(
+            f"single-flight, {args.processes} processes",
+            sum(r[0] for r in results),
+            [w for r in results for w in r[1]],
+        )
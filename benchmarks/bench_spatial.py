@@ -0,0 +1,83 @@
+"""GridIndex queries vs linear scans over every home, at 10k/100k rows.
+
+Run from the repo root:  python benchmarks/bench_spatial.py [--sizes 10000 100000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from synthetic import CITIES, generate_items
+from utils.homes_frame import HomesFrame
+from utils.normalize import normalize_batch
+from utils.spatial import GridIndex, haversine_miles
+
+
+QUERIES = 200
+
+
+def per_query_us(fn, args_list) -> tuple[float, list]:
+    start = time.perf_counter()
+    results = [fn(*args) for args in args_list]
+    return (time.perf_counter() - start) / len(args_list) * 1e6, results
+
+#-------------- Linear scans ----------------#
+def scan_bbox(lat, lng, south, west, north, east):
+    return np.flatnonzero((lat >= south) & (lat <= north) & (lng >= west) & (lng <= east))
+
+def scan_radius(lat, lng, plat, plng, miles):
+    dist = haversine_miles(plat, plng, lat, lng)
+    return np.flatnonzero(dist <= miles)
+
+def scan_nearest(lat, lng, plat, plng, k):
+    dist = haversine_miles(plat, plng, lat, lng)
+    dist[np.isnan(dist)] = np.inf
+    return np.argsort(dist, kind="stable")[:k]
+
+
+def run(size: int):
+    frame = HomesFrame.from_records(normalize_batch(generate_items(size, seed=size))[0])
+    lat, lng = frame["lat"], frame["lng"]
+
+    start = time.perf_counter()
+    index = GridIndex.from_frame(frame)
+    build = time.perf_counter() - start
+
+    # query points around the (skewed) city centers, so dense cells get hit too
+    rng = np.random.default_rng(1)
+    centers = np.array([c[3:] for c in CITIES])[rng.integers(len(CITIES), size=QUERIES)]
+    points = centers + rng.normal(0, 0.05, centers.shape)
+    boxes = [(p[0] - 0.02, p[1] - 0.02, p[0] + 0.02, p[1] + 0.02) for p in points]
+    circles = [(p[0], p[1], 2.0) for p in points]
+    knn = [(p[0], p[1], 5) for p in points]
+
+    rows = []
+    for name, indexed, scan, args, same in [
+        ("bbox ~2.8mi", index.bbox, lambda *a: scan_bbox(lat, lng, *a), boxes,
+         lambda a, b: np.array_equal(a, b)),
+        ("radius 2mi", lambda *a: index.radius(*a)[0], lambda *a: scan_radius(lat, lng, *a), circles,
+         lambda a, b: np.array_equal(np.sort(a), b)),
+        ("nearest 5", lambda *a: index.nearest(*a)[1], lambda *a: haversine_miles(a[0], a[1], lat[scan_nearest(lat, lng, *a)], lng[scan_nearest(lat, lng, *a)]), knn,
+         lambda a, b: np.allclose(a, b)),
+    ]:
+        fast_us, fast = per_query_us(indexed, args)
+        scan_us, slow = per_query_us(scan, args)
+        assert all(same(a, b) for a, b in zip(fast, slow)), f"{name} differs at {size:,} rows"
+        rows.append((name, fast_us, scan_us, np.mean([len(r) for r in slow])))
+
+    start = time.perf_counter()
+    cells = index.cell_medians(np.where(frame.present("price"), frame["price"], np.nan))
+    heatmap = time.perf_counter() - start
+
+    print(f"\n## {size:,} rows   (index build {build * 1000:,.1f} ms, {index.nbytes() / 1e6:,.1f} MB; "
+          f"median price per cell: {len(cells):,} cells in {heatmap * 1000:,.1f} ms)")
+    print(f"{'query':<14}{'index us':>10}{'scan us':>10}{'speedup':>10}{'hits':>8}")
+    for name, fast_us, scan_us, hits in rows:
+        print(f"{name:<14}{fast_us:>10,.1f}{scan_us:>10,.1f}{scan_us / fast_us:>9.1f}x{hits:>8,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000])
+    for size in parser.parse_args().sizes:
+        run(size)
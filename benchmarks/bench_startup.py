@@ -0,0 +1,68 @@
+"""App startup: import time per module, and time to first render of the chat page.
+
+Every measurement runs in a fresh interpreter, as on a cold container. The
+first render runs `src/streamlit_app.py` through Streamlit's `AppTest` (no
+server or browser), and lists which heavy modules that render loaded.
+
+Run from the repo root:  python benchmarks/bench_startup.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+APP = os.path.join(SRC, "streamlit_app.py")
+MODULES = [
+    "streamlit", "requests", "httpx", "numpy", "pandas", "pyarrow", "altair",
+    "utils.homes_frame", "utils.run_store", "utils.jobs", "utils.data_analysis",
+]
+HEAVY = ["numpy", "pandas", "pyarrow", "altair", "httpx"]
+
+IMPORT_ONE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print(json.dumps(time.perf_counter() - start))
+"""
+
+FIRST_RENDER = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=120).run()
+seconds = time.perf_counter() - start
+print(json.dumps({
+    "seconds": seconds,
+    "error": [str(e.value) for e in at.exception],
+    "loaded": [m for m in json.loads(sys.argv[2]) if m in sys.modules],
+}))
+"""
+
+
+def fresh(code: str, *args: str):
+    env = dict(os.environ, PYTHONPATH=SRC)
+    out = subprocess.run(
+        [sys.executable, "-c", code, *args], capture_output=True, text=True, check=True, cwd=SRC, env=env
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement, median kept")
+    args = parser.parse_args()
+
+    print(f"{'module':<22}{'import ms':>10}")
+    for module in MODULES:
+        ms = statistics.median(fresh(IMPORT_ONE, module) for _ in range(args.runs)) * 1000
+        print(f"{module:<22}{ms:>10,.0f}")
+
+    renders = [fresh(FIRST_RENDER, APP, json.dumps(HEAVY)) for _ in range(args.runs)]
+    if renders[0]["error"]:
+        print(f"\napp raised: {renders[0]['error']}")
+    print(f"\nfirst render of the chat page: {statistics.median(r['seconds'] for r in renders) * 1000:,.0f} ms")
+    print(f"heavy modules loaded by it: {', '.join(renders[0]['loaded']) or 'none'}")
@@ -0,0 +1,163 @@
+"""Tiled search against a fake Apify/Zillow with a known density map: homes recovered and wall time.
+
+A local server stands in for the actor: it holds a fixed set of homes
+(dense clusters around a few cities plus a sparse rural spread over the NC
+search in `zillow_converter.py`), and each run returns at most `--cap` of
+the homes inside its search URL's `mapBounds`, after `--run-seconds`.
+
+Run from the repo root:  python benchmarks/bench_tiles.py [--homes 20000] [--concurrency 1 4 16]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import time
+import uuid
+
+import numpy as np
+
+import synthetic  # noqa: F401 - puts src/ on sys.path
+from utils.jobs import JobManager
+from utils.tiles import property_status
+from utils.zillow_converter import search_str, search_state_from_url
+
+
+# (lat, lng, share of homes, spread in degrees)
+CLUSTERS = [
+    (35.23, -80.84, 0.30, 0.15),  # Charlotte
+    (35.78, -78.64, 0.25, 0.12),  # Raleigh
+    (36.07, -79.79, 0.10, 0.08),  # Greensboro
+    (35.60, -82.55, 0.05, 0.06),  # Asheville
+    (34.23, -77.94, 0.05, 0.05),  # Wilmington
+]
+
+
+def density_map(n: int, bounds: dict, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """`n` home coordinates: the clusters above, the rest spread uniformly over `bounds`."""
+    rng = np.random.default_rng(seed)
+    lat, lng = [], []
+    for c_lat, c_lng, share, spread in CLUSTERS:
+        k = int(n * share)
+        lat.append(rng.normal(c_lat, spread, k))
+        lng.append(rng.normal(c_lng, spread, k))
+    rest = n - sum(a.size for a in lat)
+    lat.append(rng.uniform(bounds["south"], bounds["north"], rest))
+    lng.append(rng.uniform(bounds["west"], bounds["east"], rest))
+    # cluster tails kept inside the area, so every home is findable
+    lat = np.clip(np.concatenate(lat), bounds["south"], np.nextafter(bounds["north"], -np.inf))
+    lng = np.clip(np.concatenate(lng), bounds["west"], np.nextafter(bounds["east"], -np.inf))
+    return lat, lng
+
+
+class FakeActor:
+    """Keep-alive HTTP/1.1 stand-in for the Apify run, status and dataset endpoints."""
+
+    def __init__(self, lat: np.ndarray, lng: np.ndarray, cap: int, run_seconds: float):
+        self.lat, self.lng = lat, lng
+        # the order results come back in; a capped search returns the first `cap` of its area
+        self.relevance = np.random.default_rng(1).permutation(lat.size)
+        self.cap = cap
+        self.run_seconds = run_seconds
+        self.runs = {}  # run id -> (started, home indices)
+
+    def start(self, body: bytes) -> dict:
+        bounds = search_state_from_url(json.loads(body)["search_url"])["mapBounds"]
+        lat, lng = self.lat[self.relevance], self.lng[self.relevance]
+        inside = (lat >= bounds["south"]) & (lat < bounds["north"]) & (lng >= bounds["west"]) & (lng < bounds["east"])
+        run_id = uuid.uuid4().hex
+        self.runs[run_id] = (time.time(), self.relevance[inside][:self.cap])
+        return {"data": {"id": run_id, "defaultDatasetId": run_id, "status": "READY"}}
+
+    def respond(self, method: str, path: str, body: bytes) -> bytes:
+        path = path.split("?")[0]
+        if method == "POST" and path.startswith("/acts/"):
+            return json.dumps(self.start(body)).encode()
+        run_id = path.split("/")[2]
+        started, homes = self.runs[run_id]
+        if path.startswith("/actor-runs/"):
+            status = "SUCCEEDED" if time.time() - started >= self.run_seconds else "RUNNING"
+            return json.dumps({"data": {"status": status}}).encode()
+        return json.dumps([
+            {"zpid": str(i), "latLong": {"latitude": float(self.lat[i]), "longitude": float(self.lng[i])}}
+            for i in homes.tolist()
+        ]).encode()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                method, path = head.split(b" ", 2)[:2]
+                length = 0
+                for line in head.split(b"\r\n")[1:]:
+                    name, _, value = line.partition(b":")
+                    if name.strip().lower() == b"content-length":
+                        length = int(value)
+                body = await reader.readexactly(length) if length else b""
+                reply = self.respond(method.decode(), path.decode(), body)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: %d\r\n\r\n%s" % (len(reply), reply)
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+
+def serve(port, homes: int, cap: int, run_seconds: float):
+    bounds = search_state_from_url(search_str)["mapBounds"]
+    actor = FakeActor(*density_map(homes, bounds), cap=cap, run_seconds=run_seconds)
+
+    async def main():
+        server = await asyncio.start_server(actor.handle, "127.0.0.1", 0, backlog=1024)
+        port.value = server.sockets[0].getsockname()[1]
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+def run(port: int, homes: int, cap: int, concurrency: int, tiled: bool = True):
+    manager = JobManager(
+        token="test", apify_api=f"http://127.0.0.1:{port}", poll_start=0.2, poll_max=0.5,
+        tile_cap=cap, tile_concurrency=concurrency,
+    )
+    run_data = {"search_url": search_str, "tiled": True, "property_status": property_status(search_str)}
+    if not tiled:
+        # one run over the whole area, as n8n starts it today
+        run_data = manager._run(manager._start_run(search_str, run_data["property_status"], cap))
+
+    start = time.perf_counter()
+    job = manager.submit(run_data, session_id="bench")
+    job.done.wait()
+    wall = time.perf_counter() - start
+    manager.close()
+
+    if job.error:
+        raise RuntimeError(job.error)
+    found = len({h["zpid"] for h in job.homes})
+    label = f"{concurrency:>11}" if tiled else f"{'one search':>11}"
+    print(
+        f"{label}{job.run_data.get('tiles', 1):>7}{job.run_data.get('capped_tiles', 0):>8}"
+        f"{found:>10,}{found / homes:>9.1%}{wall:>9.1f}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--homes", type=int, default=20_000, help="homes inside the search area")
+    parser.add_argument("--cap", type=int, default=500, help="results per search")
+    parser.add_argument("--run-seconds", type=float, default=1.0, help="how long each fake run takes")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16])
+    args = parser.parse_args()
+
+    port = multiprocessing.Value("i", 0)
+    server = multiprocessing.Process(target=serve, args=(port, args.homes, args.cap, args.run_seconds), daemon=True)
+    server.start()
+    while not port.value:
+        time.sleep(0.05)
+
+    print(f"## {args.homes:,} homes, {args.cap} results per search, {args.run_seconds}s per run")
+    print(f"{'concurrency':>11}{'tiles':>7}{'capped':>8}{'homes':>10}{'recall':>9}{'wall s':>9}")
+    run(port.value, args.homes, args.cap, 1, tiled=False)
+    for c in args.concurrency:
+        run(port.value, args.homes, args.cap, c)
+    server.terminate()
@@ -0,0 +1,113 @@
+"""Load test: how many concurrent scrape sessions one JobManager (one loop, one pool) handles.
+
+Starts a local stand-in for the Apify API in its own process, where every run
+finishes `--run-seconds` after its first poll, submits N jobs at once and
+reports how long after their run finished each session had its data.
+
+Run from the repo root:  python benchmarks/load_jobs.py [--sessions 100 1000 5000]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import threading
+import time
+
+from synthetic import generate_items
+from utils.jobs import JobManager
+
+
+class FakeApify:
+    """Minimal keep-alive HTTP/1.1 server on asyncio.
+
+    A thread-per-connection `http.server` tops out at a few dozen requests a
+    second on a small box, which would measure the stand-in instead of the
+    manager.
+    """
+
+    def __init__(self, run_seconds: float, items: bytes):
+        self.run_seconds = run_seconds
+        self.items = items
+        self.started = {}
+
+    def respond(self, path: str) -> bytes:
+        if path.startswith("/actor-runs/"):
+            run_id = path.split("/")[2].split("?")[0]
+            first_poll = self.started.setdefault(run_id, time.time())
+            status = "SUCCEEDED" if time.time() - first_poll >= self.run_seconds else "RUNNING"
+            return json.dumps({"data": {"status": status}}).encode()
+        return self.items
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                path = head.split(b" ", 2)[1].decode()
+                body = self.respond(path)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: %d\r\n\r\n%s" % (len(body), body)
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+
+def serve(port, run_seconds: float, items_per_run: int):
+    """Server process: its own GIL, so it doesn't slow the loop being measured."""
+    app = FakeApify(run_seconds, json.dumps(generate_items(items_per_run)).encode())
+
+    async def main():
+        server = await asyncio.start_server(app.handle, "127.0.0.1", 0, backlog=1024)
+        port.value = server.sockets[0].getsockname()[1]
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+def run(sessions: int, run_seconds: float, items_per_run: int, connections: int):
+    port = multiprocessing.Value("i", 0)
+    server = multiprocessing.Process(target=serve, args=(port, run_seconds, items_per_run), daemon=True)
+    server.start()
+    while not port.value:
+        time.sleep(0.05)
+
+    manager = JobManager(
+        token="test", apify_api=f"http://127.0.0.1:{port.value}", poll_start=0.5, poll_max=2,
+        max_connections=connections,
+    )
+    threads_before = threading.active_count()
+
+    start = time.perf_counter()
+    jobs = [
+        manager.submit({"run_id": f"run{i}", "dataset_id": f"ds{i}"}, session_id=f"session{i}")
+        for i in range(sessions)
+    ]
+    for job in jobs:
+        job.done.wait()
+    wall = time.perf_counter() - start
+
+    errors = sum(job.error is not None for job in jobs)
+    requests = sum(job.polls + 1 for job in jobs)
+    # first poll goes out on submit, so this is how long after its run finished each session had the data
+    lag = sorted(job.finished - job.submitted - run_seconds for job in jobs)
+    print(
+        f"{sessions:>9,}{wall:>9.1f}{lag[len(lag) // 2]:>10.2f}{lag[int(len(lag) * 0.95)]:>10.2f}"
+        f"{requests:>10,}{errors:>8}{threading.active_count() - threads_before:>9}"
+    )
+
+    manager.close()
+    server.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", nargs="+", type=int, default=[100, 1000, 5000])
+    parser.add_argument("--run-seconds", type=float, default=5.0)
+    parser.add_argument("--items", type=int, default=50, help="dataset items returned per run")
+    parser.add_argument("--connections", type=int, default=100, help="JobManager max_connections")
+    args = parser.parse_args()
+
+    print(f"{'sessions':>9}{'wall s':>9}{'p50 lag':>10}{'p95 lag':>10}{'requests':>10}{'errors':>8}{'threads':>9}")
+    for n in args.sessions:
+        run(n, args.run_seconds, args.items, args.connections)
@@ -0,0 +1,152 @@
+"""Time and memory of every analysis stage at 1k/10k/100k/1M rows, saved as JSON per commit.
+
+Run from the repo root:
+    python benchmarks/suite.py [--sizes 1000 10000] [--out results.json] [--compare old.json]
+
+Each stage is timed (best of `--repeat`) and, separately, run once under
+tracemalloc for its peak allocation. `--compare` prints the change against
+an earlier results file and exits with 1 if any stage got slower than
+`--threshold`.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from synthetic import generate_items
+from utils.homes_frame import HomesFrame
+from utils.comps import comparables
+from utils.data_analysis import (
+    normalize_items, compute_kpis, compute_dynamic_buckets, rank_best_value, summarize_by_city,
+    bed_bath_distribution, price_buckets_chart, bed_bath_charts, price_sqft_chart, days_listed_chart,
+    analyze_frame,
+)
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def stages(items: list[dict]):
+    """(name, fn) per stage; each stage's input is built from the previous stages' output."""
+    normalized = normalize_items(items)
+    frame = HomesFrame.from_records(normalized)
+    prices = frame["price"][frame.present("price")]
+    kpis = compute_kpis(frame)
+    beds, baths = bed_bath_distribution(frame)
+
+    return [
+        ("normalize_items", lambda: normalize_items(items)),
+        ("frame_from_records", lambda: HomesFrame.from_records(normalized)),
+        ("compute_kpis", lambda: compute_kpis(frame)),
+        ("compute_dynamic_buckets", lambda: compute_dynamic_buckets(prices)),
+        ("rank_best_value", lambda: rank_best_value(frame, limit=5)),
+        ("summarize_by_city", lambda: summarize_by_city(frame)),
+        ("bed_bath_distribution", lambda: bed_bath_distribution(frame)),
+        ("comparables", lambda: comparables(frame)),
+        # to_dict() is what Streamlit serializes, so it is part of the chart's cost
+        ("price_buckets_chart", lambda: price_buckets_chart(kpis["price_buckets"]).to_dict()),
+        ("bed_bath_charts", lambda: [c.to_dict() for c in bed_bath_charts(beds, baths)]),
+        ("price_sqft_chart", lambda: price_sqft_chart(frame).to_dict()),
+        ("days_listed_chart", lambda: days_listed_chart(frame).to_dict()),
+        ("analyze_frame", lambda: analyze_frame(frame)),
+    ]
+
+def best_time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def peak_memory(fn) -> int:
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+def run(size: int, repeat: int, memory: bool) -> dict:
+    items = generate_items(size, seed=size)
+    # a single run of the slow stages is enough at 1M rows
+    if size >= 1_000_000:
+        repeat = 1
+
+    results = {}
+    print(f"\n## {size:,} rows")
+    print(f"{'stage':<26}{'ms':>12}{'peak MB':>10}")
+    for name, fn in stages(items):
+        seconds = best_time(fn, repeat)
+        peak = peak_memory(fn) if memory else None
+        results[name] = {"ms": round(seconds * 1000, 3), "peak_mb": round(peak / 1e6, 3) if memory else None}
+        print(f"{name:<26}{seconds * 1000:>12,.1f}" + (f"{peak / 1e6:>10,.1f}" if memory else f"{'-':>10}"))
+    return results
+
+def compare(current: dict, baseline: dict, threshold: float) -> bool:
+    """Print the per-stage change against `baseline`; True if any stage slowed past `threshold`."""
+    regressed = False
+    print(f"\n# vs {baseline['env'].get('commit')} ({baseline['env'].get('date')})")
+    print(f"{'rows':>10}  {'stage':<26}{'before ms':>12}{'after ms':>12}{'change':>9}")
+    for size, stats in current["results"].items():
+        for name, now in stats.items():
+            before = baseline["results"].get(size, {}).get(name)
+            if not before or not before["ms"]:
+                continue
+            change = now["ms"] / before["ms"] - 1
+            flag = ""
+            if change > threshold:
+                regressed = True
+                flag = "  <- slower"
+            print(f"{int(size):>10,}  {name:<26}{before['ms']:>12,.1f}{now['ms']:>12,.1f}{change:>+9.0%}{flag}")
+    return regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage, best one kept")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs")
+    parser.add_argument("--out", help="results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    report = {"env": environment(), "results": {}}
+    for size in args.sizes:
+        report["results"][str(size)] = run(size, args.repeat, memory=not args.no_memory)
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{report['env']['commit'] or 'latest'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        sys.exit(1 if compare(report, baseline, args.threshold) else 0)
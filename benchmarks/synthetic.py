@@ -0,0 +1,94 @@
+"""Seeded generator of raw Zillow scraper items, shaped like what `normalize_items` consumes."""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+
+CITIES = [
+    ("Charlotte", "NC", 28202, 35.227, -80.843),
+    ("Raleigh", "NC", 27601, 35.779, -78.638),
+    ("Greensboro", "NC", 27401, 36.072, -79.792),
+    ("Durham", "NC", 27701, 35.994, -78.898),
+    ("Winston-Salem", "NC", 27101, 36.099, -80.244),
+    ("Fayetteville", "NC", 28301, 35.052, -78.878),
+    ("Cary", "NC", 27511, 35.791, -78.781),
+    ("Wilmington", "NC", 28401, 34.225, -77.944),
+    ("High Point", "NC", 27260, 35.955, -80.005),
+    ("Asheville", "NC", 28801, 35.595, -82.551),
+    ("Concord", "NC", 28025, 35.408, -80.579),
+    ("Gastonia", "NC", 28052, 35.262, -81.187),
+    ("Chapel Hill", "NC", 27514, 35.913, -79.055),
+    ("Boone", "NC", 28607, 36.216, -81.674),
+    ("Outer Banks", "NC", 27954, 35.908, -75.676),
+]
+BROKERS = ["Keller Williams", "RE/MAX", "Coldwell Banker", "Century 21", "eXp Realty", "Berkshire Hathaway"]
+
+
+def generate_items(n: int, seed: int = 0) -> list[dict]:
+    """Return `n` raw items with city skew, missing fields and formatted-only prices."""
+    rng = np.random.default_rng(seed)
+
+    # zipf-like skew: a few big metros hold most of the listings
+    weights = 1 / np.arange(1, len(CITIES) + 1) ** 1.1
+    city_idx = rng.choice(len(CITIES), size=n, p=weights / weights.sum())
+    beds = rng.choice([1, 2, 3, 4, 5, 6], size=n, p=[.08, .22, .35, .22, .09, .04])
+    baths = np.clip(beds - rng.choice([0, 0.5, 1, 1.5], size=n), 1, None)
+    sqft = (beds * rng.normal(550, 120, n) + 300).round().astype(int)
+    price = (sqft * rng.lognormal(5.2, 0.35, n)).round(-3).astype(int)
+    lat_jitter = rng.normal(0, 0.08, n)
+    lng_jitter = rng.normal(0, 0.08, n)
+    days = rng.exponential(25, n).astype(int)
+    zestimate = (price * rng.normal(1.0, 0.07, n)).round(-2).astype(int)
+    broker_idx = rng.integers(0, len(BROKERS), n)
+    # how each item is (in)complete
+    has_unformatted = rng.random(n) > 0.15
+    in_home_info = rng.random(n) > 0.5
+    missing_sqft = rng.random(n) < 0.05
+    missing_beds = rng.random(n) < 0.02
+    missing_geo = rng.random(n) < 0.01
+
+    items = []
+    for i in range(n):
+        city, state, zipcode, lat, lng = CITIES[city_idx[i]]
+        zpid = str(10_000_000 + i)
+        p = int(price[i])
+        home_info = {"daysOnZillow": int(days[i]), "price": p, "zestimate": int(zestimate[i])}
+        item = {
+            "zpid": zpid,
+            "detailUrl": f"https://www.zillow.com/homedetails/{zpid}_zpid/",
+            "address": f"{100 + i % 9000} Main St, {city}, {state} {zipcode}",
+            "addressCity": city,
+            "addressState": state,
+            "addressZipcode": str(zipcode + int(city_idx[i] * 7 + i) % 5),
+            "price": f"${p:,}",
+            "imgSrc": f"https://photos.zillowstatic.com/fp/{zpid}-p_e.jpg",
+            "brokerName": BROKERS[broker_idx[i]],
+            "hdpData": {"homeInfo": home_info},
+        }
+        if has_unformatted[i]:
+            item["unformattedPrice"] = p
+        if not missing_geo[i]:
+            item["latLong"] = {"latitude": float(lat + lat_jitter[i]), "longitude": float(lng + lng_jitter[i])}
+
+        # the same facts show up either at the top level or only under hdpData.homeInfo
+        fields = {}
+        if not missing_beds[i]:
+            fields["beds"] = int(beds[i])
+        fields["baths"] = float(baths[i])
+        if not missing_sqft[i]:
+            fields["area"] = int(sqft[i])
+        if in_home_info[i]:
+            home_info.update({
+                "bedrooms": fields.get("beds"),
+                "bathrooms": fields.get("baths"),
+                "livingArea": fields.get("area"),
+            })
+        else:
+            item.update(fields)
+
+        items.append(item)
+
+    return items
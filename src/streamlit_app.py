@@ -1,18 +1,38 @@
+from __future__ import annotations
+
+import json
+import math
 import traceback
 import streamlit as st
-import requests
 import time
 import uuid
-import pandas as pd
 import os
 from dotenv import load_dotenv
 from typing import Literal
 
 from templates.messages import empty_area_msg
-from utils.data_analysis import (
-    normalize_items, compute_kpis, rank_best_value, summarize_by_city, top_cheapest, top_expensive, 
-    fancy_display_deals, display_bed_bath_distribution, plot_price_buckets
-)
+from utils.lazy import lazy_module, warm
+from utils.result_cache import ResultCache
+from utils.analysis_cache import AnalysisCache, dataset_key
+from utils.analysis_executor import AnalysisExecutor, QueueFull
+from utils.run_store import RunStore
+from utils.single_flight import CLAIM_TIMEOUT_SECONDS, SearchFlights
+from utils.zillow_converter import search_key, search_state_from_url
+from utils.tiles import is_tileable, property_status
+from utils import instrument
+from utils.instrument import stage
+
+# the analysis & chart stack (NumPy, pandas, Altair, pyarrow, httpx) loads
+# when a page first uses it, not for the chat page
+http_client = lazy_module("utils.http_client")
+pd = lazy_module("pandas")
+homes_frame = lazy_module("utils.homes_frame")
+aggregators = lazy_module("utils.aggregators")
+jobs = lazy_module("utils.jobs")
+listing_store = lazy_module("utils.listing_store")
+data_analysis = lazy_module("utils.data_analysis")
+display = lazy_module("utils.display")
+compare = lazy_module("utils.compare")
 
 load_dotenv()
 # Constants
@@ -20,6 +40,26 @@ CHAT_URL = os.getenv("N8N_PRODUCTION_CHAT")
 # CHAT_URL = os.getenv("N8N_TEST_CHAT")
 ANALYSIS_URL = os.getenv("N8N_PRODUCTION_HOMES_ANALYSIS")
 REQUEST_LIMIT_SECONDS = 10
+# read the Apify dataset directly, page by page, instead of waiting for n8n's aggregated response
+STREAM_DATASET = os.getenv("STREAM_DATASET", "").lower() in ("1", "true", "yes")
+# run confirmed map searches as parallel tiles, straight on Apify rather than through n8n
+TILE_SEARCHES = os.getenv("TILE_SEARCHES", "").lower() in ("1", "true", "yes") and bool(os.getenv("APIFY_TOKEN"))
+# stage timings in the sidebar for every session (or add ?debug=1 to the page URL)
+DEBUG_PANEL = os.getenv("DEBUG_PANEL", "").lower() in ("1", "true", "yes")
+# serve /metrics (Prometheus) and /metrics.json on this port
+METRICS_PORT = int(os.getenv("METRICS_PORT") or 0)
+# import the analysis stack in the background while the user is still chatting
+PREWARM_ANALYSIS = os.getenv("PREWARM_ANALYSIS", "1").lower() in ("1", "true", "yes")
+ANALYSIS_MODULES = [
+    "utils.http_client", "pandas", "pyarrow", "utils.homes_frame", "utils.aggregators", "utils.apify_stream",
+    "utils.jobs", "utils.listing_store", "utils.data_analysis", "altair", "utils.display", "utils.compare",
+]
+# how often a waiting session re-checks its run on the job manager
+JOB_REFRESH_SECONDS = 3
+# how often a session shows the sections of its analysis finished so far
+ANALYSIS_REFRESH_SECONDS = 1
+# replies that confirm the pending search URL, so a cached result can be served without a run
+AFFIRMATIVE_REPLIES = {"yes", "y", "yep", "yeah", "yup", "sure", "ok", "okay", "confirm", "confirmed", "go ahead"}
 
 
 # ---------- SETUP UI ----------
@@ -38,7 +78,14 @@ def init_session_state():
         "session_id": str(uuid.uuid4()),
         "run_data": {},
         "pending_url": '',
+        "search_url": '',
+        "job_id": '',
+        "flight": '',
+        "joining": '',
+        "joining_since": 0,
+        "announced_run": '',
         "ai_message": '',
+        "analysis_retry": 0,
     }
     for key, val in defaults.items():
         if key not in st.session_state:
@@ -71,6 +118,128 @@ def get_last_message(role: Literal['ai', 'assistant', 'user'] = 'user'):  # sour
     return None
 
 # ---------- HELPER ----------
+@st.cache_resource
+def get_result_cache():
+    """One on-disk scrape cache shared by every session of this process."""
+    return ResultCache()
+
+@st.cache_resource
+def get_http_client():
+    """One pooled keep-alive session for the n8n and Apify calls of every session."""
+    return http_client.HttpClient()
+
+@st.cache_resource
+def get_job_manager():
+    """One event loop & connection pool watching the runs of every session."""
+    # streamed pages are normalized on the analysis threads, not on the loop
+    return jobs.JobManager(ANALYSIS_URL, page_executor=get_analysis_executor().pool)
+
+@st.cache_resource
+def get_analysis_cache():
+    """Analyses of recently shown datasets, shared by every session within a memory budget."""
+    return AnalysisCache()
+
+@st.cache_resource
+def get_analysis_executor():
+    """One pool of analysis threads for every session, so script runs only render."""
+    return AnalysisExecutor()
+
+@st.cache_resource
+def get_run_store():
+    """Past runs on disk; opened memory-mapped, so every worker process shares their pages."""
+    return RunStore()
+
+@st.cache_resource
+def get_listing_store():
+    """Every scraped listing by zpid, so a rerun of a search only re-normalizes what changed."""
+    return listing_store.ListingStore()
+
+@st.cache_resource
+def get_search_flights():
+    """Searches being run right now, so sessions confirming the same one share its run."""
+    return SearchFlights()
+
+def forget_job():
+    """Drop this session's finished (or abandoned) job before a new search, and stop its analysis."""
+    if st.session_state.job_id:
+        get_job_manager().forget(st.session_state.job_id, st.session_state.session_id)
+        st.session_state.job_id = ''
+    get_analysis_executor().cancel_session(st.session_state.session_id)
+
+@st.fragment(run_every=JOB_REFRESH_SECONDS)
+def watch_job(job_id: str):
+    """Re-checks the job every few seconds; only this fragment reruns while waiting."""
+    job = get_job_manager().get(job_id)
+    if job is None or job.done.is_set():
+        st.rerun()
+    st.caption(f"🔍 Searching homes for you... run status: **{job.status}** ({round(time.time() - job.submitted)}s)")
+
+@st.fragment(run_every=ANALYSIS_REFRESH_SECONDS)
+def watch_flight(key: str, since: float):
+    """Waits for another session to start its run of this search; only this fragment reruns meanwhile."""
+    if not get_search_flights().pending(key) or time.time() - since >= CLAIM_TIMEOUT_SECONDS:
+        st.rerun()
+    st.caption(f"🤝 Someone is starting this exact search, you'll join their run... ({round(time.time() - since)}s)")
+
+def confirmed_search_url(user_message: str) -> str | None:
+    """The search URL this message confirms: a pasted Zillow URL, or "yes" to the pending one."""
+    message = user_message.strip()
+    if message.startswith("https://www.zillow.com/") and "searchQueryState=" in message:
+        return message
+    if st.session_state.pending_url and message.lower().strip(" .!") in AFFIRMATIVE_REPLIES:
+        return st.session_state.pending_url
+    return None
+
+def cached_search_key(search_url: str | None) -> str | None:
+    """Cache key of `search_url` if its results are cached, else None."""
+    key = flight_key(search_url)
+    return key if key and key in get_result_cache() else None
+
+def flight_key(search_url: str | None) -> str | None:
+    """Single-flight key of `search_url`: its canonical search, or None if it has none."""
+    if not search_url:
+        return None
+    try:
+        return search_key(search_url)
+    except ValueError:
+        return None
+
+def start_flight(key: str | None, run_data: dict):
+    """Publish the run this session just started as `key`'s flight, for other sessions to join."""
+    if key:
+        get_search_flights().started(key, run_data)
+        st.session_state.flight = key
+
+def land_flight():
+    """This session's run is over: the next confirmation of its search starts afresh (or hits the cache)."""
+    if st.session_state.flight:
+        get_search_flights().finish(st.session_state.flight)
+        st.session_state.flight = ''
+
+def remembering(run_id: str | None):
+    """A function saving a finished search's homes: to the scrape cache, and the run to the run store.
+
+    Session state & stores are read here, so it can be called off the script thread.
+    """
+    search_url = st.session_state.search_url
+    result_cache, analysis_cache, run_store = get_result_cache(), get_analysis_cache(), get_run_store()
+
+    def remember(frame: homes_frame.HomesFrame):
+        if search_url and len(frame):
+            try:
+                key = search_key(search_url)
+            except ValueError:
+                key = None
+            if key:
+                result_cache.put(key, frame.to_records(), url=search_url)
+                # an older analysis of this search no longer matches the saved homes
+                analysis_cache.discard(f"search:{key}")
+        if run_id:
+            # to reopen it later without scraping it again
+            run_store.save(run_id, frame, url=search_url or None)
+
+    return remember
+
 def user_sends_too_often():
     """Add a delay between messages to avoid rate limits by AI"""
     # Calculate time since last message
@@ -91,25 +260,73 @@ def user_sends_too_often():
 # ---------- CALLBACK ----------
 def send_request_to_n8n(user_message: str):
     """Send user's message to the n8n webhook and process the response."""
+    flight = None
+    # set again below if the search is still waiting on another session's claim
+    joining, since = st.session_state.joining, st.session_state.joining_since
+    st.session_state.joining = ''
     with st.spinner("Generating your search URL..."):
         try:
             # mark as processed
             st.session_state.last_query_sent = user_message
             st.session_state.last_request_time = time.time()
 
+            # Repeated search: serve the cached results instead of starting another run
+            confirmed_url = confirmed_search_url(user_message)
+            cache_key = cached_search_key(confirmed_url)
+            if cache_key:
+                forget_job()
+                st.session_state.search_url = confirmed_url
+                st.session_state.run_data = {"cache_key": cache_key}
+                st.session_state.ai_message = "⚡ This search was run recently, here are its results."
+                st.session_state.current_mode = 'scraping'
+                st.rerun()
+
+            # Same search already running for another session: attach to its run instead of starting one
+            flight = flight_key(confirmed_url)
+            if flight:
+                if flight != joining:
+                    since = time.time()
+                settled, shared = get_search_flights().poll(flight, since)
+                if not settled:
+                    # another session is starting it: checked again from `watch_flight`, not waited on here
+                    st.session_state.joining, st.session_state.joining_since = flight, since
+                    return
+                if shared is not None:
+                    forget_job()
+                    st.session_state.search_url = confirmed_url
+                    st.session_state.run_data = dict(shared)
+                    st.session_state.flight = flight
+                    st.session_state.ai_message = "🤝 This exact search is already running, you'll get its results as well."
+                    st.session_state.current_mode = 'scraping'
+                    st.rerun()
+            # from here on this session holds the search's claim, if it has one
+
+            if TILE_SEARCHES and confirmed_url and is_tileable(confirmed_url):
+                forget_job()
+                st.session_state.search_url = confirmed_url
+                st.session_state.run_data = {
+                    "search_url": confirmed_url, "tiled": True, "property_status": property_status(confirmed_url),
+                }
+                start_flight(flight, st.session_state.run_data)
+                st.session_state.ai_message = "🗺️ Searching your map area tile by tile, several tiles at a time."
+                st.session_state.current_mode = 'scraping'
+                st.rerun()
+
             # Sent to n8n
             session_id = st.session_state.session_id
             pending_url = st.session_state.pending_url
             payload = {"search_query_message": user_message, 'session_id': session_id, 'pending_url': pending_url}
-            response = requests.post(CHAT_URL, json=payload, timeout=60)
-            response.raise_for_status()
-
-            data = response.json()
+            with stage("n8n_chat"):
+                data = get_http_client().post("n8n_chat", CHAT_URL, json=payload).json()
             search_url = data.get("search_url")
             empty_area = data.get("empty_area")
             error = data.get("error_message")
             run_data = data.get("run_data")
             ai_message = data.get("ai_message")
+            if run_data:
+                start_flight(flight, run_data)
+            elif flight:
+                get_search_flights().abandon(flight)
 
             if error:
                 render_message("ai", error)
@@ -130,6 +347,8 @@ def send_request_to_n8n(user_message: str):
                 )
 
             elif run_data:
+                forget_job()
+                st.session_state.search_url = confirmed_url or pending_url
                 st.session_state.run_data = run_data
                 st.session_state.ai_message = ai_message
                 st.session_state.current_mode = 'scraping'
@@ -139,27 +358,202 @@ def send_request_to_n8n(user_message: str):
                 render_message('assistant', f"else cuaght the response data: {data}")
 
         except Exception as e:
+            if flight:
+                get_search_flights().abandon(flight)
             render_message("ai", f"Error: {e}")
 
-def analyze_data(homes, user_max_price=None):
-    """Show homes results after cleaning & analysis."""
-    
-    normalized = normalize_items(homes)
-
-    # --- KPIs ---
-    kpis = compute_kpis(normalized, user_max_price=user_max_price)
+def render_kpis(kpis: dict):
+    """Headline metrics row, shared by the final and the streaming dashboards."""
     st.header("📊 Market Insights")
     k1, k2, k3, k4 = st.columns(4)
     k1.metric("🏠 Homes Found", kpis["count"])
     k2.metric("⚖️ Avg Price", f"${kpis['avg_price']:,}" if kpis["avg_price"] else "N/A")
     k3.metric("⏱ Median Price", f"${kpis['median_price']:,}" if kpis["median_price"] else "N/A")
     k4.metric("💰 Max Price", f"${kpis['max_price']:,}" if kpis["max_price"] else "N/A")
+
+def analysis_pending(key: str) -> bool:
+    """Whether `key`'s analysis is yet to be started: neither cached nor on the analysis executor."""
+    return get_analysis_cache().get(key) is None and get_analysis_executor().get(key) is None
+
+def background_analysis(key: str, sections) -> dict | None:
+    """The analysis cached as `key`, else computed from `sections()` on the analysis executor.
+
+    `sections` yields (name, parts) like `data_analysis.analyze_sections`.
+    While it runs, the sections finished so far are shown (`watch_analysis`)
+    and None is returned; the page reruns once it is done. With `sections`
+    None, only an analysis submitted earlier is picked up; if it is gone
+    (dropped, or evicted from the cache) the page reruns to start it again.
+    """
+    analysis = get_analysis_cache().get(key)
+    if analysis is not None:
+        return analysis
+
+    executor = get_analysis_executor()
+    try:
+        task = executor.submit(key, st.session_state.session_id, sections) if sections else executor.get(key)
+    except QueueFull:
+        st.session_state.analysis_retry = time.time()
+        retry_analysis()
+        return None
+    if task is None:
+        st.rerun()
+    if not task.done.is_set():
+        watch_analysis(key)
+        return None
+
+    executor.forget(key, st.session_state.session_id)
+    if task.status == "DONE":
+        get_analysis_cache().put(key, task.analysis)
+        return task.analysis
+    if task.error:
+        st.error(f"The analysis failed: {task.error}")
+    return None
+
+@st.fragment(run_every=ANALYSIS_REFRESH_SECONDS)
+def watch_analysis(key: str):
+    """The sections of the analysis finished so far; only this fragment reruns until it is done."""
+    task = get_analysis_executor().get(key)
+    if task is None or task.done.is_set():
+        st.rerun()
+
+    analysis = task.analysis
+    if "kpis" in task.sections:
+        render_kpis(analysis["kpis"])
+    if "rankings" in task.sections:
+        render_rankings(analysis)
+    if task.started:
+        st.caption(f"📊 Analyzing your homes... ({round(time.time() - task.started)}s)")
+    else:
+        st.caption(f"⏳ Waiting for a free analysis worker... ({round(time.time() - task.submitted)}s)")
+
+@st.fragment(run_every=ANALYSIS_REFRESH_SECONDS)
+def retry_analysis():
+    """Every worker was busy with a full queue: try again shortly."""
+    if time.time() - st.session_state.analysis_retry >= ANALYSIS_REFRESH_SECONDS:
+        st.rerun()
+    st.caption("⏳ Every analysis worker is busy, yours will start in a moment...")
+
+def analyze_data(homes, user_max_price=None, run_id: str | None = None) -> bool:
+    """Show homes results after cleaning & analysis; False while the analysis is still running.
+
+    The analysis is kept per dataset (the run id, or a hash of `homes`),
+    so reruns of the page only render it again.
+    """
+    key = f"run:{run_id}" if run_id else f"data:{dataset_key(homes)}"
+    if user_max_price:
+        key += f":{user_max_price}"
+    listings, remember = get_listing_store(), remembering(run_id)
+
+    def sections():
+        # columnar view built once, shared by every section below
+        merged = listings.merge(homes)
+        remember(merged.frame)
+        for name, parts in data_analysis.analyze_sections(merged.frame, user_max_price=user_max_price):
+            if name == "kpis":
+                parts = {
+                    **parts,
+                    "skipped": merged.skipped,
+                    "changes": {"seen": merged.changed + merged.unchanged, "deltas": merged.deltas},
+                }
+            yield name, parts
+
+    analysis = background_analysis(key, sections)
+    if analysis is None:
+        return False
+
+    display.warn_skipped(analysis.get("skipped", 0))
+    render_changes(analysis.get("changes"))
+    with stage("render_dashboard", rows=len(analysis["frame"])):
+        render_dashboard(analysis)
+    return True
+
+def render_changes(changes: dict | None):
+    """Listings already seen in an earlier run, and the ones whose price moved since."""
+    if not changes or not changes["seen"]:
+        return
+    moved = [d for d in changes["deltas"] if d["price_before"] != d["price_after"]]
+    st.caption(f"🔁 {changes['seen']:,} of these homes were in an earlier search; {len(moved):,} changed price since.")
+    if moved:
+        with st.expander("💱 Price changes"):
+            st.dataframe(pd.DataFrame(moved)[["zpid", "price_before", "price_after", "days_after"]].rename(columns={
+                "price_before": "Was", "price_after": "Now", "days_after": "Days Listed",
+            }))
+
+def _range_filter(column, label: str, bounds: tuple[float, float] | None, step: int, fmt: str):
+    """(lo, hi) of a range slider over `bounds`, an end left at its bound being None."""
+    if not bounds or bounds[0] >= bounds[1]:
+        return None
+    low, high = int(bounds[0]), math.ceil(bounds[1])
+    lo, hi = column.slider(label, low, high, (low, high), step=step, format=fmt)
+    return (lo if lo > low else None, hi if hi < high else None)
+
+def refine(analysis: dict) -> dict:
+    """Filters over the homes of `analysis`; returns the analysis of the homes they keep.
+
+    Filters go through the indexes built by `analyze_frame`, and only the
+    KPIs, rankings & charts are recomputed, so sliders answer in milliseconds
+    instead of re-scraping or re-analyzing the whole search.
+    """
+    query = analysis.get("query")
+    if query is None or not len(query):
+        return analysis
+
+    with st.expander("🔎 Refine results"):
+        left, right = st.columns(2)
+        filters = {
+            "price": _range_filter(left, "Price", query.sorted["price"].bounds(), 1000, "$%d"),
+            "sqft": _range_filter(right, "Size (sqft)", query.sorted["sqft"].bounds(), 50, "%d sqft"),
+            "price_per_sqft": _range_filter(left, "$/sqft", query.sorted["price_per_sqft"].bounds(), 5, "$%d"),
+            "days_listed": _range_filter(right, "Days listed", query.sorted["days_listed"].bounds(), 1, "%d days"),
+        }
+        beds = [v for v in query.by_value["beds"].values if v > 0]
+        baths = [v for v in query.by_value["baths"].values if v > 0]
+        min_beds = left.selectbox("Min beds", ["Any", *beds])
+        min_baths = right.selectbox("Min baths", ["Any", *baths])
+        filters["beds"] = None if min_beds == "Any" else (min_beds, None)
+        filters["baths"] = None if min_baths == "Any" else (min_baths, None)
+        cities = query.by_value["city"]
+        by_count = sorted(cities.values, key=dict(zip(cities.values, cities.counts.tolist())).get, reverse=True)
+        filters["city"] = left.multiselect("Cities", by_count) or None
+        budget = right.number_input("Budget ($)", min_value=0, value=0, step=10_000, help="Share of the shown homes at or under it")
+
+    filters = {k: v for k, v in filters.items() if v is not None and v != (None, None)}
+    user_max_price = int(budget) or None
+    if not filters and not user_max_price:
+        return analysis
+
+    # reruns that don't touch the filters (other widgets, the job fragment) reuse the last result
+    key = (id(query), repr(sorted(filters.items())), user_max_price)
+    last = st.session_state.get("refined")
+    if last and last[0] == key:
+        refined = last[1]
+    elif filters:
+        refined = data_analysis.analyze_subset(analysis, query.select(**filters), user_max_price=user_max_price)
+    else:
+        refined = {**analysis, "kpis": data_analysis.compute_kpis(analysis["frame"], user_max_price=user_max_price)}
+    st.session_state.refined = (key, refined)
+
+    if filters and not len(refined["frame"]):
+        st.warning("No home matches these filters.")
+    elif filters:
+        st.caption(f"Showing **{len(refined['frame']):,}** of {len(query):,} homes")
+    return refined
+
+def render_dashboard(analysis: dict):
+    """Render the full analysis (from `analyze_frame`) of already normalized homes."""
+    analysis = refine(analysis)
+    if not len(analysis["frame"]):
+        return
+
+    # --- KPIs ---
+    kpis = analysis["kpis"]
+    render_kpis(kpis)
     if kpis.get("percent_in_budget") is not None:
         st.info(f"🎯 **{kpis['percent_in_budget']}%** of homes match your budget")
 
     # --- Price Buckets ---
     st.subheader("💵 Price Distribution")
-    plot_price_buckets(kpis["price_buckets"])
+    st.altair_chart(analysis["charts"]["price_buckets"])
 
     # --- Avg price per bedroom ---
     if kpis["avg_price_per_bedroom"]:
@@ -170,29 +564,317 @@ def analyze_data(homes, user_max_price=None):
             )
         )
 
+    # --- Price vs size, days on market (pre-aggregated, so the page stays light on big runs) ---
+    st.subheader("📐 Price vs Size")
+    st.altair_chart(analysis["charts"]["price_sqft"])
+
+    st.subheader("📅 Median Price by Days Listed")
+    st.altair_chart(analysis["charts"]["days_listed"])
+
+    render_rankings(analysis)
+
+    # --- Bed / Bath distribution ---
+    st.subheader("🚿 Bed & Bath Counts")
+    for chart in analysis["charts"]["bed_bath"]:
+        st.altair_chart(chart, width='stretch')
+
+def render_rankings(analysis: dict):
+    """Best deals, homes below their comps, cheapest & most expensive, and cities."""
     # --- Best deals ---
     st.subheader("🏆 Best Deals (Lowest $/sqft)")
-    best = rank_best_value(normalized)
-    fancy_display_deals(best)
+    rankings = analysis["rankings"]
+    display.fancy_display_deals(rankings["best_value"])
     st.divider()
 
+    # --- Priced below comparable homes (same beds/baths band, nearby, similar size) ---
+    if rankings.get("below_comps"):
+        st.subheader("🏷️ Priced Below Comparable Homes")
+        st.dataframe(
+            pd.DataFrame(rankings["below_comps"])[
+                ["address", "city", "price", "comp_estimate", "comp_discount", "zestimate", "zestimate_discount", "comps", "url"]
+            ],
+            column_config={
+                "price": st.column_config.NumberColumn("Price", format="$%d"),
+                "comp_estimate": st.column_config.NumberColumn("Comps estimate", format="$%d"),
+                "comp_discount": st.column_config.NumberColumn("Below comps", format="%.1f%%"),
+                "zestimate": st.column_config.NumberColumn("Zestimate", format="$%d"),
+                "zestimate_discount": st.column_config.NumberColumn("Below Zestimate", format="%.1f%%"),
+                "url": st.column_config.LinkColumn("Link", display_text="Link"),
+            },
+            hide_index=True,
+        )
+        st.divider()
+
     # --- Top cheapest / expensive ---
     st.subheader("💸 Cheapest Homes")
-    fancy_display_deals(top_cheapest(normalized))
+    display.fancy_display_deals(rankings["cheapest"])
     st.divider()
 
     st.subheader("💎 Most Expensive Homes")
-    fancy_display_deals(top_expensive(normalized))
+    display.fancy_display_deals(rankings["expensive"])
     st.divider()
 
     # --- City summary ---
     st.subheader("📍 Homes by City")
-    city_stats = summarize_by_city(normalized)
-    st.dataframe(city_stats)
+    st.dataframe(analysis["city_stats"])
 
-    # --- Bed / Bath distribution ---
-    st.subheader("🚿 Bed & Bath Counts")
-    display_bed_bath_distribution(normalized)
+def stream_pages():
+    """`on_page` of a streamed run: normalize a page and add it to the running KPIs & city totals.
+
+    Called on the analysis threads, one page at a time and in order, so
+    the aggregators need no lock. Returns (frame, skipped, totals so far).
+    """
+    running = aggregators.KpiAggregator()
+    cities = aggregators.CityAggregator()
+
+    def on_page(page: list[dict]) -> tuple:
+        with stage("normalize_frame", rows=len(page)):
+            frame, skipped = data_analysis.normalize_frame(page)
+        running.update(frame)
+        cities.update(frame)
+        return frame, len(skipped), {
+            "kpis": running.result(), "price_buckets": running.price_buckets(), "cities": cities.result(),
+        }
+
+    return on_page
+
+@st.fragment(run_every=ANALYSIS_REFRESH_SECONDS)
+def watch_stream(job_id: str):
+    """Running totals of the pages read so far; only this fragment reruns until the run is over."""
+    job = get_job_manager().get(job_id)
+    if job is None or job.done.is_set():
+        st.rerun()
+    if job.pages:
+        # medians & buckets are sketch estimates until the final dashboard replaces them
+        streamed = job.pages[-1][2]
+        st.caption(f"📥 {streamed['kpis']['count']:,} homes loaded so far...")
+        render_kpis(streamed["kpis"])
+        display.plot_price_buckets(streamed["price_buckets"])
+        st.dataframe(streamed["cities"])
+    st.caption(f"🔍 Searching homes for you... run status: **{job.status}** ({round(time.time() - job.submitted)}s)")
+
+def stream_and_analyze(run_data: dict) -> bool:
+    """Read the run's dataset page by page, updating KPIs, buckets & cities as pages arrive.
+
+    The job manager's loop polls the run and reads the pages; only their
+    normalizing & aggregating (`stream_pages`) and the final analysis of
+    the whole dataset take analysis threads, so a long scrape doesn't hold
+    one. Raw pages are dropped as soon as they are normalized into columns.
+    False while the run or its analysis is still going.
+    """
+    key = f"run:{run_data.get('run_id') or run_data['dataset_id']}"
+    sections = None
+    if analysis_pending(key):
+        manager = get_job_manager()
+        job = manager.get(st.session_state.job_id)
+        if job is None:
+            job = manager.submit(run_data, st.session_state.session_id, on_page=stream_pages())
+            st.session_state.job_id = job.id
+        if not job.done.is_set():
+            st.write('### 🔥 Here We Go')
+            watch_stream(job.id)
+            return False
+        if job.error:
+            render_message('assistant', job.error)
+            return True
+
+        frames, remember = [frame for frame, *_ in job.pages], remembering(run_data.get('run_id'))
+        skipped = sum(page_skipped for _, page_skipped, _ in job.pages)
+
+        def sections():
+            frame = homes_frame.HomesFrame.concat(frames)
+            remember(frame)
+            for name, parts in data_analysis.analyze_sections(frame):
+                if name == "kpis":
+                    parts = {**parts, "skipped": skipped}
+                yield name, parts
+
+    st.write('### 🔥 Here We Go')
+    analysis = background_analysis(key, sections)
+    if analysis is None:
+        return False
+    display.warn_skipped(analysis.get("skipped", 0))
+    if not len(analysis["frame"]):
+        st.info("The run finished without returning any homes.")
+        return True
+    render_dashboard(analysis)
+    return True
+
+def serve_cached(cache_key: str):
+    """Dashboard for a search whose results are already in the scrape cache."""
+    key = f"search:{cache_key}"
+    normalized = None
+    if analysis_pending(key):
+        normalized = get_result_cache().get(cache_key)
+        if normalized is None:
+            # expired between the confirmation and this rerun
+            st.session_state.current_mode = 'chatting_to_get_url'
+            render_message("assistant", "Those saved results just expired, please confirm the search again.")
+            return
+
+    st.write('### 🔥 Here We Go')
+    analysis = background_analysis(
+        key,
+        (lambda: data_analysis.analyze_sections(homes_frame.HomesFrame.from_records(normalized)))
+        if normalized is not None else None,
+    )
+    if analysis is not None:
+        render_dashboard(analysis)
+
+def serve_stored(run_id: str):
+    """Dashboard for a run kept in the run store, mapped from disk instead of scraped again."""
+    key = f"run:{run_id}"
+    frame = None
+    if analysis_pending(key):
+        frame = get_run_store().load(run_id)
+        if frame is None:
+            st.session_state.current_mode = 'chatting_to_get_url'
+            render_message("assistant", "That saved run is no longer available, please start a new search.")
+            return
+
+    st.write('### 🔥 Here We Go')
+    analysis = background_analysis(key, (lambda: data_analysis.analyze_sections(frame)) if frame is not None else None)
+    if analysis is not None:
+        render_dashboard(analysis)
+
+def run_label(run: dict) -> str:
+    """Sidebar name of a stored run: when, where (the search term, if any) and how many homes."""
+    label = time.strftime('%b %d, %H:%M', time.localtime(run['created']))
+    try:
+        term = search_state_from_url(run["url"]).get("usersSearchTerm") if run["url"] else None
+    except ValueError:
+        term = None
+    if term:
+        label += f" · {term}"
+    return f"{label} · {run['rows']:,} homes"
+
+def serve_comparison(run_ids: list[str]):
+    """Stored runs side by side, on shared price buckets."""
+    last = st.session_state.get("comparison")
+    if last and last[0] == run_ids:
+        comparison = last[1]
+    else:
+        comparison = compare.compare_runs(get_run_store(), run_ids)
+        st.session_state.comparison = (run_ids, comparison)
+    if comparison["missing"]:
+        st.warning(f"{len(comparison['missing'])} of these runs are no longer stored and were left out.")
+    if not comparison["runs"]:
+        return
+
+    names = {r["run_id"]: run_label(r) for r in get_run_store().runs()}
+    st.header("📊 Market Comparison")
+    st.dataframe(
+        pd.DataFrame([
+            {
+                "Run": names.get(r["run_id"], r["run_id"]),
+                "Homes": r["count"],
+                "Avg Price": r["avg_price"],
+                "Median Price": r["median_price"],
+                "Min Price": r["min_price"],
+                "Max Price": r["max_price"],
+            }
+            for r in comparison["runs"]
+        ]),
+        hide_index=True,
+    )
+
+    st.subheader("💵 Price Distribution")
+    st.altair_chart(data_analysis.compare_buckets_chart(comparison["price_buckets"], names))
+
+    st.subheader("🛌 Average Price per Bedroom")
+    st.dataframe(pd.DataFrame({
+        names.get(r["run_id"], r["run_id"]): r["avg_price_per_bedroom"] for r in comparison["runs"]
+    }).sort_index().rename_axis("beds"))
+
+    st.subheader("📍 Homes by City")
+    st.dataframe(
+        pd.DataFrame(comparison["city_stats"]).assign(run_id=lambda df: df["run_id"].map(names)).rename(columns={"run_id": "run"}),
+        hide_index=True,
+    )
+
+def past_runs_sidebar():
+    """Reopen a stored run without scraping it again, or compare several."""
+    runs = get_run_store().runs()
+    if not runs:
+        return
+
+    with st.sidebar:
+        st.subheader("🗂 Past Runs")
+        labels = {r["run_id"]: run_label(r) for r in runs}
+        run_id = st.selectbox("Run", list(labels), format_func=labels.get, label_visibility="collapsed")
+        if st.button("Open run"):
+            forget_job()
+            st.session_state.search_url = next(r["url"] for r in runs if r["run_id"] == run_id) or ''
+            st.session_state.run_data = {"stored_run": run_id}
+            st.session_state.ai_message = "📂 Here is the saved run you picked."
+            st.session_state.current_mode = 'scraping'
+            st.rerun()
+
+        if len(runs) > 1:
+            picked = st.multiselect("Compare runs", list(labels), format_func=labels.get, placeholder="Pick 2 or more")
+            if st.button("Compare", disabled=len(picked) < 2):
+                forget_job()
+                st.session_state.search_url = ''
+                st.session_state.run_data = {"compare": picked}
+                st.session_state.ai_message = f"📊 Here are the {len(picked)} saved runs you picked, side by side."
+                st.session_state.current_mode = 'scraping'
+                st.rerun()
+
+@st.cache_resource
+def get_metrics_server():
+    """One /metrics endpoint per process."""
+    return instrument.serve_metrics(METRICS_PORT, host="0.0.0.0")
+
+def debug_panel():
+    """Where this process spent its time, per stage."""
+    if not (DEBUG_PANEL or st.query_params.get("debug") == "1"):
+        return
+
+    with st.sidebar.expander("🛠 Stage timings", expanded=True):
+        on = st.toggle("Record timings", value=instrument.enabled())
+        memory = st.toggle("Track peak memory (slow)", value=instrument.snapshot()["memory"], disabled=not on)
+        if on != instrument.enabled() or memory != instrument.snapshot()["memory"]:
+            if on:
+                instrument.enable(memory=memory)
+            else:
+                instrument.disable()
+
+        # kept whether or not timings are recorded
+        endpoints = http_client.endpoint_metrics()
+        if endpoints:
+            st.caption("HTTP endpoints")
+            st.dataframe(pd.DataFrame.from_dict(endpoints, orient="index"))
+
+        st.caption(f"Searches in flight: {get_search_flights().in_flight()}")
+        st.caption("Analysis executor")
+        st.dataframe(pd.DataFrame([get_analysis_executor().metrics()]), hide_index=True)
+        snapshot = instrument.snapshot()
+        if not snapshot["stages"]:
+            st.caption("No stages recorded yet.")
+            return
+        st.dataframe(pd.DataFrame([
+            {
+                "Stage": name,
+                "Calls": stats["calls"],
+                "Total s": round(stats["seconds"], 3),
+                "Mean ms": round(stats["seconds"] / stats["calls"] * 1000, 1),
+                "Max ms": round(stats["max_seconds"] * 1000, 1),
+                "Rows": stats["rows"],
+                "Peak MB": None if stats["peak_bytes"] is None else round(stats["peak_bytes"] / 1e6, 1),
+            }
+            for name, stats in sorted(snapshot["stages"].items(), key=lambda kv: -kv[1]["seconds"])
+        ]), hide_index=True)
+        st.download_button("metrics.json", json.dumps(snapshot), file_name="metrics.json", mime="application/json")
+        st.download_button("metrics.txt", instrument.prometheus_text(), file_name="metrics.txt", mime="text/plain")
+        if st.button("Reset"):
+            instrument.reset()
+            st.rerun()
+
+
+@st.cache_resource
+def prewarm_analysis():
+    """Import the analysis stack once per process, off the script thread."""
+    return warm(ANALYSIS_MODULES)
 
 
 # ---------- CHAT MODES ----------
@@ -211,9 +893,14 @@ def chat_to_get_url():
         render_message("user", user_query)
 
     last_msg = get_last_message("user")
+    if last_msg and st.session_state.joining:
+        # the same search is being started by another session: see if it has its run yet
+        send_request_to_n8n(last_msg)
     # Send only if new message and not repeated
-    if last_msg and last_msg != st.session_state.last_query_sent and not user_sends_too_often():
+    elif last_msg and last_msg != st.session_state.last_query_sent and not user_sends_too_often():
         send_request_to_n8n(last_msg)
+    if st.session_state.joining:
+        watch_flight(st.session_state.joining, st.session_state.joining_since)
 
 
 def scraping():  # sourcery skip: extract-method
@@ -229,46 +916,100 @@ def scraping():  # sourcery skip: extract-method
     # }
     run_id, run_url, run_status = run_data.get('run_id'),  run_data.get('run_url'), run_data.get('status')
 
-    with st.spinner("### 🔍 Searching homes for you..."):
+    # announce a run once; later reruns show these messages through render_chat()
+    run_key = (
+        run_data.get('run_id') or run_data.get('cache_key') or run_data.get('stored_run')
+        or ','.join(run_data.get('compare', [])) or run_data.get('search_url')
+    )
+    announce = st.session_state.announced_run != run_key
+    st.session_state.announced_run = run_key
+
+    if run_data.get('cache_key'):
+        if announce:
+            render_message("ai", st.session_state.ai_message)
+        serve_cached(run_data['cache_key'])
+        return
+
+    if run_data.get('stored_run'):
+        if announce:
+            render_message("ai", st.session_state.ai_message)
+        serve_stored(run_data['stored_run'])
+        return
+
+    if run_data.get('compare'):
+        if announce:
+            render_message("ai", st.session_state.ai_message)
+        serve_comparison(run_data['compare'])
+        return
+
+    if announce and run_data.get('tiled'):
+        render_message("ai", st.session_state.ai_message)
+    elif announce:
         render_message("ai", st.session_state.ai_message)
         render_message(
             'assistant', 
             f"You can check your run [here]({run_url}).\n\n"
             "Once the run finishes, I'll show you a nice brief analysis on your data."
             )
-        
-        try:
-            # Poll Run
-            session_id = st.session_state.session_id
-            payload = {"run_data": run_data, 'session_id': session_id}
-            response = requests.post(ANALYSIS_URL, json=payload, timeout=None)
-            response.raise_for_status()
 
-            data = response.json()[0]
-            homes = data.get('homes')
-            error = data.get('error')
-
-            if error:
-                render_message('assistant', error['message'])
-            
-            elif homes:
-                st.write('### 🔥 Here We Go')
-                # Data Analysis
-                analyze_data(homes)
-        
-        except Exception as e:
-            st.error(traceback.format_exc())
+    try:
+        if run_id and run_id in get_run_store():
+            # finished & stored earlier (maybe by another worker process)
+            land_flight()
+            serve_stored(run_id)
+            return
+
+        if STREAM_DATASET and run_data.get('dataset_id'):
+            with st.spinner("### 🔍 Searching homes for you..."):
+                finished = stream_and_analyze(run_data)
+            if finished:
+                land_flight()
+            return
+
+        # Poll Run, on the shared job manager rather than this script thread
+        manager = get_job_manager()
+        job = manager.get(st.session_state.job_id)
+        if job is None:
+            job = manager.submit(run_data, st.session_state.session_id)
+            st.session_state.job_id = job.id
+
+        if not job.done.is_set():
+            watch_job(job.id)
+            return
+
+        if job.error:
+            render_message('assistant', job.error)
+
+        elif job.homes:
+            st.write('### 🔥 Here We Go')
+            # Data Analysis
+            if not analyze_data(job.homes, run_id=run_id):
+                # still analyzing; the results are cached along the way
+                return
+        # after the results are cached, so a confirmation right now is served from the cache
+        land_flight()
+
+    except Exception as e:
+        st.error(traceback.format_exc())
 
 # ---------- MAIN APP FLOW ----------
 def main():
     
     init_session_state()
+    if METRICS_PORT:
+        get_metrics_server()
 
     if st.session_state.current_mode == 'chatting_to_get_url':
         chat_to_get_url()
         
     elif st.session_state.current_mode == 'scraping':
         scraping()
+
+    past_runs_sidebar()
+    debug_panel()
+    # after the first paint, so the page isn't waiting on it
+    if PREWARM_ANALYSIS:
+        prewarm_analysis()
     
     #! For debug only
     # st.info(st.session_state)
@@ -0,0 +1,230 @@
+"""Mergeable aggregates over batches of normalized homes.
+
+Each aggregator takes batches through `update()` and combines with another
+aggregator of the same kind through `merge()`, so partial results from
+streamed pages or parallel workers add up to the result of one pass.
+Counts, sums, min/max, averages and modes are exact; medians and price
+buckets come from a `QuantileSketch` and are within its relative accuracy.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from utils.homes_frame import HomesFrame, as_frame, value_counts, py_number
+from utils.data_analysis import compute_dynamic_buckets
+
+
+def _add_counts(total: dict, counts: dict):
+    for key, count in counts.items():
+        total[key] = total.get(key, 0) + count
+
+
+class QuantileSketch:
+    """Quantiles with relative error, from log-spaced bins (DDSketch-style).
+
+    Every value v > 0 is counted in bin ceil(log(v) / log(gamma)); the bin's
+    representative value is within `relative_accuracy` of anything in it,
+    and so is a quantile interpolated between two of them.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.005):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        positive = values[values > 0]
+        self.zeros += values.size - positive.size
+        self.count += values.size
+        if positive.size:
+            keys, counts = np.unique(np.ceil(np.log(positive) / self._log_gamma).astype(np.int64), return_counts=True)
+            _add_counts(self.bins, dict(zip(keys.tolist(), counts.tolist())))
+        return self
+
+    def merge(self, other: "QuantileSketch"):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Can't merge sketches with different relative accuracy.")
+        _add_counts(self.bins, other.bins)
+        self.zeros += other.zeros
+        self.count += other.count
+        return self
+
+    def histogram(self) -> tuple[np.ndarray, np.ndarray]:
+        """Return (representative values, counts), ascending."""
+        keys = np.array(sorted(self.bins), dtype=np.float64)
+        values = 2 * self.gamma ** keys / (self.gamma + 1)
+        counts = np.array([self.bins[k] for k in sorted(self.bins)], dtype=np.int64)
+        if self.zeros:
+            values = np.concatenate([[0.0], values])
+            counts = np.concatenate([[self.zeros], counts])
+        return values, counts
+
+    def quantile(self, q: float) -> float | None:
+        """Linearly interpolated like `np.quantile`, so the median of an even count averages the middle two."""
+        if not self.count:
+            return None
+        values, counts = self.histogram()
+        rank = q * (self.count - 1)
+        lo, hi = values[np.searchsorted(np.cumsum(counts), [math.floor(rank), math.ceil(rank)], side="right")]
+        return float(lo + (rank - math.floor(rank)) * (hi - lo))
+
+
+class KpiAggregator:
+    """Running version of `compute_kpis` (plus the bed/bath counts)."""
+
+    def __init__(self, user_max_price: int | None = None, relative_accuracy: float = 0.005):
+        self.user_max_price = user_max_price
+        self.count = 0
+        self.price_sum = 0
+        self.min_price = None
+        self.max_price = None
+        self.in_budget = 0
+        self.sqft_count = 0
+        self.sqft_sum = 0.0
+        self.prices = QuantileSketch(relative_accuracy)
+        self.beds = {}
+        self.baths = {}
+        self.price_per_bed = {}  # beds -> [price sum, homes]
+
+    def update(self, data: list[dict] | HomesFrame):
+        frame = as_frame(data)
+        price_mask = frame.present("price")
+        beds_mask = frame.present("beds")
+        prices = frame["price"][price_mask]
+        sqfts = frame["sqft"][frame.present("sqft")].astype(np.float64)
+
+        self.count += len(frame)
+        if prices.size:
+            self.price_sum += int(prices.sum())
+            low, high = int(prices.min()), int(prices.max())
+            self.min_price = low if self.min_price is None else min(self.min_price, low)
+            self.max_price = high if self.max_price is None else max(self.max_price, high)
+            self.prices.add(prices)
+            if self.user_max_price:
+                self.in_budget += int(np.count_nonzero(prices <= self.user_max_price))
+        self.sqft_count += sqfts.size
+        self.sqft_sum += float(sqfts.sum())
+        _add_counts(self.beds, value_counts(frame["beds"][beds_mask]))
+        _add_counts(self.baths, value_counts(frame["baths"][frame.present("baths")]))
+
+        both = price_mask & beds_mask
+        codes, uniques = pd.factorize(frame["beds"][both], sort=False)
+        sums = np.bincount(codes, weights=frame["price"][both], minlength=len(uniques))
+        counts = np.bincount(codes, minlength=len(uniques))
+        for b, s, c in zip(uniques, sums, counts):
+            total = self.price_per_bed.setdefault(py_number(b), [0, 0])
+            total[0] += int(s)
+            total[1] += int(c)
+        return self
+
+    def merge(self, other: "KpiAggregator"):
+        self.count += other.count
+        self.price_sum += other.price_sum
+        for bound, pick in (("min_price", min), ("max_price", max)):
+            values = [v for v in (getattr(self, bound), getattr(other, bound)) if v is not None]
+            setattr(self, bound, pick(values) if values else None)
+        self.in_budget += other.in_budget
+        self.sqft_count += other.sqft_count
+        self.sqft_sum += other.sqft_sum
+        self.prices.merge(other.prices)
+        _add_counts(self.beds, other.beds)
+        _add_counts(self.baths, other.baths)
+        for b, (s, c) in other.price_per_bed.items():
+            total = self.price_per_bed.setdefault(b, [0, 0])
+            total[0] += s
+            total[1] += c
+        return self
+
+    def price_buckets(self, num_buckets=5) -> dict:
+        """`compute_dynamic_buckets` over the sketch bins, with the exact min/max as edges."""
+        if not self.prices.count:
+            return {}
+        values, counts = self.prices.histogram()
+        values = np.clip(values, self.min_price, self.max_price)
+        return compute_dynamic_buckets(
+            values, num_buckets, weights=counts, bounds=(self.min_price, self.max_price)
+        )
+
+    def bed_bath(self) -> tuple[dict, dict]:
+        """Same shape as `bed_bath_distribution`."""
+        return dict(self.beds), dict(self.baths)
+
+    def result(self) -> dict:
+        """Same keys as `compute_kpis`."""
+        priced = self.prices.count
+        percent_in_budget = None
+        if self.user_max_price and priced:
+            percent_in_budget = round((self.in_budget / priced) * 100, 2)
+
+        return {
+            "count": self.count,
+            "avg_price": round(self.price_sum / priced) if priced else 0,
+            "median_price": int(self.prices.quantile(0.5)) if priced else 0,
+            "min_price": self.min_price or 0,
+            "max_price": self.max_price or 0,
+            "avg_sqft": round(self.sqft_sum / self.sqft_count) if self.sqft_count else 0,
+            "price_buckets": self.price_buckets(),
+            "most_common_beds": max(self.beds, key=self.beds.get) if self.beds else 0,
+            "avg_price_per_bedroom": {b: round(s / c) for b, (s, c) in self.price_per_bed.items()},
+            "percent_in_budget": percent_in_budget,
+        }
+
+
+class CityAggregator:
+    """Running version of `summarize_by_city`: one partial state per city."""
+
+    def __init__(self, relative_accuracy: float = 0.005):
+        self.relative_accuracy = relative_accuracy
+        self.cities = {}  # city -> {"count", "price_sum", "prices"}
+
+    def _state(self, city) -> dict:
+        if city not in self.cities:
+            self.cities[city] = {"count": 0, "price_sum": 0, "prices": QuantileSketch(self.relative_accuracy)}
+        return self.cities[city]
+
+    def update(self, data: list[dict] | HomesFrame):
+        frame = as_frame(data)
+        cities = frame["city"].copy()
+        cities[~frame.present("city")] = "Unknown"
+        codes, uniques = pd.factorize(cities, sort=False)
+        counts = np.bincount(codes, minlength=len(uniques))
+
+        price_mask = frame.present("price")
+        priced_codes = codes[price_mask]
+        prices = frame["price"][price_mask]
+        order = np.argsort(priced_codes, kind="stable")
+        groups = np.split(prices[order], np.cumsum(np.bincount(priced_codes, minlength=len(uniques)))[:-1])
+
+        for city, count, group in zip(uniques, counts, groups):
+            state = self._state(city)
+            state["count"] += int(count)
+            state["price_sum"] += int(group.sum())
+            state["prices"].add(group)
+        return self
+
+    def merge(self, other: "CityAggregator"):
+        for city, theirs in other.cities.items():
+            state = self._state(city)
+            state["count"] += theirs["count"]
+            state["price_sum"] += theirs["price_sum"]
+            state["prices"].merge(theirs["prices"])
+        return self
+
+    def result(self) -> list[dict]:
+        """Same rows as `summarize_by_city`, most listings first."""
+        summary = []
+        for city, state in self.cities.items():
+            priced = state["prices"].count
+            summary.append({
+                "city": city,
+                "count": state["count"],
+                "avg_price": round(state["price_sum"] / priced) if priced else None,
+                "median_price": float(round(state["prices"].quantile(0.5))) if priced else None,
+            })
+
+        return sorted(summary, key=lambda x: x["count"], reverse=True)
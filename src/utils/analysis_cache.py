@@ -0,0 +1,88 @@
+"""In-memory analysis results per dataset, kept across Streamlit reruns and sessions."""
+import hashlib
+import json
+import logging
+import marshal
+import os
+import threading
+from collections import OrderedDict
+
+
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+logger = logging.getLogger(__name__)
+
+
+def dataset_key(homes: list[dict]) -> str:
+    """Content hash of a dataset, for when there's no run id to key it by."""
+    try:
+        # several times faster than JSON; version 2 has no back-references, so equal data gives equal bytes
+        data = marshal.dumps(homes, 2)
+    except ValueError:
+        data = json.dumps(homes, separators=(",", ":"), default=str).encode()
+    return hashlib.sha256(data).hexdigest()
+
+def approx_nbytes(analysis: dict) -> int:
+    """Memory held by an `analyze_frame` result: the columns, indexes & comps, plus chart data and small results."""
+    total = analysis["frame"].nbytes() + analysis["spatial"].nbytes()
+    for key in ("comps", "query"):
+        if key in analysis:
+            total += analysis[key].nbytes()
+    for chart in analysis["charts"].values():
+        for c in chart if isinstance(chart, tuple) else (chart,):
+            total += int(c.data.memory_usage(deep=True).sum())
+    small = {k: v for k, v in analysis.items() if k not in ("frame", "spatial", "query", "comps", "charts")}
+    return total + len(json.dumps(small, default=str))
+
+
+class AnalysisCache:
+    """LRU of analysis results, evicting the least recently shown once over `max_bytes`.
+
+    The entry just put is never evicted, even if it alone is over budget:
+    otherwise every rerun of that dashboard would redo the whole analysis
+    (and stream mode re-stream the dataset).
+
+    Values are handed out as-is (no copy, unlike `st.cache_data`), so callers
+    must treat them as read-only.
+    """
+
+    def __init__(self, max_bytes: int = ANALYSIS_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()  # key -> (analysis, size)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: str, analysis: dict):
+        size = approx_nbytes(analysis)
+        if size > self.max_bytes:
+            logger.warning(
+                "Analysis %s takes %.0f MB, over the %.0f MB cache budget: keeping it alone",
+                key, size / 2**20, self.max_bytes / 2**20,
+            )
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (analysis, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+
+    def discard(self, key: str):
+        with self._lock:
+            self._pop(key)
+
+    def _pop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[1]
@@ -0,0 +1,197 @@
+"""Dataset analyses on one thread pool shared by every session, so no Streamlit script run computes them."""
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from utils import instrument
+
+
+# threads: results hold frames, indexes & charts that would cost more to pickle back than to build
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS") or min(4, os.cpu_count() or 1))
+# analyses waiting for a worker before new ones are turned away
+ANALYSIS_QUEUE_DEPTH = int(os.getenv("ANALYSIS_QUEUE_DEPTH") or 16)
+# finished analyses nobody picked up (closed tabs) are dropped after this long
+FINISHED_TASK_TTL_SECONDS = 10 * 60
+TIMING_SAMPLES = 500
+
+Sections = Callable[[], Iterator[tuple[str, dict]]]
+
+
+class QueueFull(RuntimeError):
+    """Every worker is busy and `queue_depth` analyses are already waiting."""
+
+
+@dataclass
+class AnalysisTask:
+    """One analysis. `sections` fills in as `parts` of the result come in; `done` is set once it stops.
+
+    `status` is QUEUED, RUNNING, DONE, FAILED or CANCELLED; `analysis` holds
+    every part so far, merged. Sessions showing it are in `sessions`: the
+    task is cancelled (if still going) and dropped when the last one leaves.
+    """
+    key: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "QUEUED"
+    sections: list[str] = field(default_factory=list)
+    analysis: dict = field(default_factory=dict)
+    error: str | None = None
+    submitted: float = field(default_factory=time.time)
+    started: float | None = None
+    finished: float | None = None
+    done: threading.Event = field(default_factory=threading.Event)
+    cancelled: threading.Event = field(default_factory=threading.Event)
+    sessions: set[str] = field(default_factory=set)
+    future: Future | None = None
+
+
+class AnalysisExecutor:
+    """Runs `sections()` generators on `workers` threads, with at most `queue_depth` waiting.
+
+    Submitting a key that is already queued or running attaches the session
+    to that task. A session follows one task at a time: submitting another
+    key (or `cancel_session`, on a new search) leaves its previous one.
+    Cancellation is checked between sections.
+    """
+
+    def __init__(self, workers: int = ANALYSIS_WORKERS, queue_depth: int = ANALYSIS_QUEUE_DEPTH):
+        self.queue_depth = queue_depth
+        self.pool = ThreadPoolExecutor(max(workers, 1), thread_name_prefix="analysis")
+        self.tasks = {}  # key -> task
+        self._sessions = {}  # session id -> key
+        self._counts = {"submitted": 0, "done": 0, "failed": 0, "cancelled": 0, "rejected": 0}
+        self._waits = deque(maxlen=TIMING_SAMPLES)
+        self._runs = deque(maxlen=TIMING_SAMPLES)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> AnalysisTask | None:
+        return self.tasks.get(key)
+
+    def submit(self, key: str, session_id: str, sections: Sections) -> AnalysisTask:
+        """The task of `key`, started with `sections` unless one is already there; raises QueueFull."""
+        with self._lock:
+            self._prune()
+            task = self.tasks.get(key)
+            # a failed or cancelled analysis is run afresh, as a new submission would be
+            if task is not None and task.status in ("FAILED", "CANCELLED"):
+                self._drop(task)
+                task = None
+            if task is None:
+                if sum(t.status == "QUEUED" for t in self.tasks.values()) >= self.queue_depth:
+                    self._counts["rejected"] += 1
+                    raise QueueFull(f"{self.queue_depth} analyses are already waiting")
+                task = self.tasks[key] = AnalysisTask(key)
+                self._counts["submitted"] += 1
+                task.future = self.pool.submit(self._run, task, sections)
+            self._follow(session_id, task)
+            return task
+
+    def forget(self, key: str, session_id: str):
+        """Detach `session_id` from `key`'s task; cancel & drop it once no session is left."""
+        with self._lock:
+            if self._sessions.get(session_id) == key:
+                del self._sessions[session_id]
+            task = self.tasks.get(key)
+            if task is not None:
+                task.sessions.discard(session_id)
+                if not task.sessions:
+                    self._cancel(task)
+                    self._drop(task)
+
+    def cancel_session(self, session_id: str):
+        """The session moved on (new search): leave the task it was following."""
+        key = self._sessions.get(session_id)
+        if key is not None:
+            self.forget(key, session_id)
+
+    def metrics(self) -> dict:
+        """Task counts, queue depth and running tasks, plus p50/p95 queue wait & run time."""
+        with self._lock:
+            waits, runs = sorted(self._waits), sorted(self._runs)
+            statuses = [t.status for t in self.tasks.values()]
+            counts = dict(self._counts)
+
+        def percentile_ms(samples: list[float], q: float) -> float | None:
+            if not samples:
+                return None
+            return round(samples[min(int(q * len(samples)), len(samples) - 1)] * 1000, 1)
+
+        return {
+            **counts,
+            "queued": statuses.count("QUEUED"),
+            "running": statuses.count("RUNNING"),
+            "wait_p50_ms": percentile_ms(waits, 0.5), "wait_p95_ms": percentile_ms(waits, 0.95),
+            "run_p50_ms": percentile_ms(runs, 0.5), "run_p95_ms": percentile_ms(runs, 0.95),
+        }
+
+    def close(self):
+        for task in list(self.tasks.values()):
+            self._cancel(task)
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def _follow(self, session_id: str, task: AnalysisTask):
+        previous = self._sessions.get(session_id)
+        if previous is not None and previous != task.key:
+            old = self.tasks.get(previous)
+            if old is not None:
+                old.sessions.discard(session_id)
+                if not old.sessions:
+                    self._cancel(old)
+                    self._drop(old)
+        self._sessions[session_id] = task.key
+        task.sessions.add(session_id)
+
+    def _cancel(self, task: AnalysisTask):
+        if task.done.is_set():
+            return
+        task.cancelled.set()
+        if task.future is not None and task.future.cancel():
+            # never started: the worker won't get to mark it
+            self._finish(task, "CANCELLED")
+
+    def _drop(self, task: AnalysisTask):
+        if self.tasks.get(task.key) is task:
+            del self.tasks[task.key]
+
+    def _prune(self):
+        cutoff = time.time() - FINISHED_TASK_TTL_SECONDS
+        for task in [t for t in self.tasks.values() if t.finished and t.finished < cutoff]:
+            self._drop(task)
+
+    def _finish(self, task: AnalysisTask, status: str, error: str | None = None):
+        task.status = status
+        task.error = error
+        task.finished = time.time()
+        self._counts[status.lower()] += 1
+        task.done.set()
+
+    def _run(self, task: AnalysisTask, sections: Sections):
+        task.started = time.time()
+        wait = task.started - task.submitted
+        task.status = "RUNNING"
+        instrument.record("analysis_queue_wait", wait)
+        last = time.perf_counter()
+        try:
+            for name, parts in sections():
+                if task.cancelled.is_set():
+                    break
+                now = time.perf_counter()
+                instrument.record(f"analysis_section_{name}", now - last)
+                last = now
+                task.analysis = {**task.analysis, **parts}
+                task.sections = [*task.sections, name]
+        except Exception as e:
+            status, error = "FAILED", f"{type(e).__name__}: {e}"
+        else:
+            status, error = ("CANCELLED", None) if task.cancelled.is_set() else ("DONE", None)
+
+        run = time.time() - task.started
+        instrument.record("analysis_run", run)
+        with self._lock:
+            self._waits.append(wait)
+            self._runs.append(run)
+            self._finish(task, status, error)
@@ -0,0 +1,272 @@
+"""Headless analysis of scraped datasets, for cron jobs & backfills: no Streamlit, no browser.
+
+Reads raw Apify dataset exports (JSON arrays or NDJSON, files or directories
+of them) and normalizes them on a process pool: NDJSON files in byte
+ranges of `CHUNK_BYTES`, so one big export spreads over every worker, and
+JSON arrays a file per task, decoded item by item. Workers hand back
+columns, never dicts. Then the dashboard's engine (`analyze_frame`,
+without charts or indexes) runs over all of them and KPIs & rankings are
+written as JSON and Parquet. Throughput goes to stderr.
+
+Run from src/:  python -m utils.analyze ../exports/ --out ../analysis [--workers 4] [--max-price 500000]
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils import instrument
+from utils.data_analysis import analyze_frame
+from utils.homes_frame import HomesFrame
+from utils.instrument import stage
+from utils.normalize import normalize_frame
+
+
+INPUT_SUFFIXES = (".json", ".jsonl", ".ndjson")
+LINE_SUFFIXES = (".jsonl", ".ndjson")
+ANALYZE_WORKERS = int(os.getenv("ANALYZE_WORKERS") or os.cpu_count() or 1)
+# NDJSON bytes per pool task, and raw items held at once before they're normalized to columns
+CHUNK_BYTES = int(os.getenv("ANALYZE_CHUNK_BYTES") or 32 * 1024 * 1024)
+BATCH_ITEMS = 20_000
+READ_BLOCK = 1024 * 1024
+
+_ARRAY_GAP = re.compile(r"[\s,]*")
+
+
+def find_inputs(paths: list[str]) -> list[str]:
+    """`paths` with every directory replaced by its dataset files, sorted, duplicates dropped."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(f for f in glob.glob(os.path.join(path, "*")) if f.endswith(INPUT_SUFFIXES))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            raise FileNotFoundError(f"No such file or directory: {path}")
+    return list(dict.fromkeys(files))
+
+def iter_array(f, block: int = READ_BLOCK):
+    """Items of a JSON array read from text file `f` a block at a time, without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buf = f.read(block).lstrip()
+    if not buf.startswith("["):
+        raise ValueError("expected a JSON array of items")
+    pos, eof = 1, False
+    while True:
+        pos = _ARRAY_GAP.match(buf, pos).end()
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            item, end = None, None
+        # an item only counts once something follows it: a number may go on in the next block
+        if end is None or (end == len(buf) and not eof):
+            if eof:
+                raise ValueError(f"invalid JSON array near character {pos}")
+            more = f.read(block)
+            eof = not more
+            buf, pos = buf[pos:] + more, 0
+            continue
+        yield item
+        pos = end
+        if pos > block:
+            buf, pos = buf[pos:], 0
+
+def read_range(path: str, start: int, end: int | None):
+    """Raw items of one NDJSON byte range: the lines that start in [start, end)."""
+    with open(path, "rb") as f:
+        if start:
+            # the line running across `start` belongs to the previous range
+            f.seek(start - 1)
+            f.readline()
+        pos = f.tell()
+        for line in f:
+            if end is not None and pos >= end:
+                return
+            pos += len(line)
+            if line.strip():
+                yield json.loads(line)
+
+def read_items(path: str, start: int = 0, end: int | None = None):
+    """Raw scraper items of one export (or NDJSON byte range): a JSON array, or one item per line."""
+    if path.endswith(LINE_SUFFIXES):
+        yield from read_range(path, start, end)
+        return
+    with open(path, encoding="utf-8") as f:
+        yield from iter_array(f)
+
+def plan_chunks(files: list[str], chunk_bytes: int = CHUNK_BYTES) -> list[tuple[str, int, int | None]]:
+    """(path, start, end) pool tasks: NDJSON files split every `chunk_bytes`, JSON arrays whole."""
+    chunks = []
+    for path in files:
+        size = os.path.getsize(path) if path.endswith(LINE_SUFFIXES) else 0
+        starts = range(0, size, chunk_bytes) if size > chunk_bytes else [0]
+        chunks += [(path, start, start + chunk_bytes if size > chunk_bytes else None) for start in starts]
+    return chunks
+
+def load_chunk(chunk: tuple[str, int, int | None]) -> tuple[HomesFrame, int, int, Counter, str | None]:
+    """(normalized homes, raw items, skipped, price failures, error) of one pool task.
+
+    Items are normalized `BATCH_ITEMS` at a time, so a worker holds one
+    batch of raw dicts plus columns. An unreadable export comes back empty
+    with the reason, so one bad file doesn't sink a whole backfill.
+    """
+    frames, count, skipped, failures = [], 0, 0, Counter()
+    batch = []
+    try:
+        for item in read_items(*chunk):
+            batch.append(item)
+            if len(batch) == BATCH_ITEMS:
+                homes, dropped = normalize_frame(batch, failures)
+                frames.append(homes)
+                count, skipped, batch = count + len(batch), skipped + len(dropped), []
+        homes, dropped = normalize_frame(batch, failures)
+        frames.append(homes)
+        count, skipped = count + len(batch), skipped + len(dropped)
+    except (OSError, ValueError) as e:
+        return HomesFrame.from_records([]), 0, 0, Counter(), str(e)
+    return HomesFrame.concat(frames), count, skipped, failures, None
+
+def drop_duplicates(frame: HomesFrame) -> HomesFrame:
+    """One row per zpid, the first one read; homes without a zpid are all kept."""
+    zpid = frame["zpid"]
+    has_zpid = frame.present("zpid")
+    first = ~pd.Series(zpid).duplicated().to_numpy()
+    keep = np.flatnonzero(first | ~has_zpid)
+    return frame if keep.size == len(frame) else frame.take(keep)
+
+def analyze_files(
+    files: list[str],
+    workers: int = ANALYZE_WORKERS,
+    user_max_price: int | None = None,
+    limit: int = 5,
+    dedupe: bool = True,
+) -> tuple[dict, dict]:
+    """(`analyze_frame` result, counts) over every export in `files`.
+
+    counts: files, failed ({path: reason}), items read, skipped by
+    normalization, price_failures (homes priced 0, per reason), normalized,
+    and homes analyzed (after `drop_duplicates`).
+    """
+    chunks = plan_chunks(files)
+    with stage("load_exports", rows=len(chunks)):
+        if workers > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(min(workers, len(chunks))) as pool:
+                loaded = list(pool.map(load_chunk, chunks))
+        else:
+            loaded = [load_chunk(chunk) for chunk in chunks]
+
+    # a file with one unreadable chunk counts as failed, like a file read whole would
+    failed = {}
+    for (path, *_), (*_, error) in zip(chunks, loaded):
+        if error and path not in failed:
+            failed[path] = error
+    loaded = [result for (path, *_), result in zip(chunks, loaded) if path not in failed]
+
+    frame = HomesFrame.concat([homes for homes, *_ in loaded])
+    counts = {
+        "files": len(files),
+        "failed": failed,
+        "items": sum(items for _, items, *_ in loaded),
+        "skipped": sum(skipped for _, _, skipped, *_ in loaded),
+        "price_failures": dict(sum((failures for *_, failures, _ in loaded), Counter())),
+        "normalized": len(frame),
+    }
+    if dedupe:
+        frame = drop_duplicates(frame)
+    counts["homes"] = len(frame)
+
+    return analyze_frame(frame, user_max_price=user_max_price, limit=limit, charts=False, indexes=False), counts
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+def write_outputs(analysis: dict, counts: dict, out_dir: str) -> list[str]:
+    """Write summary.json plus homes, rankings & city stats as Parquet; return the paths written."""
+    import pyarrow.parquet as pq
+
+    from utils.run_store import frame_table
+
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {name: os.path.join(out_dir, name) for name in (
+        "summary.json", "homes.parquet", "rankings.parquet", "city_stats.parquet",
+    )}
+
+    with open(paths["summary.json"], "w", encoding="utf-8") as f:
+        json.dump({
+            **counts,
+            "kpis": analysis["kpis"],
+            "rankings": analysis["rankings"],
+            "city_stats": analysis["city_stats"],
+            "beds": analysis["beds"],
+            "baths": analysis["baths"],
+        }, f, indent=2, default=_json_default)
+
+    pq.write_table(frame_table(analysis["frame"]), paths["homes.parquet"])
+    rankings = pd.DataFrame([
+        {"ranking": name, "rank": rank, **home}
+        for name, homes in analysis["rankings"].items()
+        for rank, home in enumerate(homes, 1)
+    ])
+    rankings.to_parquet(paths["rankings.parquet"], index=False)
+    pd.DataFrame(analysis["city_stats"]).to_parquet(paths["city_stats.parquet"], index=False)
+
+    return list(paths.values())
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m utils.analyze", description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+", help=f"dataset exports ({', '.join(INPUT_SUFFIXES)}) or directories of them")
+    parser.add_argument("--out", default="analysis", help="output directory (default: ./analysis)")
+    parser.add_argument("--workers", type=int, default=ANALYZE_WORKERS, help="normalizing processes (default: cpu count)")
+    parser.add_argument("--max-price", type=int, help="budget, for the share of homes within it")
+    parser.add_argument("--limit", type=int, default=5, help="homes per ranking (default: 5)")
+    parser.add_argument("--keep-duplicates", action="store_true", help="don't drop homes seen in an earlier file (same zpid)")
+    args = parser.parse_args(argv)
+
+    try:
+        files = find_inputs(args.paths)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+    if not files:
+        parser.error(f"no {'/'.join(INPUT_SUFFIXES)} files in {', '.join(args.paths)}")
+
+    instrument.enable()
+    start = time.perf_counter()
+    analysis, counts = analyze_files(
+        files, workers=args.workers, user_max_price=args.max_price, limit=args.limit, dedupe=not args.keep_duplicates,
+    )
+    written = write_outputs(analysis, counts, args.out)
+    seconds = time.perf_counter() - start
+
+    log = sys.stderr
+    print(
+        f"{counts['files']} files, {counts['items']:,} items -> {counts['homes']:,} homes "
+        f"({counts['skipped']:,} skipped, {counts['normalized'] - counts['homes']:,} duplicates) "
+        f"in {seconds:.2f} s: {counts['items'] / seconds:,.0f} items/s with {args.workers} workers",
+        file=log,
+    )
+    if counts["price_failures"]:
+        reasons = ", ".join(f"{count:,} {reason}" for reason, count in counts["price_failures"].items())
+        print(f"unparseable prices (priced 0): {reasons}", file=log)
+    for path, error in counts["failed"].items():
+        print(f"failed {path}: {error}", file=log)
+    for name, stats in sorted(instrument.snapshot()["stages"].items(), key=lambda kv: -kv[1]["seconds"]):
+        print(f"  {name:<28}{stats['seconds']:>8.3f} s", file=log)
+    for path in written:
+        print(f"wrote {path}", file=log)
+    return 1 if len(counts["failed"]) == len(files) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""Page through an Apify run's dataset while the run is still going."""
+import json
+import os
+import time
+
+import requests
+
+from utils.http_client import HttpClient
+
+
+APIFY_API = "https://api.apify.com/v2"
+PAGE_SIZE = 1000
+POLL_SECONDS = 5
+TERMINAL_STATUSES = {"SUCCEEDED", "FAILED", "ABORTED", "TIMED-OUT"}
+
+
+def iter_jsonl(response: requests.Response):
+    """Decode an NDJSON response one line at a time, never holding the whole body."""
+    for line in response.iter_lines():
+        if line:
+            yield json.loads(line)
+
+def get_run_status(client: HttpClient, run_id: str, token: str) -> str:
+    response = client.get("apify_poll", f"{APIFY_API}/actor-runs/{run_id}", params={"token": token})
+    return response.json()["data"]["status"]
+
+def iter_dataset_pages(
+    dataset_id: str,
+    run_id: str | None = None,
+    page_size: int = PAGE_SIZE,
+    poll_seconds: float = POLL_SECONDS,
+    token: str | None = None,
+    client: HttpClient | None = None,
+):
+    """Yield lists of raw dataset items, `page_size` at a time.
+
+    When `run_id` is given the run may still be scraping: short pages are
+    re-polled until the run reaches a terminal status. Pass the app's shared
+    `client` to reuse its pooled connections.
+    """
+    token = token or os.getenv("APIFY_TOKEN")
+    offset = 0
+
+    own_client = client is None
+    client = client or HttpClient()
+    try:
+        while True:
+            # status first: anything pushed before a finished status is in the page read after it
+            status = get_run_status(client, run_id, token) if run_id else "SUCCEEDED"
+
+            params = {"token": token, "offset": offset, "limit": page_size, "format": "jsonl", "clean": "true"}
+            url = f"{APIFY_API}/datasets/{dataset_id}/items"
+            with client.get("apify_items", url, params=params, stream=True, timeout=(5, 60)) as response:
+                page = list(iter_jsonl(response))
+
+            if page:
+                offset += len(page)
+                yield page
+                if len(page) == page_size:
+                    continue
+
+            if status in TERMINAL_STATUSES:
+                if status != "SUCCEEDED":
+                    raise RuntimeError(f"Unable to fetch data. The actor run was interrupted with status '{status}'.")
+                return
+
+            time.sleep(poll_seconds)
+    finally:
+        if own_client:
+            client.close()
@@ -0,0 +1,99 @@
+"""Chart data aggregated on the server, so what reaches the browser is bounded by a point budget.
+
+A Vega chart ships every row of its data as JSON; past a few thousand
+points that, not the drawing, is what stalls the page. These helpers
+reduce columns to at most `budget` marks whatever the row count.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+
+CHART_POINT_BUDGET = int(os.getenv("CHART_POINT_BUDGET", 2000))
+# grid ranges stop at these quantiles, so a few extreme listings don't squash everything else
+CLIP_QUANTILES = (0.005, 0.995)
+
+
+def _finite_pairs(x, y) -> tuple[np.ndarray, np.ndarray]:
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    ok = np.isfinite(x) & np.isfinite(y)
+    return x[ok], y[ok]
+
+def grid_bins(x, y, budget: int = CHART_POINT_BUDGET) -> pd.DataFrame:
+    """Count points per cell of an at most `budget`-cell grid; one row per non-empty cell.
+
+    Columns: x0, x1, y0, y1 (cell edges) and count. Values beyond
+    `CLIP_QUANTILES` are counted in the edge cells.
+    """
+    x, y = _finite_pairs(x, y)
+    if not x.size:
+        return pd.DataFrame(columns=["x0", "x1", "y0", "y1", "count"])
+
+    side = max(1, int(np.sqrt(budget)))
+    x_range, y_range = np.quantile(x, CLIP_QUANTILES), np.quantile(y, CLIP_QUANTILES)
+    x, y = np.clip(x, *x_range), np.clip(y, *y_range)
+    # a column of equal values still gets a (tiny) non-empty range
+    x_range = (x_range[0], x_range[1] if x_range[1] > x_range[0] else x_range[0] + 1)
+    y_range = (y_range[0], y_range[1] if y_range[1] > y_range[0] else y_range[0] + 1)
+
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=side, range=(x_range, y_range))
+    ix, iy = np.nonzero(counts)
+    return pd.DataFrame({
+        "x0": x_edges[ix], "x1": x_edges[ix + 1],
+        "y0": y_edges[iy], "y1": y_edges[iy + 1],
+        "count": counts[ix, iy].astype(np.int64),
+    })
+
+def lttb(x, y, budget: int = CHART_POINT_BUDGET) -> tuple[np.ndarray, np.ndarray]:
+    """Largest-Triangle-Three-Buckets: `budget` points of an x-sorted series that keep its shape.
+
+    First and last points are kept; from each of the buckets in between,
+    the point forming the largest triangle with the previously kept point
+    and the next bucket's average.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = x.size
+    if budget >= n or budget < 3:
+        return x, y
+
+    every = (n - 2) / (budget - 2)
+    keep = np.empty(budget, dtype=np.intp)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(budget - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        if next_end <= end:
+            avg_x, avg_y = x[-1], y[-1]
+        else:
+            avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return x[keep], y[keep]
+
+def median_series(x, y, budget: int = CHART_POINT_BUDGET) -> pd.DataFrame:
+    """Median `y` per distinct `x` (e.g. price per days listed), LTTB-downsampled to `budget` points.
+
+    Columns: x, y (the median) and count (points behind each median).
+    """
+    x, y = _finite_pairs(x, y)
+    if not x.size:
+        return pd.DataFrame(columns=["x", "y", "count"])
+
+    grouped = pd.Series(y).groupby(x).agg(["median", "count"])
+    xs, ys = grouped.index.to_numpy(dtype=np.float64), grouped["median"].to_numpy()
+    if xs.size > budget:
+        kept_x, _ = lttb(xs, ys, budget)
+        grouped = grouped.loc[kept_x]
+    return pd.DataFrame({"x": grouped.index, "y": grouped["median"].to_numpy(), "count": grouped["count"].to_numpy()})
+
+def scatter_or_grid(x, y, budget: int = CHART_POINT_BUDGET) -> tuple[str, pd.DataFrame]:
+    """("points", x/y rows) when they fit the budget, else ("grid", `grid_bins`)."""
+    x, y = _finite_pairs(x, y)
+    if x.size <= budget:
+        return "points", pd.DataFrame({"x": x, "y": y})
+    return "grid", grid_bins(x, y, budget)
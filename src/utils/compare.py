@@ -0,0 +1,130 @@
+"""Several stored runs side by side: KPIs, city stats, price buckets & price per bedroom of each, in one grouped pass."""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.data_analysis import bucket_index, bucket_labels
+from utils.homes_frame import py_number
+from utils.instrument import stage, timed
+from utils.run_store import RunStore
+
+
+COMPARE_WORKERS = int(os.getenv("COMPARE_WORKERS") or min(8, os.cpu_count() or 1))
+
+
+def _load(store: RunStore, run_id: str) -> dict | None:
+    """The columns a comparison reads, with missing values marked once (runs on a pool thread)."""
+    frame = store.load(run_id)
+    if frame is None:
+        return None
+    city = frame["city"].copy()
+    city[~frame.present("city")] = "Unknown"
+    return {
+        "price": frame["price"],
+        "has_price": frame.present("price"),
+        "beds": frame["beds"],
+        "has_beds": frame.present("beds"),
+        "city": city,
+    }
+
+
+@timed()
+def compare_runs(store: RunStore, run_ids: list[str], num_buckets: int = 5, workers: int = COMPARE_WORKERS) -> dict:
+    """Per-run aggregates of `run_ids`, directly comparable.
+
+    Runs are mapped from the store on a pool of `workers` threads, then
+    stacked with a run code per row, so every aggregate is one grouped pass
+    over all rows instead of a full analysis per run. Price buckets share
+    their edges (the min & max over every run), so the histograms line up.
+
+    Returns `runs` (count, avg/median/min/max price, avg price per bedroom,
+    by run, in `run_ids` order), `price_buckets` ({run_id: {label: count}}),
+    `city_stats` (run_id, city, count, avg & median price rows, biggest
+    cities first within each run) and `missing` (run ids not in the store).
+    """
+    with stage("compare_load", rows=len(run_ids)), ThreadPoolExecutor(max(workers, 1)) as pool:
+        loaded = list(pool.map(lambda run_id: _load(store, run_id), run_ids))
+    missing = [run_id for run_id, columns in zip(run_ids, loaded) if columns is None]
+    run_ids = [run_id for run_id, columns in zip(run_ids, loaded) if columns is not None]
+    loaded = [columns for columns in loaded if columns is not None]
+    if not loaded:
+        return {"runs": [], "price_buckets": {}, "city_stats": [], "missing": missing}
+
+    sizes = np.array([len(columns["price"]) for columns in loaded])
+    with stage("compare_stack", rows=int(sizes.sum())):
+        run = np.repeat(np.arange(len(loaded)), sizes)
+        stacked = {key: np.concatenate([columns[key] for columns in loaded]) for key in loaded[0]}
+
+    with stage("compare_aggregate", rows=int(sizes.sum())):
+        n_runs = len(loaded)
+        has_price = stacked["has_price"]
+        price, price_run = stacked["price"][has_price], run[has_price]
+        counts = np.bincount(run, minlength=n_runs)
+        priced = np.bincount(price_run, minlength=n_runs)
+        sums = np.bincount(price_run, weights=price, minlength=n_runs)
+        by_run = pd.Series(price).groupby(price_run).agg(["median", "min", "max"]).reindex(range(n_runs))
+
+        # price per bedroom: one (run, beds) group per pair
+        both = has_price & stacked["has_beds"]
+        beds_codes, beds_values = pd.factorize(stacked["beds"][both], sort=True)
+        pair = run[both] * len(beds_values) + beds_codes
+        bed_sums = np.bincount(pair, weights=stacked["price"][both], minlength=n_runs * len(beds_values))
+        bed_counts = np.bincount(pair, minlength=n_runs * len(beds_values))
+        bed_sums = bed_sums.reshape(n_runs, -1)
+        bed_counts = bed_counts.reshape(n_runs, -1)
+
+        # shared bucket edges, so bucket i covers the same prices in every run
+        buckets = {}
+        if price.size:
+            mn, mx = price.min().item(), price.max().item()
+            labels = bucket_labels(mn, mx, num_buckets)
+            cell = price_run * num_buckets + bucket_index(price, mn, mx, num_buckets)
+            grid = np.bincount(cell, minlength=n_runs * num_buckets).reshape(n_runs, num_buckets)
+            for run_id, row in zip(run_ids, grid.tolist()):
+                buckets[run_id] = dict.fromkeys(labels, 0)
+                # labels can collide when the range is tiny, so add counts rather than assign
+                for label, count in zip(labels, row):
+                    buckets[run_id][label] += count
+
+        # city stats: (run, city) groups over every row, prices over the priced ones
+        city_codes, cities = pd.factorize(stacked["city"], sort=False)
+        group = run * len(cities) + city_codes
+        group_counts = np.bincount(group, minlength=n_runs * len(cities))
+        city_prices = (
+            pd.Series(price).groupby(group[has_price]).agg(["sum", "count", "median"])
+            .reindex(range(n_runs * len(cities)))
+        )
+
+    runs = []
+    for i, run_id in enumerate(run_ids):
+        has_prices = priced[i] > 0
+        runs.append({
+            "run_id": run_id,
+            "count": int(counts[i]),
+            "avg_price": round(sums[i] / priced[i]) if has_prices else 0,
+            "median_price": int(by_run["median"].iloc[i]) if has_prices else 0,
+            "min_price": int(by_run["min"].iloc[i]) if has_prices else 0,
+            "max_price": int(by_run["max"].iloc[i]) if has_prices else 0,
+            "avg_price_per_bedroom": {
+                py_number(beds_values[b]): round(bed_sums[i, b] / bed_counts[i, b])
+                for b in np.flatnonzero(bed_counts[i])
+            },
+        })
+
+    city_stats = []
+    present = np.flatnonzero(group_counts)
+    # by run (in `run_ids` order), then biggest city first, first seen first among equals
+    for g in present[np.lexsort((present, -group_counts[present], present // len(cities)))]:
+        stats = city_prices.iloc[g]
+        has_prices = stats["count"] > 0
+        city_stats.append({
+            "run_id": run_ids[g // len(cities)],
+            "city": cities[g % len(cities)],
+            "count": int(group_counts[g]),
+            "avg_price": round(float(stats["sum"]) / int(stats["count"])) if has_prices else None,
+            "median_price": float(stats["median"]) if has_prices else None,
+        })
+
+    return {"runs": runs, "price_buckets": buckets, "city_stats": city_stats, "missing": missing}
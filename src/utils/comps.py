@@ -0,0 +1,215 @@
+"""Comparable homes: for every listing, its k most similar homes nearby, a comp-based estimate and discounts."""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from utils.homes_frame import HomesFrame
+from utils.instrument import timed
+from utils.spatial import MILES_PER_DEGREE
+
+
+COMP_K = 5
+# fewer comps than this and a home gets no estimate
+MIN_COMPS = 3
+# blocking cell, ~1.4 miles north-south; comps come from a home's cell and the 8 around it
+COMP_CELL_DEGREES = 0.02
+# comps are at most this far away, and at most this much bigger or smaller
+COMP_MAX_MILES = 1.0
+COMP_MAX_SQFT_RATIO = 1.5
+# similarity = miles / COMP_MILE_SCALE + |log(sqft ratio)| / COMP_SQFT_SCALE: 1 mile weighs like 25% more sqft
+COMP_MILE_SCALE = 1.0
+COMP_SQFT_SCALE = np.log(1.25)
+# bands: 0-5+ beds, 1-4+ whole baths
+MAX_BEDS_BAND = 5
+MAX_BATHS_BAND = 4
+# subject x candidate scores computed per batch, bounding memory in dense cells
+BATCH_CELLS = 1_000_000
+
+
+@dataclass
+class Comparables:
+    """Per frame row: `neighbors` (row indices, -1 = none) and their `distances` (miles), most similar first.
+
+    `estimate` is the comps' median $/sqft times the home's sqft (NaN with
+    fewer than `MIN_COMPS` comps). `discount` and `zestimate_discount` are
+    1 - price / estimate and 1 - price / zestimate: above 0 the home is
+    listed below its comps / its Zestimate.
+    """
+    neighbors: np.ndarray
+    distances: np.ndarray
+    estimate: np.ndarray
+    discount: np.ndarray
+    zestimate_discount: np.ndarray
+
+    def __len__(self):
+        return len(self.estimate)
+
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.neighbors, self.distances, self.estimate, self.discount, self.zestimate_discount))
+
+    def comps_of(self, row: int) -> np.ndarray:
+        """Rows of `row`'s comps, most similar first."""
+        neighbors = self.neighbors[row]
+        return neighbors[neighbors >= 0]
+
+
+def _neighbour_blocks(band: np.ndarray, cell_lat: np.ndarray, cell_lng: np.ndarray):
+    """Blocks of homes by (band, cell), and for each block the blocks of its 3x3 cell neighbourhood.
+
+    Returns the homes' sort order, each block's [start, end) into it, and a
+    (blocks, 9) array of neighbour block ids (-1 = empty cell). Blocks with a
+    negative band have only themselves as neighbour.
+    """
+    order = np.lexsort((cell_lng, cell_lat, band))
+    band, cell_lat, cell_lng = band[order], cell_lat[order], cell_lng[order]
+    new_block = np.r_[True, (band[1:] != band[:-1]) | (cell_lat[1:] != cell_lat[:-1]) | (cell_lng[1:] != cell_lng[:-1])]
+    starts = np.flatnonzero(new_block)
+    ends = np.r_[starts[1:], order.size]
+    band, cell_lat, cell_lng = band[starts], cell_lat[starts], cell_lng[starts]
+
+    # one sortable int per (band, cell), with a margin of one cell on each side
+    lat0, lng0 = cell_lat.min(initial=0) - 1, cell_lng.min(initial=0) - 1
+    n_lat, n_lng = int(cell_lat.max(initial=0) - lat0) + 2, int(cell_lng.max(initial=0) - lng0) + 2
+    band0 = band.min(initial=0)
+
+    def encode(b, y, x):
+        return ((b - band0) * n_lat + (y - lat0)) * n_lng + (x - lng0)
+
+    codes = encode(band, cell_lat, cell_lng)  # sorted, like the blocks
+    neighbours = np.full((starts.size, 9), -1, dtype=np.int64)
+    for slot, (dy, dx) in enumerate((dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1)):
+        wanted = encode(band, cell_lat + dy, cell_lng + dx)
+        found = np.minimum(np.searchsorted(codes, wanted), codes.size - 1)
+        hit = codes[found] == wanted
+        if (dy, dx) != (0, 0):
+            hit &= band >= 0
+        neighbours[hit, slot] = found[hit]
+    return order, starts, ends, neighbours
+
+
+@timed()
+def comparables(frame: HomesFrame, k: int = COMP_K, cell_degrees: float = COMP_CELL_DEGREES) -> Comparables:
+    """Comps of every home with a price, sqft, beds & baths, within its beds/baths band.
+
+    Homes are blocked by (band, geo cell), so each home is only scored
+    against the homes of its 3x3 cell neighbourhood instead of against every
+    other home; all (home, candidate) pairs are scored at once in batched
+    NumPy, without a python loop per home or per block. Homes without
+    coordinates are blocked by zip code instead, and compared on size alone.
+    """
+    n = len(frame)
+    neighbors = np.full((n, k), -1, dtype=np.int32)
+    distances = np.full((n, k), np.nan, dtype=np.float32)
+
+    sqft = frame["sqft"].astype(np.float64)
+    beds, baths = frame["beds"], frame["baths"]
+    lat, lng = frame["lat"], frame["lng"]
+    with np.errstate(invalid="ignore"):
+        usable = frame.present("price") & (sqft > 0) & np.isfinite(beds) & np.isfinite(baths)
+    geo = usable & np.isfinite(lat) & np.isfinite(lng)
+    # no coordinates: a zip code stands in for the cell
+    zip_only = usable & ~geo & frame.present("zip")
+    rows = np.flatnonzero(geo | zip_only)
+    if not rows.size:
+        return _comparables(frame, neighbors, distances)
+
+    band = np.clip(beds[rows], 0, MAX_BEDS_BAND) * MAX_BATHS_BAND + np.clip(np.floor(baths[rows]), 1, MAX_BATHS_BAND) - 1
+    is_geo = geo[rows]
+    with np.errstate(invalid="ignore"):
+        cell_lat = np.floor(lat[rows] / cell_degrees)
+        cell_lng = np.floor(lng[rows] / cell_degrees)
+    # zip blocks: a negative band keeps them out of every geo neighbourhood, the zip's code is the cell
+    band = np.where(is_geo, band, -1 - band).astype(np.int64)
+    cell_lat = np.where(is_geo, cell_lat, pd.factorize(frame["zip"][rows])[0]).astype(np.int64)
+    cell_lng = np.where(is_geo, cell_lng, 0).astype(np.int64)
+
+    order, starts, ends, neighbour_blocks = _neighbour_blocks(band, cell_lat, cell_lng)
+    sorted_rows = rows[order]
+    block_of = np.repeat(np.arange(starts.size), ends - starts)
+    log_sqft = np.log(sqft)
+    max_log_ratio = np.log(COMP_MAX_SQFT_RATIO)
+    # within a mile or so the earth is flat: degrees apart times miles per degree, a longitude
+    # degree shrunk by the home's latitude; homes without coordinates are only paired with
+    # each other, at 0 miles
+    lat_deg, lng_deg = np.where(geo, lat, 0), np.where(geo, lng, 0)
+    lng_miles_per_degree = MILES_PER_DEGREE * np.cos(np.radians(lat_deg))
+
+    # (home, neighbour block) entries, home-major; each expands into one pair per home of the block
+    entry_home, slot = np.nonzero(neighbour_blocks[block_of] >= 0)
+    entry_block = neighbour_blocks[block_of[entry_home], slot]
+    entry_pairs = ends[entry_block] - starts[entry_block]
+    pairs_per_home = np.bincount(entry_home, weights=entry_pairs, minlength=sorted_rows.size)
+    # batches of whole homes, about BATCH_CELLS pairs each
+    cuts = np.searchsorted(np.cumsum(pairs_per_home), np.arange(BATCH_CELLS, pairs_per_home.sum(), BATCH_CELLS))
+    home_bounds = np.unique(np.r_[0, cuts + 1, sorted_rows.size])
+    entry_bounds = np.searchsorted(entry_home, home_bounds)
+
+    for e0, e1 in zip(entry_bounds[:-1], entry_bounds[1:]):
+        lengths = entry_pairs[e0:e1]
+        first = starts[entry_block[e0:e1]]
+        offsets = np.cumsum(lengths) - lengths
+        subject = sorted_rows[np.repeat(entry_home[e0:e1], lengths)]
+        candidate = sorted_rows[np.repeat(first - offsets, lengths) + np.arange(lengths.sum())]
+
+        size_gap = np.abs(log_sqft[candidate] - log_sqft[subject])
+        miles = np.hypot(
+            (lat_deg[candidate] - lat_deg[subject]) * MILES_PER_DEGREE,
+            (lng_deg[candidate] - lng_deg[subject]) * lng_miles_per_degree[subject],
+        )
+        # a home isn't its own comp
+        keep = (miles <= COMP_MAX_MILES) & (size_gap <= max_log_ratio) & (candidate != subject)
+        subject, candidate, miles = subject[keep], candidate[keep], miles[keep]
+        score = miles / COMP_MILE_SCALE + size_gap[keep] / COMP_SQFT_SCALE
+
+        # most similar first within each home, then the first k of each home
+        ranked = np.lexsort((score, subject))
+        subject, candidate, miles = subject[ranked], candidate[ranked], miles[ranked]
+        group_start = np.flatnonzero(np.r_[True, subject[1:] != subject[:-1]])
+        rank = np.arange(subject.size) - np.repeat(group_start, np.diff(np.r_[group_start, subject.size]))
+        top = rank < k
+        neighbors[subject[top], rank[top]] = candidate[top]
+        distances[subject[top], rank[top]] = miles[top]
+
+    distances[~geo] = np.nan
+    return _comparables(frame, neighbors, distances)
+
+
+def _comparables(frame: HomesFrame, neighbors: np.ndarray, distances: np.ndarray) -> Comparables:
+    """Estimates & discounts from the comps found."""
+    n = len(frame)
+    price = frame["price"].astype(np.float64)
+    sqft = frame["sqft"].astype(np.float64)
+    has_comp = neighbors >= 0
+    comp_ppsf = np.where(has_comp, (price / np.where(sqft > 0, sqft, np.nan))[neighbors], np.nan)
+    enough = has_comp.sum(axis=1) >= MIN_COMPS
+    estimate = np.full(n, np.nan)
+    if enough.any():
+        estimate[enough] = np.nanmedian(comp_ppsf[enough], axis=1) * sqft[enough]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        discount = 1 - price / estimate
+        zestimate = frame["zestimate"]
+        zestimate_discount = np.where(frame.present("price") & (zestimate > 0), 1 - price / zestimate, np.nan)
+    return Comparables(neighbors, distances, estimate, discount, zestimate_discount)
+
+
+def below_comps(frame: HomesFrame, comps: Comparables, limit: int = 5, rows: np.ndarray | None = None) -> list[dict]:
+    """The `limit` homes (among `rows`, if given) listed furthest below their comps' estimate,
+    with `comp_estimate`, `comp_discount` and `zestimate_discount` (percentages) added."""
+    discount = np.where(np.isfinite(comps.discount), comps.discount, -np.inf)
+    if rows is not None:
+        kept = np.full(discount.size, -np.inf)
+        kept[rows] = discount[rows]
+        discount = kept
+    idx = np.argsort(-discount, kind="stable")[:limit]
+    idx = idx[np.isfinite(discount[idx])]
+
+    homes = [dict(home) for home in frame.to_records(idx)]
+    for home, i in zip(homes, idx.tolist()):
+        home["comp_estimate"] = round(float(comps.estimate[i]))
+        home["comp_discount"] = round(float(comps.discount[i]) * 100, 1)
+        zestimate_discount = comps.zestimate_discount[i]
+        home["zestimate_discount"] = None if np.isnan(zestimate_discount) else round(float(zestimate_discount) * 100, 1)
+        home["comps"] = comps.comps_of(i).size
+    return homes
@@ -1,225 +1,295 @@
-"""Homes Data Cleaning, Processing & Analysing functions."""
-import re
+"""Homes Data Cleaning, Processing & Analysing functions.
+
+No Streamlit here: the dashboard (`utils.display`), the comparison page and
+the headless CLI (`utils.analyze`) all run this same engine.
+"""
+import logging
+from collections import Counter
+
 import pandas as pd
 import numpy as np
-import streamlit as st
-import altair as alt
-import traceback
-from collections import Counter, defaultdict
-
 
-#-------------- Clean ----------------#
-def safe_price(h, hd):
-    # 1) best field
-    if h.get("unformattedPrice") is not None:
-        return int(h["unformattedPrice"])
+from utils.homes_frame import HomesFrame, as_frame, value_counts, py_number
+from utils.normalize import safe_price, normalize_batch, normalize_frame
+from utils.topk import smallest, smallest_indices, smallest_many
+from utils.spatial import GridIndex
+from utils.comps import comparables, below_comps
+from utils.query import QueryIndex
+from utils.chart_data import CHART_POINT_BUDGET, scatter_or_grid, median_series
+from utils.instrument import stage, timed
+from utils.lazy import lazy_module
 
-    # 2) check both price sources
-    raw = h.get("price") or hd.get("price")
-    if raw:
-        cleaned = re.sub(r"[^\d]", "", raw)
-        if cleaned.isdigit():
-            return int(cleaned)
+# only the dashboard draws charts; batch runs never import it
+alt = lazy_module("altair")
+logger = logging.getLogger(__name__)
 
-    # fallback
-    return 0
 
+#-------------- Clean ----------------#
+@timed()
 def normalize_items(items: list[dict]) -> list[dict]:
     """Extract consistent fields from Zillow scraper results."""
-    normalized = []
-    skipped = 0
-    
-    for item in items:
-        try:
-            h = item
-            hd = h.get("hdpData", {}).get("homeInfo", {})
-
-            normalized.append({
-                "zpid": h.get("zpid"),
-                "url": h.get("detailUrl"),
-                "address": h.get("address"),
-                "city": h.get("addressCity"),
-                "state": h.get("addressState"),
-                "zip": h.get("addressZipcode"),
-                "price": safe_price(h, hd),
-                "beds": h.get("beds") or hd.get("bedrooms"),
-                "baths": h.get("baths") or hd.get("bathrooms"),
-                "sqft": h.get("area") or hd.get("livingArea"),
-                "lat": h.get("latLong", {}).get("latitude"),
-                "lng": h.get("latLong", {}).get("longitude"),
-                "img": h.get("imgSrc"),
-                "zestimate": h.get("zestimate") or hd.get("zestimate"),
-                "broker": h.get("brokerName") or hd.get("listing_sub_type"),
-                "days_listed": hd.get("daysOnZillow"),
-            })
-        except Exception as e:
-            skipped += 1
-            
-    if skipped :
-        st.warning(f"💡 I was unable to process {skipped} homes due to data inconsistency, I've skipped them.")
+    failures = Counter()
+    normalized, skipped = normalize_batch(items, failures)
+    if skipped:
+        logger.warning("Skipped %d homes with inconsistent data", skipped)
+    if failures:
+        logger.warning("Unparseable prices (priced 0): %s", dict(failures))
 
     return normalized
 
 #-------------- Analyze ----------------#
-def compute_kpis(data: list[dict], user_max_price: int | None = None) -> dict:
-    prices = [i["price"] for i in data if i["price"]]
-    sqfts = [i["sqft"] for i in data if i["sqft"]]
-    beds = [i["beds"] for i in data if i["beds"]]
+@timed()
+def compute_kpis(data: list[dict] | HomesFrame, user_max_price: int | None = None) -> dict:
+    frame = as_frame(data)
+    price_mask = frame.present("price")
+    beds_mask = frame.present("beds")
+    prices = frame["price"][price_mask]
+    sqfts = frame["sqft"][frame.present("sqft")].astype(np.float64)
+    beds = frame["beds"][beds_mask]
 
     # --- Avg price per bedroom ---
-    price_per_bed = defaultdict(list)
-    for item in data:
-        if item["price"] and item["beds"]:
-            price_per_bed[item["beds"]].append(item["price"])
-
+    both = price_mask & beds_mask
+    codes, uniques = pd.factorize(frame["beds"][both], sort=False)
+    sums = np.bincount(codes, weights=frame["price"][both], minlength=len(uniques))
+    counts = np.bincount(codes, minlength=len(uniques))
     price_per_bed = {
-        b: round(sum(v)/len(v)) for b, v in price_per_bed.items()
+        py_number(b): round(float(s) / int(c)) for b, s, c in zip(uniques, sums, counts)
     }
 
     # --- Budget match ---
     percent_in_budget = None
-    if user_max_price:
+    if user_max_price and prices.size:
         percent_in_budget = round(
-            (sum(p <= user_max_price for p in prices) / len(prices)) * 100, 2
+            (int(np.count_nonzero(prices <= user_max_price)) / prices.size) * 100, 2
         )
 
+    bed_counts = value_counts(beds)
+
     return {
-        "count": len(data),
-        "avg_price": round(sum(prices)/len(prices)) if prices else 0,
-        "median_price": int(np.median(prices)) if prices else 0,
-        "min_price": round(min(prices, default=0)),
-        "max_price": round(max(prices, default=0)),
-        "avg_sqft": round(sum(sqfts)/len(sqfts)) if sqfts else 0,
+        "count": len(frame),
+        "avg_price": round(int(prices.sum()) / prices.size) if prices.size else 0,
+        "median_price": int(np.median(prices)) if prices.size else 0,
+        "min_price": int(prices.min()) if prices.size else 0,
+        "max_price": int(prices.max()) if prices.size else 0,
+        "avg_sqft": round(float(sqfts.sum()) / sqfts.size) if sqfts.size else 0,
         "price_buckets": compute_dynamic_buckets(prices),
-        "most_common_beds": Counter(beds).most_common(1)[0][0] if beds else 0,
+        "most_common_beds": max(bed_counts, key=bed_counts.get) if bed_counts else 0,
         "avg_price_per_bedroom": price_per_bed,
         "percent_in_budget": percent_in_budget,
     }
 
-def compute_dynamic_buckets(prices, num_buckets=5):
-    if not prices:
-        return {}
-
-    mn = min(prices)
-    mx = max(prices)
+def bucket_labels(mn, mx, num_buckets=5) -> list[str]:
+    """"$low - $high" of each of `num_buckets` equal-width buckets between mn and mx."""
     # uniform bucket size
     step = (mx - mn) / num_buckets
-
-    buckets = {}
     edges = [mn + i * step for i in range(num_buckets + 1)]
+    return [f"${int(edges[i]):,} - ${int(edges[i + 1]):,}" for i in range(num_buckets)]
 
-    # prepare labels
-    for i in range(num_buckets):
-        low = int(edges[i])
-        high = int(edges[i + 1])
-        label = f"${low:,} - ${high:,}"
-        buckets[label] = 0
-
-    # assign prices
-    for p in prices:
-        # find which bucket
-        idx = min(int((p - mn) / step), num_buckets - 1)
-        low = int(edges[idx])
-        high = int(edges[idx + 1])
-        label = f"${low:,} - ${high:,}"
-        buckets[label] += 1
+def bucket_index(prices, mn, mx, num_buckets=5) -> np.ndarray:
+    """Bucket of each price, same as int((p - mn) / step), for all prices at once."""
+    prices = np.asarray(prices)
+    step = (mx - mn) / num_buckets
+    if not step:
+        return np.zeros(prices.size, dtype=np.int64)
+    return np.minimum(((prices - mn) / step).astype(np.int64), num_buckets - 1)
+
+def compute_dynamic_buckets(prices, num_buckets=5, weights=None, bounds=None):
+    """Count prices in `num_buckets` equal-width buckets between the min and max price.
+
+    `weights` counts each value that many times, and `bounds` fixes (min, max)
+    instead of reading them from `prices` - used to re-bin pre-aggregated counts.
+    """
+    prices = np.asarray(prices)
+    if not prices.size:
+        return {}
+
+    mn, mx = bounds if bounds is not None else (prices.min().item(), prices.max().item())
+    labels = bucket_labels(mn, mx, num_buckets)
+    buckets = dict.fromkeys(labels, 0)
+    idx = bucket_index(prices, mn, mx, num_buckets)
+    # labels can collide when the range is tiny, so add counts rather than assign
+    for label, count in zip(labels, np.bincount(idx, weights=weights, minlength=num_buckets)):
+        buckets[label] += int(count)
 
     return buckets
 
 def top_cheapest(data, limit=5):
-    return sorted(data, key=lambda x: x["price"] or float("inf"))[:limit]
+    if not isinstance(data, HomesFrame):
+        return smallest(data, limit, key=lambda x: x["price"] or float("inf"))
+    # homes without a price go last, like `x["price"] or inf`
+    key = np.where(data.present("price"), data["price"], np.iinfo(np.int64).max)
+    return data.to_records(smallest_indices(key, limit))
 
 def top_expensive(data, limit=5):
-    return sorted(data, key=lambda x: -(x["price"] or 0))[:limit]
-
-def rank_best_value(data: list[dict], min_sqft=200):
-    """Return homes ranked by value (lower $/sqft is better)."""
-    deals = []
-
-    for i in data:
-        if not i["price"] or not i["sqft"]:
-            continue
-        if i["sqft"] < min_sqft:
-            continue
-
-        i["price_per_sqft"] = round(i["price"] / i["sqft"], 2)
-        deals.append(i)
-
-    return sorted(deals, key=lambda x: x["price_per_sqft"])
-
-def summarize_by_city(data: list[dict]):
-    stats = defaultdict(lambda: {"count": 0, "prices": []})
-
-    for i in data:
-        city = i["city"] or "Unknown"
-        stats[city]["count"] += 1
-        if i["price"]:
-            stats[city]["prices"].append(i["price"])
+    if not isinstance(data, HomesFrame):
+        return smallest(data, limit, key=lambda x: -(x["price"] or 0))
+    return data.to_records(smallest_indices(-data["price"], limit))
+
+def rank_best_value(data: list[dict] | HomesFrame, min_sqft=200, limit: int | None = None):
+    """Return homes ranked by value (lower $/sqft is better), only the best `limit` if given.
+
+    Each home comes back as a new dict with `price_per_sqft` added.
+    """
+    frame = as_frame(data)
+    sqft = frame["sqft"]
+
+    with np.errstate(invalid="ignore"):
+        mask = frame.present("price") & frame.present("sqft") & (sqft >= min_sqft)
+    idx = np.flatnonzero(mask)
+    ratio = frame["price"][idx] / sqft[idx]
+
+    if limit is not None and limit < idx.size:
+        # rounding to cents can't move a ratio past the k-th by more than a cent,
+        # so only these candidates can make the cut
+        kth = np.partition(ratio, limit - 1)[limit - 1]
+        keep = ratio <= kth + 0.01
+        idx, ratio = idx[keep], ratio[keep]
+
+    # python's round keeps the exact 2-decimal values (and tie order) of the dict version
+    price_per_sqft = np.array([round(r, 2) for r in ratio.tolist()])
+    order = np.argsort(price_per_sqft, kind="stable")[:limit]
+
+    deals = frame.to_records(idx[order])
+    if frame.records is not None:
+        # those are the caller's dicts: leave them untouched
+        deals = [dict(home) for home in deals]
+    for home, value in zip(deals, price_per_sqft[order].tolist()):
+        home["price_per_sqft"] = value
+
+    return deals
+
+@timed()
+def rank_homes(data: list[dict] | HomesFrame, limit=5, min_sqft=200) -> dict[str, list[dict]]:
+    """Cheapest, most expensive and best-value homes together, in one pass over a list."""
+    if isinstance(data, HomesFrame):
+        return {
+            "cheapest": top_cheapest(data, limit),
+            "expensive": top_expensive(data, limit),
+            "best_value": rank_best_value(data, min_sqft=min_sqft, limit=limit),
+        }
+
+    def value_key(x):
+        if not x["price"] or not x["sqft"] or x["sqft"] < min_sqft:
+            return None
+        return round(x["price"] / x["sqft"], 2)
+
+    ranked = smallest_many(data, limit, {
+        "cheapest": lambda x: x["price"] or float("inf"),
+        "expensive": lambda x: -(x["price"] or 0),
+        "best_value": value_key,
+    })
+    ranked["best_value"] = [{**x, "price_per_sqft": value_key(x)} for x in ranked["best_value"]]
+    return ranked
+
+@timed()
+def summarize_by_city(data: list[dict] | HomesFrame):
+    frame = as_frame(data)
+    cities = frame["city"].copy()
+    cities[~frame.present("city")] = "Unknown"
+
+    codes, uniques = pd.factorize(cities, sort=False)
+    counts = np.bincount(codes, minlength=len(uniques))
+
+    price_mask = frame.present("price")
+    grouped = (
+        pd.Series(frame["price"][price_mask])
+        .groupby(codes[price_mask])
+        .agg(["sum", "count", "median"])
+        .reindex(range(len(uniques)))
+    )
 
     summary = []
-    for city, s in stats.items():
-        prices = s["prices"]
+    for code in np.argsort(-counts, kind="stable"):
+        g = grouped.iloc[code]
+        has_prices = g["count"] > 0
         summary.append({
-            "city": city,
-            "count": s["count"],
-            "avg_price": round(sum(prices)/len(prices)) if prices else None,
-            "median_price": float(np.median(prices)) if prices else None,
+            "city": uniques[code],
+            "count": int(counts[code]),
+            "avg_price": round(float(g["sum"]) / int(g["count"])) if has_prices else None,
+            "median_price": float(g["median"]) if has_prices else None,
         })
 
-    return sorted(summary, key=lambda x: x["count"], reverse=True)
-
-def bed_bath_distribution(data: list[dict]):
-    
-    beds = defaultdict(int)
-    baths = defaultdict(int)
-
-    for i in data:
-        if i.get("beds"):
-            beds[i["beds"]] += 1
-        if i.get("baths"):
-            baths[i["baths"]] += 1
-
-    return dict(beds), dict(baths)
-
-
-#-------------- Visualize ----------------#
-def display_best_deals(normalized_data):
-    """Nicely Display best deals"""
-
-    best = rank_best_value(normalized_data)[:5]
-
-    # Prepare dataframe with selected columns
-    df = pd.DataFrame(best)
-    df_display = df[["img", "price", "address", "city", "state", "beds", "baths", "sqft", "url"]]
-
-    # Convert img URLs to Markdown so Streamlit renders thumbnails
-    df_display["price"] = df_display["price"].apply(lambda x: f"$**{x:,}**")
-    
-    # Convert img URLs to Markdown so Streamlit renders thumbnails
-    df_display["img"] = df_display["img"].apply(lambda x: f"![img]({x})")
-    # Convert URL to clickable links
-    df_display["url"] = df_display["url"].apply(lambda x: f"[Link]({x})")
-
-    # Show as Streamlit table
-    st.subheader("🏆 Best Deals (Lowest $/sqft)")
-    st.write("Showing top 10 homes based on $/sqft value")
-    st.write(df_display.to_markdown(index=False), unsafe_allow_html=True)
-
-def fancy_display_deals(best, limit: int = 5):
-
-    best = best[ :limit]
-    for house in best:
-        cols = st.columns([1,3])
-        cols[0].image(house["img"], width=100)
-        cols[1].markdown(f"""
-    **{house['address']}, {house['city']} {house['state']}**  
-    Beds: {house['beds']} | Baths: {house['baths']} | {house['sqft']} sqft  
-    Price: ${house['price']:,} | [Link]({house['url']})
-    """)
-
-def display_bed_bath_distribution(normalized_data):
-    
-    beds, baths = bed_bath_distribution(normalized_data)
+    return summary
+
+def _charts(frame: HomesFrame, kpis: dict, beds: dict, baths: dict) -> dict:
+    with stage("build_charts", rows=len(frame)):
+        return {
+            "price_buckets": price_buckets_chart(kpis["price_buckets"]),
+            "bed_bath": bed_bath_charts(beds, baths),
+            "price_sqft": price_sqft_chart(frame),
+            "days_listed": days_listed_chart(frame),
+        }
+
+def analyze_sections(
+    frame: HomesFrame, user_max_price: int | None = None, limit=5, charts: bool = True, indexes: bool = True,
+):
+    """`analyze_frame` a section at a time, in the order the dashboard can show them.
+
+    Yields ("kpis", parts), ("rankings", parts), then ("charts", parts); each
+    `parts` is a dict of `analyze_frame` keys, and all of them merged are
+    its result. The filter & map indexes come with the charts, so the
+    dashboard's filters only appear once everything is there.
+    """
+    kpis = compute_kpis(frame, user_max_price=user_max_price)
+    yield "kpis", {"frame": frame, "kpis": kpis}
+
+    beds, baths = bed_bath_distribution(frame)
+    rankings = rank_homes(frame, limit=limit)
+    parts = {"rankings": rankings, "city_stats": summarize_by_city(frame), "beds": beds, "baths": baths}
+    if indexes:
+        parts["comps"] = comparables(frame)
+        rankings["below_comps"] = below_comps(frame, parts["comps"], limit=limit)
+    yield "rankings", parts
+
+    parts = {"charts": _charts(frame, kpis, beds, baths) if charts else {}}
+    if indexes:
+        with stage("spatial_index", rows=len(frame)):
+            # radius / bbox / nearest-home queries on this dataset
+            parts["spatial"] = GridIndex.from_frame(frame)
+        with stage("query_index", rows=len(frame)):
+            # dashboard filters, see `analyze_subset`
+            parts["query"] = QueryIndex(frame)
+    yield "charts", parts
+
+@timed()
+def analyze_frame(
+    frame: HomesFrame, user_max_price: int | None = None, limit=5, charts: bool = True, indexes: bool = True,
+) -> dict:
+    """Everything the dashboard shows for one dataset, computed once: KPIs, rankings, comps, stats & charts.
+
+    `charts=False` leaves `charts` empty (and Altair unimported), for batch
+    runs. `indexes=False` skips the comps (and the "below_comps" ranking)
+    and the map & filter indexes, which only the dashboard queries.
+    """
+    analysis = {}
+    for _, parts in analyze_sections(frame, user_max_price, limit, charts, indexes):
+        analysis.update(parts)
+    return analysis
+
+@timed()
+def analyze_subset(analysis: dict, rows: np.ndarray, user_max_price: int | None = None, limit=5) -> dict:
+    """`analyze_frame`'s dashboard for the `rows` a filter kept (from `analysis["query"].select`).
+
+    Only the filter-dependent parts are recomputed; the comps stay those
+    found among every home of the search, and the indexes aren't rebuilt.
+    `frame` is the filtered frame, `rows` its rows in the full one.
+    """
+    frame = analysis["frame"].take(rows)
+    summary = analyze_frame(frame, user_max_price, limit, indexes=False)
+    summary["rankings"]["below_comps"] = below_comps(analysis["frame"], analysis["comps"], limit=limit, rows=rows)
+    return {**analysis, **summary, "frame": frame, "rows": rows}
+
+@timed()
+def bed_bath_distribution(data: list[dict] | HomesFrame):
+    frame = as_frame(data)
+    beds = value_counts(frame["beds"][frame.present("beds")])
+    baths = value_counts(frame["baths"][frame.present("baths")])
+
+    return beds, baths
+
+
+#-------------- Charts ----------------#
+def bed_bath_charts(beds: dict, baths: dict):
 
     # Convert to DataFrame
     df_beds = pd.DataFrame(list(beds.items()), columns=["Beds", "Count"])
@@ -231,7 +301,6 @@ def display_bed_bath_distribution(normalized_data):
         y=alt.Y("Count:Q", title="Number of Homes"),
         tooltip=["Beds", "Count"]
     ).properties(title="🏠 Bed Distribution")
-    st.altair_chart(bed_chart, width='stretch')
 
     # Bath chart
     bath_chart = alt.Chart(df_baths).mark_bar(color="orange").encode(
@@ -239,9 +308,10 @@ def display_bed_bath_distribution(normalized_data):
         y=alt.Y("Count:Q", title="Number of Homes"),
         tooltip=["Baths", "Count"]
     ).properties(title="🛁 Bath Distribution")
-    st.altair_chart(bath_chart, width='stretch')
 
-def plot_price_buckets(price_buckets: dict):
+    return bed_chart, bath_chart
+
+def price_buckets_chart(price_buckets: dict):
     # Convert to DataFrame
     df = pd.DataFrame(list(price_buckets.items()), columns=["PriceRange", "Count"])
     
@@ -261,4 +331,66 @@ def plot_price_buckets(price_buckets: dict):
         .properties(width=600, height=400)
     )
 
-    st.altair_chart(chart)
+    return chart
+
+def compare_buckets_chart(price_buckets: dict[str, dict], names: dict[str, str]):
+    """Grouped bars of several runs' price buckets (shared edges, see `compare_runs`), in price order."""
+    df = pd.DataFrame([
+        {"PriceRange": label, "Run": names.get(run_id, run_id), "Count": count, "Order": i}
+        for run_id, buckets in price_buckets.items()
+        for i, (label, count) in enumerate(buckets.items())
+    ])
+
+    return (
+        alt.Chart(df)
+        .mark_bar()
+        .encode(
+            x=alt.X("PriceRange:N", title="Price Range", sort=alt.SortField("Order")),
+            xOffset="Run:N",
+            y=alt.Y("Count:Q", title="Number of Homes"),
+            color=alt.Color("Run:N", title="Run"),
+            tooltip=["Run", "PriceRange", "Count"],
+        )
+        .properties(width=600, height=400)
+    )
+
+def _priced(frame: HomesFrame, key: str) -> tuple[np.ndarray, np.ndarray]:
+    """(`key` values, prices) of homes that have both."""
+    mask = frame.present("price") & frame.present(key)
+    return frame[key][mask], frame["price"][mask]
+
+def price_sqft_chart(frame: HomesFrame, budget: int = CHART_POINT_BUDGET):
+    """Price vs size: every home while they fit `budget`, a count heatmap of the grid past it."""
+    sqft, price = _priced(frame, "sqft")
+    kind, df = scatter_or_grid(sqft, price, budget)
+    # whole sqft & dollars: float edges would double the payload for no visible difference
+    df = df.round().astype(np.int64)
+
+    if kind == "points":
+        return alt.Chart(df).mark_circle(size=20, opacity=0.5, color="teal").encode(
+            x=alt.X("x:Q", title="Sqft"),
+            y=alt.Y("y:Q", title="Price"),
+            tooltip=[alt.Tooltip("x:Q", title="Sqft"), alt.Tooltip("y:Q", title="Price", format="$,")],
+        ).properties(width=600, height=400)
+
+    return alt.Chart(df).mark_rect().encode(
+        x=alt.X("x0:Q", title="Sqft"), x2="x1:Q",
+        y=alt.Y("y0:Q", title="Price"), y2="y1:Q",
+        color=alt.Color("count:Q", title="Homes", scale=alt.Scale(scheme="tealblues")),
+        tooltip=[alt.Tooltip("count:Q", title="Homes")],
+    ).properties(width=600, height=400)
+
+def days_listed_chart(frame: HomesFrame, budget: int = CHART_POINT_BUDGET):
+    """Median price by days on the market (LTTB-downsampled past `budget` points)."""
+    days, price = _priced(frame, "days_listed")
+    df = median_series(days, price, budget)
+
+    return alt.Chart(df).mark_line(color="violet", point=True).encode(
+        x=alt.X("x:Q", title="Days Listed"),
+        y=alt.Y("y:Q", title="Median Price"),
+        tooltip=[
+            alt.Tooltip("x:Q", title="Days Listed"),
+            alt.Tooltip("y:Q", title="Median Price", format="$,"),
+            alt.Tooltip("count:Q", title="Homes"),
+        ],
+    ).properties(width=600, height=300)
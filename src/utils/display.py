@@ -0,0 +1,55 @@
+"""Streamlit rendering of `utils.data_analysis` results: the only analysis module that imports Streamlit."""
+import pandas as pd
+import streamlit as st
+
+from utils.data_analysis import bed_bath_charts, bed_bath_distribution, price_buckets_chart, rank_best_value
+from utils.homes_frame import HomesFrame
+
+
+def warn_skipped(skipped: int):
+    if skipped:
+        st.warning(f"💡 I was unable to process {skipped} homes due to data inconsistency, I've skipped them.")
+
+def display_best_deals(normalized_data):
+    """Nicely Display best deals"""
+
+    best = rank_best_value(normalized_data, limit=5)
+
+    # Prepare dataframe with selected columns
+    df = pd.DataFrame(best)
+    df_display = df[["img", "price", "address", "city", "state", "beds", "baths", "sqft", "url"]]
+
+    # Convert img URLs to Markdown so Streamlit renders thumbnails
+    df_display["price"] = df_display["price"].apply(lambda x: f"$**{x:,}**")
+    
+    # Convert img URLs to Markdown so Streamlit renders thumbnails
+    df_display["img"] = df_display["img"].apply(lambda x: f"![img]({x})")
+    # Convert URL to clickable links
+    df_display["url"] = df_display["url"].apply(lambda x: f"[Link]({x})")
+
+    # Show as Streamlit table
+    st.subheader("🏆 Best Deals (Lowest $/sqft)")
+    st.write("Showing top 10 homes based on $/sqft value")
+    st.write(df_display.to_markdown(index=False), unsafe_allow_html=True)
+
+def fancy_display_deals(best: list[dict] | HomesFrame, limit: int = 5):
+
+    if isinstance(best, HomesFrame):
+        best = best.to_records(range(min(limit, len(best))))
+    best = best[ :limit]
+    for house in best:
+        cols = st.columns([1,3])
+        cols[0].image(house["img"], width=100)
+        cols[1].markdown(f"""
+    **{house['address']}, {house['city']} {house['state']}**  
+    Beds: {house['beds']} | Baths: {house['baths']} | {house['sqft']} sqft  
+    Price: ${house['price']:,} | [Link]({house['url']})
+    """)
+
+def display_bed_bath_distribution(normalized_data):
+    
+    for chart in bed_bath_charts(*bed_bath_distribution(normalized_data)):
+        st.altair_chart(chart, width='stretch')
+
+def plot_price_buckets(price_buckets: dict):
+    st.altair_chart(price_buckets_chart(price_buckets))
@@ -0,0 +1,162 @@
+"""Columnar (NumPy-backed) view over normalized homes."""
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+NUMERIC_COLUMNS = ("price", "beds", "baths", "sqft", "lat", "lng", "zestimate", "days_listed")
+TEXT_COLUMNS = ("zpid", "url", "address", "city", "state", "zip", "img", "broker")
+# same order as the dicts from `normalize_items`
+COLUMNS = (
+    "zpid", "url", "address", "city", "state", "zip", "price", "beds", "baths",
+    "sqft", "lat", "lng", "img", "zestimate", "broker", "days_listed",
+)
+# narrowest dtype holding every realistic value exactly (whole sqft/days < 16.7M, half baths);
+# coordinates and zestimates need the full float64
+COLUMN_DTYPES = {
+    "beds": np.float32, "baths": np.float32, "sqft": np.float32, "days_listed": np.float32,
+    "lat": np.float64, "lng": np.float64, "zestimate": np.float64, "price": np.float64,
+}
+# few distinct values across thousands of rows: share one str object per value
+INTERNED_COLUMNS = ("city", "state", "zip", "broker")
+
+
+def _float_column(values: list, dtype=np.float64) -> np.ndarray:
+    """Convert a list of numbers (or None) into a float array, NaN for missing."""
+    try:
+        return np.array(values, dtype=dtype)
+    except (TypeError, ValueError):
+        # odd scraper values (e.g. "3+" beds) -> NaN, like a missing field
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=dtype)
+
+def _text_column(values: list, intern: bool = False) -> np.ndarray:
+    if intern:
+        values = [sys.intern(v) if type(v) is str else v for v in values]
+    col = np.empty(len(values), dtype=object)
+    col[:] = values
+    return col
+
+def _plain_values(col: np.ndarray) -> list:
+    """Float column -> python values: None for NaN, int for whole numbers (like the JSON had)."""
+    out = np.empty(col.size, dtype=object)
+    out[:] = col.tolist()
+    whole = np.isfinite(col) & (col == np.floor(col))
+    out[whole] = col[whole].astype(np.int64).tolist()
+    out[np.isnan(col)] = None
+    return out.tolist()
+
+def py_number(value):
+    """Turn a NumPy scalar back into the plain int/float the dict version produced."""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+class HomesFrame:
+    """Normalized homes stored column by column, built once per dataset.
+
+    Numeric fields are float arrays (NaN where the scraper had nothing, see
+    `COLUMN_DTYPES`), `price` is int64 like `safe_price` returns, text fields
+    are object arrays with city/state/zip/broker strings interned.
+    """
+
+    def __init__(self, columns: dict[str, np.ndarray], records: list[dict] | None = None):
+        self.columns = columns
+        self.records = records
+
+    @classmethod
+    def from_records(cls, records: list[dict], keep_records: bool = False) -> "HomesFrame":
+        """Build the columns from normalized dicts.
+
+        By default the dicts are not referenced afterwards, so the caller can
+        drop them, and rows are rebuilt from the columns when needed.
+        `keep_records=True` keeps handing back the original dicts instead.
+        """
+        frame = cls.from_columns({key: [r.get(key) for r in records] for key in COLUMNS})
+        if keep_records:
+            frame.records = records
+        return frame
+
+    @classmethod
+    def from_columns(cls, values: dict[str, list]) -> "HomesFrame":
+        """Build the columns from one sequence of raw values per field of `COLUMNS`."""
+        columns = {}
+        for key in TEXT_COLUMNS:
+            columns[key] = _text_column(values[key], intern=key in INTERNED_COLUMNS)
+        for key in NUMERIC_COLUMNS:
+            columns[key] = _float_column(values[key], COLUMN_DTYPES[key])
+        columns["price"] = np.nan_to_num(columns["price"]).astype(np.int64)
+        return cls(columns)
+
+    @classmethod
+    def concat(cls, frames: list["HomesFrame"]) -> "HomesFrame":
+        """Stack frames (e.g. one per streamed page) into one."""
+        if not frames:
+            return cls.from_records([])
+        columns = {k: np.concatenate([f.columns[k] for f in frames]) for k in COLUMNS}
+        records = None
+        if all(f.records is not None for f in frames):
+            records = [r for f in frames for r in f.records]
+        return cls(columns, records)
+
+    def __len__(self):
+        return len(self.columns["price"])
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        return self.columns[key]
+
+    def present(self, key: str) -> np.ndarray:
+        """Boolean mask of rows where `key` is truthy (not missing and not 0)."""
+        col = self.columns[key]
+        if col.dtype == object:
+            return col.astype(bool)
+        return ~np.isnan(col) & (col != 0) if col.dtype.kind == "f" else col != 0
+
+    def take(self, idx) -> "HomesFrame":
+        """Return a new frame with only the rows at `idx` (indices or a bool mask)."""
+        idx = np.flatnonzero(idx) if np.asarray(idx).dtype == bool else np.asarray(idx, dtype=np.intp)
+        records = [self.records[i] for i in idx] if self.records is not None else None
+        return HomesFrame({k: v[idx] for k, v in self.columns.items()}, records)
+
+    def row(self, i: int) -> dict:
+        """Materialize one row as the dict `normalize_items` would have produced."""
+        return self.to_records([i])[0]
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns, counting each shared string once."""
+        total = 0
+        seen = set()
+        for col in self.columns.values():
+            total += col.nbytes
+            # (a mapped text column is counted by its buffers, see `run_store.ArrowText`)
+            if isinstance(col, np.ndarray) and col.dtype == object:
+                for value in col:
+                    if id(value) not in seen:
+                        seen.add(id(value))
+                        total += sys.getsizeof(value)
+        return total
+
+    def to_records(self, idx=None) -> list[dict]:
+        """Materialize rows (all, or those at `idx`) as dicts, a column at a time."""
+        idx = np.arange(len(self)) if idx is None else np.asarray(idx, dtype=np.intp)
+        if self.records is not None:
+            return [self.records[i] for i in idx]
+
+        values = []
+        for key in COLUMNS:
+            col = self.columns[key][idx]
+            values.append(_plain_values(col) if key in NUMERIC_COLUMNS and key != "price" else col.tolist())
+        return [dict(zip(COLUMNS, row)) for row in zip(*values)]
+
+
+def as_frame(data) -> HomesFrame:
+    """Accept either a HomesFrame or the list of dicts from `normalize_items`."""
+    return data if isinstance(data, HomesFrame) else HomesFrame.from_records(data)
+
+def value_counts(values: np.ndarray) -> dict:
+    """Count values in first-appearance order, like a defaultdict(int) loop would."""
+    if not len(values):
+        return {}
+    codes, uniques = pd.factorize(values, sort=False)
+    counts = np.bincount(codes, minlength=len(uniques))
+    return {py_number(u) if not isinstance(u, str) else u: int(c) for u, c in zip(uniques, counts)}
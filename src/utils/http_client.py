@@ -0,0 +1,237 @@
+"""Pooled HTTP calls to n8n and Apify: per-endpoint timeouts, retries, circuit breaking & latency stats.
+
+`HttpClient` wraps one keep-alive `requests.Session` for the Streamlit
+script threads. The job manager's async client goes through the same
+`ENDPOINTS`, breakers and stats (`breaker()`, `retry_delays()`,
+`next_retry()`, `observe()`), so a dead n8n is noticed by every caller at once.
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils import instrument
+
+
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 20))
+# consecutive failures that open an endpoint's circuit, and how long it stays open
+BREAKER_FAILURES = int(os.getenv("HTTP_BREAKER_FAILURES", 5))
+BREAKER_RESET_SECONDS = float(os.getenv("HTTP_BREAKER_RESET_SECONDS", 30))
+RETRY_BASE_SECONDS = 0.5
+RETRY_MAX_SECONDS = 8
+# latencies kept per endpoint for percentiles
+LATENCY_SAMPLES = 1000
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    connect_timeout: float
+    read_timeout: float
+    # retried only if repeating the call is harmless
+    retries: int = 0
+
+
+ENDPOINTS = {
+    # the chat webhook may start an Apify run: never repeated
+    "n8n_chat": Endpoint(5, 60),
+    # answers when the scrape is over; bounded so a hung execution can't hold a job forever
+    "n8n_analysis": Endpoint(5, float(os.getenv("N8N_ANALYSIS_TIMEOUT", 30 * 60))),
+    "apify_run": Endpoint(5, 30),
+    "apify_abort": Endpoint(5, 30, retries=3),
+    "apify_poll": Endpoint(5, 30, retries=3),
+    "apify_items": Endpoint(5, 300, retries=3),
+}
+
+
+class CircuitOpenError(RuntimeError):
+    """The endpoint failed too often lately; the call wasn't attempted."""
+
+
+class CircuitBreaker:
+    """Closed -> open after `failures` consecutive failures -> half-open after `reset_seconds`.
+
+    Half-open lets one trial call through: success closes the circuit,
+    failure opens it for another `reset_seconds`, and a call given up on
+    without an outcome (`release`) lets the next one try.
+    """
+
+    def __init__(self, name: str, failures: int = BREAKER_FAILURES, reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self.consecutive = 0
+        self.opened = None
+        self.trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened >= self.reset_seconds else "open"
+
+    def allow(self):
+        """Raise `CircuitOpenError` unless a call may go out now."""
+        with self._lock:
+            if self.opened is None:
+                return
+            if time.monotonic() - self.opened >= self.reset_seconds and not self.trial:
+                self.trial = True
+                return
+        s = stats(self.name)
+        with _stats_lock:
+            s.rejected += 1
+        raise CircuitOpenError(f"{self.name} is unavailable (failed {self.failures} times in a row); retrying shortly.")
+
+    def success(self):
+        with self._lock:
+            self.consecutive = 0
+            self.opened = None
+            self.trial = False
+
+    def failure(self):
+        with self._lock:
+            self.consecutive += 1
+            if self.trial or self.consecutive >= self.failures:
+                self.opened = time.monotonic()
+            self.trial = False
+
+    def release(self):
+        with self._lock:
+            self.trial = False
+
+
+class EndpointStats:
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.rejected = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def summary(self) -> dict:
+        with _stats_lock:
+            latencies = sorted(self.latencies)
+
+        def percentile_ms(q: float) -> float | None:
+            if not latencies:
+                return None
+            return round(latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000, 1)
+
+        return {
+            "calls": self.calls, "failures": self.failures, "retries": self.retries, "rejected": self.rejected,
+            "p50_ms": percentile_ms(0.5), "p95_ms": percentile_ms(0.95), "p99_ms": percentile_ms(0.99),
+        }
+
+
+_breakers = {}
+_stats = {}
+_registry_lock = threading.Lock()
+_stats_lock = threading.Lock()
+
+
+def breaker(name: str) -> CircuitBreaker:
+    """The process-wide breaker of an endpoint."""
+    with _registry_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+def stats(name: str) -> EndpointStats:
+    with _registry_lock:
+        if name not in _stats:
+            _stats[name] = EndpointStats()
+        return _stats[name]
+
+def observe(name: str, seconds: float, ok: bool):
+    """Count one attempt on `name` and feed its outcome to the breaker."""
+    s = stats(name)
+    with _stats_lock:
+        s.calls += 1
+        s.failures += not ok
+        s.latencies.append(seconds)
+    if ok:
+        breaker(name).success()
+    else:
+        breaker(name).failure()
+    instrument.record(f"http_{name}", seconds)
+
+def endpoint_metrics() -> dict:
+    """Per endpoint: calls, failures, retries, rejected (circuit open), latency percentiles, breaker state."""
+    with _registry_lock:
+        names = sorted(set(_stats) | set(_breakers))
+    return {name: {**stats(name).summary(), "circuit": breaker(name).state} for name in names}
+
+def retry_delays(retries: int):
+    """Full-jitter exponential backoff: one sleep per retry."""
+    for attempt in range(retries):
+        yield random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt))
+
+def next_retry(name: str, delays) -> float | None:
+    """The next backoff of `delays` (from `retry_delays`), counted as a retry of `name`; None once out of retries."""
+    delay = next(delays, None)
+    if delay is not None:
+        s = stats(name)
+        with _stats_lock:
+            s.retries += 1
+    return delay
+
+
+class HttpClient:
+    """One pooled keep-alive session for the script threads of every session."""
+
+    def __init__(self, pool_size: int = POOL_SIZE):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, endpoint: str, method: str, url: str, **kwargs) -> requests.Response:
+        """Call `url` with `endpoint`'s timeouts, retries and breaker; raises for HTTP errors."""
+        config = ENDPOINTS[endpoint]
+        kwargs.setdefault("timeout", (config.connect_timeout, config.read_timeout))
+        delays = retry_delays(config.retries)
+        while True:
+            breaker(endpoint).allow()
+            start = time.perf_counter()
+            response = error = None
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            finally:
+                # every way out is an outcome, errors that aren't retried too (a bad URL, a broken
+                # chunked body, a redirect loop): a half-open breaker's trial call always ends
+                transient = response is None or response.status_code in RETRY_STATUSES
+                observe(endpoint, time.perf_counter() - start, ok=not transient)
+            if transient and self._wait_retry(endpoint, delays):
+                if response is not None:
+                    response.close()
+                continue
+            if error is not None:
+                raise error
+            response.raise_for_status()
+            return response
+
+    def _wait_retry(self, endpoint: str, delays) -> bool:
+        delay = next_retry(endpoint, delays)
+        if delay is None:
+            return False
+        time.sleep(delay)
+        return True
+
+    def get(self, endpoint: str, url: str, **kwargs) -> requests.Response:
+        return self.request(endpoint, "GET", url, **kwargs)
+
+    def post(self, endpoint: str, url: str, **kwargs) -> requests.Response:
+        return self.request(endpoint, "POST", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
@@ -0,0 +1,204 @@
+"""Per-stage wall time, rows and peak allocation of the hot path, exported as JSON or Prometheus text.
+
+Off unless INSTRUMENT is set (or `enable()` is called): a disabled `stage()`
+returns a shared no-op context and a disabled `@timed` function costs one
+flag check. Peak allocation needs tracemalloc, which slows every allocation
+in the process, so it is a separate switch (INSTRUMENT_MEMORY).
+"""
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+INSTRUMENT = os.getenv("INSTRUMENT", "").lower() in ("1", "true", "yes")
+INSTRUMENT_MEMORY = os.getenv("INSTRUMENT_MEMORY", "").lower() in ("1", "true", "yes")
+# recent spans kept for the debug panel
+RECENT_SPANS = 200
+METRIC_PREFIX = "homefinder_stage"
+
+_enabled = False
+_memory = False
+_stats = {}  # stage -> {"calls", "seconds", "max_seconds", "rows", "peak_bytes"}
+_recent = deque(maxlen=RECENT_SPANS)
+_lock = threading.Lock()
+_local = threading.local()
+_noop = nullcontext()
+
+
+def enable(memory: bool = False):
+    global _enabled, _memory
+    _enabled = True
+    _memory = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+def disable():
+    global _enabled, _memory
+    _enabled = _memory = False
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+def enabled() -> bool:
+    return _enabled
+
+def reset():
+    with _lock:
+        _stats.clear()
+        _recent.clear()
+
+
+def record(name: str, seconds: float, rows: int | None = None, peak_bytes: int | None = None):
+    """Add one finished span; for stages timed elsewhere (e.g. on the job manager's loop)."""
+    if not _enabled:
+        return
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "rows": 0, "peak_bytes": None}
+        stats["calls"] += 1
+        stats["seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        if rows is not None:
+            stats["rows"] += rows
+        if peak_bytes is not None:
+            stats["peak_bytes"] = max(stats["peak_bytes"] or 0, peak_bytes)
+        _recent.append({
+            "stage": name, "at": time.time(), "seconds": seconds, "rows": rows, "peak_bytes": peak_bytes,
+            "thread": threading.current_thread().name,
+        })
+
+
+class Span:
+    """One running stage; set `rows` once known."""
+
+    __slots__ = ("name", "rows", "start", "base", "max_traced")
+
+    def __init__(self, name: str, rows: int | None):
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        if _memory and tracemalloc.is_tracing():
+            # the enclosing span keeps the peak reached so far; the counter restarts for this one
+            stack = _span_stack()
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].max_traced = max(stack[-1].max_traced, peak)
+            tracemalloc.reset_peak()
+            self.base = self.max_traced = current
+            stack.append(self)
+        else:
+            self.base = None
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        peak_bytes = None
+        if self.base is not None:
+            stack = _span_stack()
+            if stack and stack[-1] is self:
+                stack.pop()
+            self.max_traced = max(self.max_traced, tracemalloc.get_traced_memory()[1])
+            peak_bytes = self.max_traced - self.base
+            if stack:
+                stack[-1].max_traced = max(stack[-1].max_traced, self.max_traced)
+        record(self.name, seconds, self.rows, peak_bytes)
+        return False
+
+def _span_stack() -> list:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+def stage(name: str, rows: int | None = None):
+    """Context manager timing a block as stage `name`.
+
+    Peak allocation is per thread's span nesting but tracemalloc counts the
+    whole process, so concurrent sessions inflate each other's peaks.
+    """
+    return Span(name, rows) if _enabled else _noop
+
+def timed(name: str | None = None):
+    """Decorator: time every call as a stage; rows = len() of the first argument, when it has one."""
+    def decorate(fn):
+        stage_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            rows = len(args[0]) if args and hasattr(args[0], "__len__") else None
+            with Span(stage_name, rows):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def snapshot() -> dict:
+    """Totals per stage plus the most recent spans, JSON-serializable."""
+    with _lock:
+        return {
+            "enabled": _enabled,
+            "memory": _memory,
+            "stages": {name: dict(stats) for name, stats in _stats.items()},
+            "recent": list(_recent),
+        }
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def prometheus_text() -> str:
+    """Stage totals in the Prometheus text exposition format."""
+    stages = snapshot()["stages"]
+    metrics = [
+        ("calls_total", "counter", "Finished spans.", "calls"),
+        ("seconds_total", "counter", "Wall time spent in the stage.", "seconds"),
+        ("seconds_max", "gauge", "Slowest span.", "max_seconds"),
+        ("rows_total", "counter", "Rows processed.", "rows"),
+        ("peak_bytes", "gauge", "Largest peak allocation of one span (tracemalloc).", "peak_bytes"),
+    ]
+    lines = []
+    for suffix, kind, help_text, key in metrics:
+        lines.append(f"# HELP {METRIC_PREFIX}_{suffix} {help_text}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_{suffix} {kind}")
+        for name, stats in sorted(stages.items()):
+            if stats[key] is not None:
+                lines.append(f'{METRIC_PREFIX}_{suffix}{{stage="{_label(name)}"}} {stats[key]}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") == "/metrics":
+            body, content_type = prometheus_text().encode(), "text/plain; version=0.0.4"
+        elif self.path.rstrip("/") == "/metrics.json":
+            body, content_type = json.dumps(snapshot()).encode(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def serve_metrics(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics (Prometheus) and /metrics.json from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+if INSTRUMENT:
+    enable(memory=INSTRUMENT_MEMORY)
@@ -0,0 +1,376 @@
+"""Scrape runs watched on one shared asyncio loop, so no Streamlit script thread waits on them."""
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+
+import httpx
+
+from utils.apify_stream import APIFY_API, PAGE_SIZE, TERMINAL_STATUSES
+from utils.tiles import RESULT_CAP, TILE_CONCURRENCY, scrape_tiles
+from utils import instrument
+from utils.http_client import ENDPOINTS, RETRY_STATUSES, CircuitOpenError, breaker, next_retry, observe, retry_delays
+
+
+POLL_START_SECONDS = 2
+POLL_MAX_SECONDS = 30
+POLL_BACKOFF = 1.5
+MAX_CONNECTIONS = 100
+# the actor n8n's "Start Apify Run" node starts; tiled searches start it per tile
+APIFY_ACTOR = os.getenv("APIFY_ACTOR", "mido_99~zillow-scraper")
+# finished jobs nobody picked up (closed tabs) are dropped after this long
+FINISHED_JOB_TTL_SECONDS = 60 * 60
+
+
+@dataclass
+class Job:
+    """One watched run. `done` is set once `homes` or `error` is filled in.
+
+    Every session attached to the run is in `sessions`; the job is dropped
+    when the last one forgets it. A job with `on_page` streams its dataset
+    instead: `pages` holds what `on_page` returned for each page read so
+    far, and `homes` stays None.
+    """
+    run_data: dict
+    session_id: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "QUEUED"
+    homes: list[dict] | None = None
+    error: str | None = None
+    polls: int = 0
+    submitted: float = field(default_factory=time.time)
+    finished: float | None = None
+    done: threading.Event = field(default_factory=threading.Event)
+    sessions: set[str] = field(default_factory=set)
+    on_page: Callable[[list[dict]], object] | None = None
+    pages: list = field(default_factory=list)
+
+
+def run_key(run_data: dict) -> str | None:
+    """What identifies the run of `run_data`: sessions submitting the same key share one job."""
+    if run_data.get("run_id"):
+        return f"run:{run_data['run_id']}"
+    if run_data.get("tiled") and run_data.get("search_url"):
+        return f"tiles:{run_data['search_url']}"
+    return None
+
+
+class JobManager:
+    """Owns an event loop thread and one pooled `httpx.AsyncClient` for every session.
+
+    With an Apify token, runs are polled directly with jittered exponential
+    backoff and their dataset is fetched once they succeed. Without one, the
+    n8n analysis webhook is awaited instead - still off the script thread.
+    A job whose `run_data` has `tiled` set starts its own runs instead: one
+    per map tile of `search_url` (see `utils.tiles`). A job submitted with
+    `on_page` reads its run's dataset a page at a time while the run goes
+    on; the loop only does the I/O, each page is handed to `on_page` on
+    `page_executor`.
+
+    Submitting a run that is already watched (same `run_key`) attaches the
+    session to that job instead of watching the run twice.
+    """
+
+    def __init__(
+        self,
+        analysis_url: str | None = None,
+        token: str | None = None,
+        apify_api: str = APIFY_API,
+        poll_start: float = POLL_START_SECONDS,
+        poll_max: float = POLL_MAX_SECONDS,
+        max_connections: int = MAX_CONNECTIONS,
+        actor: str = APIFY_ACTOR,
+        tile_cap: int = RESULT_CAP,
+        tile_concurrency: int = TILE_CONCURRENCY,
+        page_executor: Executor | None = None,
+        page_size: int = PAGE_SIZE,
+    ):
+        self.analysis_url = analysis_url
+        self.token = token or os.getenv("APIFY_TOKEN")
+        self.apify_api = apify_api
+        self.poll_start = poll_start
+        self.poll_max = poll_max
+        self.actor = actor
+        self.tile_cap = tile_cap
+        self.tile_concurrency = tile_concurrency
+        # None: the loop's default executor
+        self.page_executor = page_executor
+        self.page_size = page_size
+        self.jobs = {}
+        self._runs = {}
+        self._lock = threading.Lock()
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="job-manager", daemon=True)
+        self.thread.start()
+        self.client = self._run(self._make_client(max_connections))
+
+    async def _make_client(self, max_connections: int) -> httpx.AsyncClient:
+        # created on the loop that will use it
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        # waiting on a semaphore is cheap; thousands of requests queued inside the pool are not
+        self._slots = asyncio.Semaphore(max_connections)
+        return httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(30))
+
+    async def _request(self, endpoint: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """Like `HttpClient.request`: `endpoint`'s timeouts, retries and (shared) breaker."""
+        config = ENDPOINTS[endpoint]
+        kwargs.setdefault("timeout", httpx.Timeout(config.read_timeout, connect=config.connect_timeout))
+        delays = retry_delays(config.retries)
+        while True:
+            breaker(endpoint).allow()
+            start = time.perf_counter()
+            response = error = None
+            cancelled = False
+            try:
+                async with self._slots:
+                    response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                error = e
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+            finally:
+                if cancelled:
+                    # says nothing about the endpoint, but a half-open trial call still has to end
+                    breaker(endpoint).release()
+                else:
+                    # as in `HttpClient.request`: any other error is a failed attempt too
+                    transient = response is None or response.status_code in RETRY_STATUSES
+                    observe(endpoint, time.perf_counter() - start, ok=not transient)
+            delay = next_retry(endpoint, delays) if transient else None
+            if delay is not None:
+                await asyncio.sleep(delay)
+                continue
+            if error is not None:
+                raise error
+            response.raise_for_status()
+            return response
+
+    def _run(self, coro):
+        """Run `coro` on the manager's loop and wait for its result (setup/teardown only)."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def submit(self, run_data: dict, session_id: str, on_page: Callable[[list[dict]], object] | None = None) -> Job:
+        key = run_key(run_data)
+        with self._lock:
+            self._prune()
+            job = self.jobs.get(self._runs.get(key))
+            # a failed job is watched afresh, as a new submission would be
+            if job is not None and not job.error:
+                job.sessions.add(session_id)
+                return job
+            job = Job(run_data, session_id, sessions={session_id}, on_page=on_page)
+            self.jobs[job.id] = job
+            if key:
+                self._runs[key] = job.id
+        asyncio.run_coroutine_threadsafe(self._watch(job), self.loop)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self.jobs.get(job_id)
+
+    def forget(self, job_id: str, session_id: str | None = None):
+        """Detach `session_id` from the job (every session if None); drop it once none is left."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            if session_id is None:
+                job.sessions.clear()
+            else:
+                job.sessions.discard(session_id)
+            if not job.sessions:
+                self._drop(job)
+
+    def _drop(self, job: Job):
+        del self.jobs[job.id]
+        key = run_key(job.run_data)
+        if self._runs.get(key) == job.id:
+            del self._runs[key]
+
+    def _prune(self):
+        cutoff = time.time() - FINISHED_JOB_TTL_SECONDS
+        for job in [j for j in self.jobs.values() if j.finished and j.finished < cutoff]:
+            self._drop(job)
+
+    def close(self):
+        self._run(self.client.aclose())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    async def _watch(self, job: Job):
+        try:
+            if job.on_page is not None and job.run_data.get("dataset_id"):
+                await self._stream_pages(job)
+            elif self.token and job.run_data.get("tiled"):
+                job.homes = await self._scrape_tiled(job)
+            elif self.token and job.run_data.get("run_id") and job.run_data.get("dataset_id"):
+                await self._poll_run(job)
+                instrument.record("apify_wait", time.time() - job.submitted)
+                job.homes = await self._fetch_items(job)
+            else:
+                job.homes = await self._ask_n8n(job)
+            job.status = "DONE"
+        except Exception as e:
+            job.status = "ERROR"
+            job.error = str(e)
+        finally:
+            job.finished = time.time()
+            job.done.set()
+
+    async def _poll_run(self, job: Job):
+        delay = self.poll_start
+        url = f"{self.apify_api}/actor-runs/{job.run_data['run_id']}"
+        while True:
+            response = await self._request("apify_poll", "GET", url, params={"token": self.token})
+            job.status = response.json()["data"]["status"]
+            job.polls += 1
+
+            if job.status in TERMINAL_STATUSES:
+                if job.status != "SUCCEEDED":
+                    raise RuntimeError(f"Unable to fetch data. The actor run was interrupted with status '{job.status}'.")
+                return
+
+            # jitter keeps many sessions started together from polling in lockstep
+            await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+            delay = min(delay * POLL_BACKOFF, self.poll_max)
+
+    async def _stream_pages(self, job: Job):
+        """Read the dataset while the run goes on, handing every page to `job.on_page` in order.
+
+        Short pages are re-read with the same backoff as `_poll_run` until
+        the run is over. Stops early once no session follows the job.
+        """
+        run_id, delay, offset = job.run_data.get("run_id"), self.poll_start, 0
+        loop = asyncio.get_running_loop()
+        while job.sessions:
+            # status first: anything pushed before a finished status is in the page read after it
+            status = "SUCCEEDED"
+            if run_id:
+                response = await self._request(
+                    "apify_poll", "GET", f"{self.apify_api}/actor-runs/{run_id}", params={"token": self.token}
+                )
+                status = job.status = response.json()["data"]["status"]
+                job.polls += 1
+
+            start = time.perf_counter()
+            response = await self._request(
+                "apify_items",
+                "GET",
+                f"{self.apify_api}/datasets/{job.run_data['dataset_id']}/items",
+                params={"token": self.token, "offset": offset, "limit": self.page_size, "format": "jsonl", "clean": "true"},
+            )
+            decoding = time.perf_counter()
+            page = [json.loads(line) for line in response.text.splitlines() if line]
+            instrument.record("apify_fetch", decoding - start, rows=len(page))
+            instrument.record("json_decode", time.perf_counter() - decoding, rows=len(page))
+
+            if page:
+                offset += len(page)
+                job.pages.append(await loop.run_in_executor(self.page_executor, job.on_page, page))
+                if len(page) == self.page_size:
+                    continue
+
+            if status in TERMINAL_STATUSES:
+                if status != "SUCCEEDED":
+                    raise RuntimeError(f"Unable to fetch data. The actor run was interrupted with status '{status}'.")
+                return
+
+            await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+            delay = min(delay * POLL_BACKOFF, self.poll_max)
+
+    async def _fetch_items(self, job: Job) -> list[dict]:
+        start = time.perf_counter()
+        response = await self._request(
+            "apify_items",
+            "GET",
+            f"{self.apify_api}/datasets/{job.run_data['dataset_id']}/items",
+            params={"token": self.token, "clean": "true", "format": "json"},
+        )
+        decoding = time.perf_counter()
+        items = response.json()
+        # decoding holds the loop thread, so it is timed apart from the download
+        instrument.record("apify_fetch", decoding - start, rows=len(items))
+        instrument.record("json_decode", time.perf_counter() - decoding, rows=len(items))
+        return items
+
+    async def _ask_n8n(self, job: Job) -> list[dict]:
+        # n8n's own Wait/Poll Run loop answers only when the run is over
+        response = await self._request(
+            "n8n_analysis",
+            "POST",
+            self.analysis_url,
+            json={"run_data": job.run_data, "session_id": job.session_id},
+        )
+
+        decoding = time.perf_counter()
+        data = response.json()[0]
+        instrument.record("json_decode", time.perf_counter() - decoding, rows=len(data.get("homes") or []))
+        if data.get("error"):
+            raise RuntimeError(data["error"]["message"])
+        return data.get("homes") or []
+
+    async def _start_run(self, search_url: str, property_status: str, max_items: int) -> dict:
+        # same input as n8n's "Start Apify Run" node
+        response = await self._request(
+            "apify_run",
+            "POST",
+            f"{self.apify_api}/acts/{self.actor}/runs",
+            params={"token": self.token, "memory": 512},
+            json={
+                "concurrency": 5,
+                "max_retries": 5,
+                "max_items": max_items,
+                "property_status": property_status,
+                "proxyConfiguration": {"useApifyProxy": True, "apifyProxyGroups": ["RESIDENTIAL"]},
+                "search_url": search_url,
+            },
+        )
+        data = response.json()["data"]
+        return {"run_id": data["id"], "dataset_id": data["defaultDatasetId"]}
+
+    async def _abort_run(self, job: Job):
+        """Abort `job`'s Apify run, best effort: it is being given up on either way."""
+        try:
+            await self._request(
+                "apify_abort", "POST", f"{self.apify_api}/actor-runs/{job.run_data['run_id']}/abort",
+                params={"token": self.token},
+            )
+        except (httpx.HTTPError, CircuitOpenError):
+            pass
+
+    async def _scrape_tiled(self, job: Job) -> list[dict]:
+        property_status = job.run_data.get("property_status") or "for_sale"
+
+        async def run_tile(url: str) -> list[dict]:
+            tile_job = Job(await self._start_run(url, property_status, self.tile_cap), job.session_id)
+            try:
+                await self._poll_run(tile_job)
+            except (Exception, asyncio.CancelledError):
+                # this tile failed or another one did: stop paying for a run nobody will read
+                if tile_job.status not in TERMINAL_STATUSES:
+                    await self._abort_run(tile_job)
+                raise
+            finally:
+                job.polls += tile_job.polls
+            return await self._fetch_items(tile_job)
+
+        finished = 0
+
+        def on_tile(tile, result):
+            nonlocal finished
+            finished += 1
+            job.status = f"TILES {finished}/{len(result.tiles)}"
+
+        result = await scrape_tiles(
+            job.run_data["search_url"], run_tile, cap=self.tile_cap, concurrency=self.tile_concurrency, on_tile=on_tile
+        )
+        job.run_data["tiles"] = len(result.tiles)
+        job.run_data["capped_tiles"] = result.capped
+        return result.homes
@@ -0,0 +1,41 @@
+"""Modules imported on first use, so a page only pays for the libraries it actually touches."""
+import importlib
+import threading
+
+
+class LazyModule:
+    """Stand-in for module `name` that imports it on first attribute access.
+
+    A plain proxy rather than `importlib.util.LazyLoader`: nothing is put in
+    `sys.modules` until the real import, so code that walks every loaded
+    module (`inspect.getmodule`, Streamlit's script checks) can't set the
+    imports off by accident. The import itself is the regular, locked one, so
+    the pre-warm thread and a script thread can race for it safely.
+    """
+
+    def __init__(self, name: str):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = self.__dict__["_module"] = importlib.import_module(self._name)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+def lazy_module(name: str) -> LazyModule:
+    return LazyModule(name)
+
+def warm(names: list[str]) -> threading.Thread:
+    """Import `names` on a daemon thread, e.g. while the user is still typing."""
+    def run():
+        for name in names:
+            importlib.import_module(name)
+
+    thread = threading.Thread(target=run, name="prewarm", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,250 @@
+"""Listings of every run merged by zpid, so re-scraped homes are only re-normalized when they changed."""
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from utils.homes_frame import HomesFrame, COLUMNS, INTERNED_COLUMNS, _float_column, _plain_values
+from utils.normalize import normalize_frame
+from utils.instrument import stage
+
+
+# whichever bound is hit first; the bytes are `approx_nbytes` of the rows as they came in
+LISTING_STORE_MAX = int(os.getenv("LISTING_STORE_MAX", 500_000))
+LISTING_STORE_MAX_BYTES = int(os.getenv("LISTING_STORE_MAX_BYTES", 128 * 1024 * 1024))
+# below this share of zpids seen before, a run is a new search: normalized, not stored
+LISTING_STORE_MIN_SEEN = float(os.getenv("LISTING_STORE_MIN_SEEN", 0.5))
+# price changes kept per listing
+HISTORY_LENGTH = 20
+
+_empty = {}
+
+
+def fingerprint(h: dict) -> tuple[int | None, object]:
+    """(cheap hash of the fields that change between runs, days on Zillow) of a raw item.
+
+    Hashed: prices, zestimate, beds/baths/area, broker and photo. A zpid's
+    address and coordinates are taken as fixed, and `daysOnZillow` is left
+    out since it ticks up daily for every listing - it's refreshed on each
+    merge instead. The hash is None if the fields can't be read, and uses
+    `hash()`, so fingerprints only compare within one process.
+    """
+    try:
+        get = h.get
+        hd = get("hdpData", _empty).get("homeInfo", _empty)
+        hd_get = hd.get
+        return hash((
+            get("unformattedPrice"), get("price"), hd_get("price"), get("zestimate"), hd_get("zestimate"),
+            get("beds"), hd_get("bedrooms"), get("baths"), hd_get("bathrooms"), get("area"), hd_get("livingArea"),
+            get("brokerName"), get("imgSrc"),
+        )), hd_get("daysOnZillow")
+    except (TypeError, AttributeError):
+        return None, None
+
+def listing_key(h: dict, fp: int | None) -> object:
+    """Store key of a raw item: its zpid, else (address, fingerprint), else None (not stored).
+
+    Without a zpid, a listing re-scraped unchanged finds its row again,
+    and a changed one is a new row, left for eviction to age out.
+    """
+    zpid = h.get("zpid")
+    if zpid is not None:
+        return zpid
+    if fp is None:
+        return None
+    address = h.get("address")
+    return (address, fp) if isinstance(address, str) else (None, fp)
+
+def approx_nbytes(frame: HomesFrame, sample: int = 1_000) -> int:
+    """`HomesFrame.nbytes` estimated from a sample of each text column; interned columns count only their pointers."""
+    total = 0
+    for name, col in frame.columns.items():
+        total += col.nbytes
+        if col.dtype == object and name not in INTERNED_COLUMNS and len(col):
+            step = max(1, len(col) // sample)
+            total += sum(map(sys.getsizeof, col[::step].tolist())) * len(col) // len(col[::step])
+    return total
+
+
+@dataclass
+class MergeResult:
+    """One run merged into the store: its homes (in run order) and what changed."""
+    frame: HomesFrame
+    new: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    skipped: int = 0
+    # {"zpid", "price_before", "price_after", "days_before", "days_after"} per changed listing
+    deltas: list[dict] = field(default_factory=list)
+
+
+class ListingStore:
+    """Normalized listings of all runs, one row per zpid, with a fingerprint of each raw item.
+
+    `merge()` normalizes only new listings and listings whose fingerprint
+    changed; for the rest it reuses the stored row (updating its days on
+    Zillow). A run with fewer than `min_seen` of its zpids seen before is a
+    new search, which is only normalized: it's stored from its next run
+    on. Listings without a zpid are keyed by `listing_key`. Past
+    `max_listings` rows or `max_bytes`, the least recently seen rows are
+    dropped.
+    """
+
+    def __init__(self, max_listings: int = LISTING_STORE_MAX, max_bytes: int = LISTING_STORE_MAX_BYTES,
+                 min_seen: float = LISTING_STORE_MIN_SEEN):
+        self.max_listings = max_listings
+        self.max_bytes = max_bytes
+        self.min_seen = min_seen
+        self.nbytes = 0
+        self._frame = HomesFrame.from_records([])
+        self._keys = np.empty(0, dtype=object)
+        self._fingerprints = np.empty(0, dtype=object)
+        self._last_seen = np.empty(0, dtype=np.float64)
+        self.rows = {}  # listing key -> row
+        self._sighted = set()  # zpids of new searches, not stored yet
+        self.history = {}  # zpid -> [(time, price, days_listed)], one entry per price change
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._frame)
+
+    def merge(self, items: list[dict]) -> MergeResult:
+        with self._lock, stage("merge_listings", rows=len(items)):
+            return self._merge(items, time.time())
+
+    def _merge(self, items: list[dict], now: float) -> MergeResult:
+        result = MergeResult(frame=self._frame)
+        run_rows = np.empty(len(items), dtype=np.intp)
+        kept = np.ones(len(items), dtype=bool)
+
+        keys = [h.get("zpid") if isinstance(h, dict) else None for h in items]
+        found = list(map(self.rows.get, keys))
+        seen = len(found) - found.count(None) + sum(map(self._sighted.__contains__, keys))
+        if not items or seen < self.min_seen * len(items):
+            # a new search: normalized as is, only its zpids are noted so that its next run is stored
+            if len(self._sighted) > self.max_listings:
+                self._sighted.clear()
+            self._sighted.update(keys)
+            frame, skipped = normalize_frame(items)
+            return MergeResult(frame=frame, new=len(frame), skipped=len(skipped))
+        self._sighted.difference_update(keys)
+
+        prints = [fingerprint(h) if isinstance(h, dict) else (None, None) for h in items]
+        for i in [i for i, zpid in enumerate(keys) if zpid is None]:
+            if isinstance(items[i], dict):
+                keys[i] = listing_key(items[i], prints[i][0])
+                found[i] = self.rows.get(keys[i])
+        fps = np.empty(len(items), dtype=object)
+        fps[:] = [fp for fp, _ in prints]
+        rows = np.array([-1 if row is None else row for row in found], dtype=np.intp)
+        hit = np.flatnonzero(rows >= 0)
+        hit = hit[(self._fingerprints[rows[hit]] == fps[hit]) & np.not_equal(fps[hit], None)]
+        run_rows[hit] = seen_rows = rows[hit]
+        seen_days = [prints[i][1] for i in hit.tolist()]
+        fresh_mask = np.ones(len(items), dtype=bool)
+        fresh_mask[hit] = False
+        pending = np.flatnonzero(fresh_mask).tolist()
+        pending_keys, pending_prints = [keys[i] for i in pending], fps[pending].tolist()
+        result.unchanged = len(seen_rows)
+
+        if len(seen_rows):
+            days = _float_column(seen_days)
+            known = ~np.isnan(days)
+            self._frame.columns["days_listed"][seen_rows[known]] = days[known]
+
+        fresh, skipped = normalize_frame([items[i] for i in pending])
+        if skipped:
+            # `fresh` has a row per pending item that wasn't skipped, in order
+            kept[[pending[j] for j in skipped]] = False
+            skipped = set(skipped)
+            pending, pending_keys, pending_prints = (
+                [v for j, v in enumerate(values) if j not in skipped] for values in (pending, pending_keys, pending_prints)
+            )
+        result.skipped = len(skipped)
+
+        found = list(map(self.rows.get, pending_keys))
+        changed_pos = [j for j, row in enumerate(found) if row is not None]
+        changed_rows = [found[j] for j in changed_pos]
+        # neither a zpid nor a fingerprint: nothing to find it by next run, so it isn't stored
+        loose_pos = [j for j, key in enumerate(pending_keys) if key is None]
+        new_pos = [j for j, (row, key) in enumerate(zip(found, pending_keys)) if row is None and key is not None]
+        pending = np.array(pending, dtype=np.intp)
+        run_rows[pending[changed_pos]] = changed_rows
+        run_rows[pending[loose_pos]] = -1
+        result.new = len(new_pos)
+        result.changed = len(changed_rows)
+
+        if changed_rows:
+            rows = np.array(changed_rows, dtype=np.intp)
+            changed = fresh.take(changed_pos)
+            result.deltas = self._record_changes(rows, changed, now)
+            for column in COLUMNS:
+                self._frame.columns[column][rows] = changed[column]
+            self._fingerprints[rows] = [pending_prints[j] for j in changed_pos]
+
+        if new_pos:
+            start = len(self._frame)
+            added = fresh if len(new_pos) == len(fresh) else fresh.take(new_pos)
+            self._frame = HomesFrame.concat([self._frame, added])
+            self.nbytes += approx_nbytes(added)
+            keys, prints = np.empty(len(new_pos), dtype=object), np.empty(len(new_pos), dtype=object)
+            keys[:] = [pending_keys[j] for j in new_pos]
+            prints[:] = [pending_prints[j] for j in new_pos]
+            self._keys = np.concatenate([self._keys, keys])
+            self._fingerprints = np.concatenate([self._fingerprints, prints])
+            self._last_seen = np.concatenate([self._last_seen, np.full(len(new_pos), now)])
+            run_rows[pending[new_pos]] = np.arange(start, start + len(new_pos))
+            self.rows.update(zip(keys.tolist(), range(start, start + len(new_pos))))
+
+        run_rows = run_rows[kept]
+        in_store = run_rows >= 0
+        self._last_seen[run_rows[in_store]] = now
+        if len(pending) == len(run_rows):
+            # every row was normalized just now, in run order
+            result.frame = fresh
+        elif loose_pos:
+            # stored rows and unstored ones, back in run order
+            parts = HomesFrame.concat([self._frame.take(run_rows[in_store]), fresh.take(loose_pos)])
+            result.frame = parts.take(np.argsort(np.concatenate([np.flatnonzero(in_store), np.flatnonzero(~in_store)])))
+        else:
+            # a copy: later merges update the store's columns in place
+            result.frame = self._frame.take(run_rows)
+
+        if len(self._frame) > self.max_listings or self.nbytes > self.max_bytes:
+            self._evict()
+        return result
+
+    def _record_changes(self, rows: np.ndarray, fresh: HomesFrame, now: float) -> list[dict]:
+        """Deltas between the stored rows and their new values; price changes go in `history`."""
+        days_before = _plain_values(self._frame["days_listed"][rows])
+        days_after = _plain_values(fresh["days_listed"])
+        deltas = []
+        for zpid, price_before, price_after, before, after in zip(
+            fresh["zpid"], self._frame["price"][rows].tolist(), fresh["price"].tolist(), days_before, days_after
+        ):
+            deltas.append({
+                "zpid": zpid,
+                "price_before": price_before, "price_after": price_after,
+                "days_before": before, "days_after": after,
+            })
+            if price_before != price_after:
+                entries = self.history.setdefault(zpid, [(None, price_before, before)])
+                entries.append((now, price_after, after))
+                del entries[:-HISTORY_LENGTH]
+        return deltas
+
+    def _evict(self):
+        """Keep the most recently seen rows, as many as fit both `max_listings` and `max_bytes`."""
+        per_row = self.nbytes / len(self._frame)
+        limit = min(self.max_listings, int(self.max_bytes / per_row) if per_row else self.max_listings)
+        keep = np.sort(np.argsort(-self._last_seen, kind="stable")[:limit])
+        self.nbytes = round(per_row * keep.size)
+        self._frame = self._frame.take(keep)
+        self._keys = self._keys[keep]
+        self._fingerprints = self._fingerprints[keep]
+        self._last_seen = self._last_seen[keep]
+        self.rows = {key: row for row, key in enumerate(self._keys.tolist())}
+        self.history = {zpid: h for zpid, h in self.history.items() if zpid in self.rows}
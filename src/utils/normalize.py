@@ -0,0 +1,143 @@
+"""Normalization of raw Zillow scraper items, to dicts or straight to columns.
+
+Kept free of Streamlit so pool workers import only what they need.
+"""
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.homes_frame import HomesFrame, COLUMNS
+from utils.instrument import timed
+from utils.prices import parse_price, parse_prices
+
+
+# below this many items, handing chunks to workers costs more than it saves
+PARALLEL_MIN_ITEMS = 20_000
+CHUNK_SIZE = 5_000
+# "serial" | "thread". No process pool: pickling the items out to workers
+# (and the homes back) costs the parent more than normalizing them itself.
+# Threads only run in parallel on a free-threaded Python build.
+NORMALIZE_MODE = os.getenv("NORMALIZE_MODE") or "serial"
+
+_pools = {}
+_empty = {}
+PRICE = COLUMNS.index("price")
+
+
+def safe_price(h, hd):
+    """Price of one item: `unformattedPrice`, else its formatted price parsed (0 if unparseable)."""
+    if h.get("unformattedPrice") is not None:
+        return int(h["unformattedPrice"])
+    return parse_price(h.get("price") or hd.get("price"))[0]
+
+def _extract(items: list[dict]) -> tuple[list[tuple], list[int], list[int], list]:
+    """(rows, skipped, unpriced, formatted): each item's fields as a tuple in `COLUMNS` order.
+
+    `skipped` are the positions in `items` of items that couldn't be read.
+    Rows without `unformattedPrice` have price 0; `unpriced` lists them and
+    `formatted` holds their formatted prices, to parse in one go.
+    """
+    rows = []
+    append = rows.append
+    skipped = []
+    unpriced, formatted = [], []
+
+    for i, h in enumerate(items):
+        try:
+            get = h.get
+            hd = get("hdpData", _empty).get("homeInfo", _empty)
+            hd_get = hd.get
+            lat_long = get("latLong", _empty)
+            price = get("unformattedPrice")
+
+            append((
+                get("zpid"), get("detailUrl"), get("address"),
+                get("addressCity"), get("addressState"), get("addressZipcode"),
+                int(price) if price is not None else 0,
+                get("beds") or hd_get("bedrooms"),
+                get("baths") or hd_get("bathrooms"),
+                get("area") or hd_get("livingArea"),
+                lat_long.get("latitude"), lat_long.get("longitude"),
+                get("imgSrc"),
+                get("zestimate") or hd_get("zestimate"),
+                get("brokerName") or hd_get("listing_sub_type"),
+                hd_get("daysOnZillow"),
+            ))
+            if price is None:
+                unpriced.append(len(rows) - 1)
+                formatted.append(get("price") or hd_get("price"))
+        except Exception:
+            skipped.append(i)
+
+    return rows, skipped, unpriced, formatted
+
+def _parse_formatted(formatted: list, failures: Counter | None) -> list[int]:
+    prices, reasons = parse_prices(formatted)
+    if failures is not None:
+        failures.update(reason for reason in reasons.tolist() if reason is not None)
+    return prices.tolist()
+
+def normalize_batch(items: list[dict], failures: Counter | None = None) -> tuple[list[dict], int]:
+    """Extract consistent fields from Zillow scraper results, returning (normalized, skipped).
+
+    Formatted prices (items without `unformattedPrice`) are parsed together
+    after the loop; `failures` gets a count per reason for those that gave 0.
+    Callers that end up with a `HomesFrame` should use `normalize_frame`,
+    which skips the dicts.
+    """
+    rows, skipped, unpriced, formatted = _extract(items)
+    normalized = [dict(zip(COLUMNS, row)) for row in rows]
+    if unpriced:
+        for row, price in zip(unpriced, _parse_formatted(formatted, failures)):
+            normalized[row]["price"] = price
+    return normalized, len(skipped)
+
+def normalize_frame(items: list[dict], failures: Counter | None = None) -> tuple[HomesFrame, list[int]]:
+    """`normalize_batch` straight to columns: (homes, positions in `items` of the skipped ones).
+
+    The rows are transposed into the frame's columns, so no per-home dict
+    is built at all.
+    """
+    rows, skipped, unpriced, formatted = _extract(items)
+    columns = list(zip(*rows)) or [() for _ in COLUMNS]
+    if unpriced:
+        price_column = list(columns[PRICE])
+        for row, price in zip(unpriced, _parse_formatted(formatted, failures)):
+            price_column[row] = price
+        columns[PRICE] = price_column
+
+    return HomesFrame.from_columns(dict(zip(COLUMNS, columns))), skipped
+
+def _get_pool(workers: int | None):
+    """One long-lived pool per worker count, shared by every session of the process."""
+    if workers not in _pools:
+        _pools[workers] = ThreadPoolExecutor(workers, thread_name_prefix="normalize")
+    return _pools[workers]
+
+@timed()
+def normalize_parallel(
+    items: list[dict],
+    mode: str = NORMALIZE_MODE,
+    workers: int | None = None,
+    chunk_size: int = CHUNK_SIZE,
+    min_items: int = PARALLEL_MIN_ITEMS,
+    failures: Counter | None = None,
+) -> tuple[HomesFrame, list[int]]:
+    """`normalize_frame` over chunks of `items` on a thread pool, in input order."""
+    if mode not in ("thread", "serial"):
+        raise ValueError(f"Unknown normalize mode: {mode!r}")
+    if mode == "serial" or len(items) < max(min_items, 2 * chunk_size):
+        return normalize_frame(items, failures)
+
+    starts = range(0, len(items), chunk_size)
+    chunk_failures = [Counter() for _ in starts]
+    # map() yields results in submission order, so output order is deterministic
+    results = list(_get_pool(workers).map(
+        lambda start, counter: normalize_frame(items[start:start + chunk_size], counter), starts, chunk_failures,
+    ))
+
+    if failures is not None:
+        for counter in chunk_failures:
+            failures.update(counter)
+    skipped = [start + i for start, (_, positions) in zip(starts, results) for i in positions]
+    return HomesFrame.concat([frame for frame, _ in results]), skipped
@@ -0,0 +1,147 @@
+"""Zillow price strings ("$450,000", "$1.2M", "$1.2 Million", "$2,500/mo", "From $300K") to whole dollars, a column at a time."""
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable
+
+import numpy as np
+import pandas as pd
+
+
+# the first number of the string, with its multiplier if it has one (K, M, B or the word)
+PRICE_PATTERN = re.compile(r"(\d[\d,]*(?:\.\d+)?)(?:\s*(thousand|million|mil|billion|bn|[kmb])\b)?", re.IGNORECASE)
+MULTIPLIERS = {
+    "k": 1_000, "m": 1_000_000, "b": 1_000_000_000,
+    "thousand": 1_000, "million": 1_000_000, "mil": 1_000_000, "billion": 1_000_000_000, "bn": 1_000_000_000,
+}
+# whole dollars must fit the int64 column
+DOLLARS_LIMIT = 2 ** 63
+# distinct formatted prices remembered across batches (most listings repeat a round figure)
+PRICE_MEMO_SIZE = int(os.getenv("PRICE_MEMO_SIZE") or 50_000)
+
+# why a price came out as 0
+MISSING = "missing"      # None or blank
+NO_NUMBER = "no_number"  # text without digits, e.g. "Contact agent"
+NOT_TEXT = "not_text"    # neither a string nor a number
+OUT_OF_RANGE = "out_of_range"  # infinite, or too large for int64
+
+
+class PriceMemo:
+    """LRU of parsed price strings -> (dollars, failure reason or None), shared by every batch of the process."""
+
+    def __init__(self, max_size: int = PRICE_MEMO_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_many(self, texts: list[str]) -> list[tuple[int, str | None] | None]:
+        """Remembered result of each text, None for the ones not seen (or evicted)."""
+        with self._lock:
+            found = []
+            for text in texts:
+                entry = self._entries.get(text)
+                if entry is not None:
+                    self._entries.move_to_end(text)
+                found.append(entry)
+            return found
+
+    def put_many(self, texts: list[str], results: list[tuple[int, str | None]]):
+        with self._lock:
+            self._entries.update(zip(texts, results))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+_memo = PriceMemo()
+_UNHASHABLE = object()
+
+
+def _dollars(value) -> tuple[int, str | None]:
+    """(rounded dollars, failure reason or None) of a number that isn't NaN."""
+    if isinstance(value, (float, np.floating)) and not math.isfinite(value):
+        return 0, OUT_OF_RANGE
+    dollars = round(value)
+    return (dollars, None) if -DOLLARS_LIMIT <= dollars < DOLLARS_LIMIT else (0, OUT_OF_RANGE)
+
+def _parse_text(text: str) -> tuple[int, str | None]:
+    """(dollars, failure reason or None) of one price string."""
+    found = PRICE_PATTERN.search(text)
+    if found is None:
+        return 0, MISSING if not text.strip() else NO_NUMBER
+    number, suffix = found.groups()
+    # a few hundred digits read as inf, caught by `_dollars`
+    return _dollars(float(number.replace(",", "")) * (MULTIPLIERS[suffix.lower()] if suffix else 1))
+
+def _parse_texts(texts: list[str]) -> list[tuple[int, str | None]]:
+    """Parse distinct strings: (dollars, failure reason or None) each.
+
+    A plain loop: `Series.str.extract` runs the regex per element in Python
+    as well, with pandas overhead on top.
+    """
+    return [_parse_text(text) for text in texts]
+
+def _parse_one(value) -> tuple[int, str | None]:
+    """(dollars, failure reason or None) of one raw value that isn't a string."""
+    if value is None:
+        return 0, MISSING
+    if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool):
+        # NaN is the only value unequal to itself
+        return (0, MISSING) if value != value else _dollars(value)
+    return 0, NOT_TEXT
+
+def parse_price(raw, memo: PriceMemo | None = _memo) -> tuple[int, str | None]:
+    """`parse_prices` of a single value, without building any arrays."""
+    if not isinstance(raw, str):
+        return _parse_one(raw)
+    entry = memo.get_many([raw])[0] if memo is not None else None
+    if entry is None:
+        entry = _parse_text(raw)
+        if memo is not None:
+            memo.put_many([raw], [entry])
+    return entry
+
+def parse_prices(raw, memo: PriceMemo | None = _memo) -> tuple[np.ndarray, np.ndarray]:
+    """Whole dollars (int64, 0 where unparseable) and failure reason (None when parsed) of each raw price.
+
+    Numbers pass through; strings count the first number in them with its
+    K/M/B (or thousand/million/billion) multiplier, so "From $300K" and
+    "$300K - $350K" give 300000, "$1.2Million" 1200000 and "$2,500/mo" the
+    monthly 2500. Infinite values and ones past int64 fail as `OUT_OF_RANGE`. The column is factorized first, so
+    each distinct string is parsed once, and only if `memo` hasn't seen it.
+    """
+    try:
+        codes, uniques = pd.factorize(pd.Series(raw, dtype=object))
+    except TypeError:
+        # a dict or list where a price should be: one shared stand-in for all of them
+        raw = [value if isinstance(value, Hashable) else _UNHASHABLE for value in raw]
+        codes, uniques = pd.factorize(pd.Series(raw, dtype=object))
+    # one more slot for the code -1 of None / NaN
+    results = [None] * len(uniques) + [(0, MISSING)]
+
+    texts = []
+    for i, value in enumerate(uniques):
+        if isinstance(value, str):
+            texts.append(i)
+        else:
+            results[i] = _parse_one(value)
+
+    if texts:
+        strings = [uniques[i] for i in texts]
+        known = memo.get_many(strings) if memo is not None else [None] * len(strings)
+        misses = [j for j, entry in enumerate(known) if entry is None]
+        if misses:
+            parsed = _parse_texts([strings[j] for j in misses])
+            for j, entry in zip(misses, parsed):
+                known[j] = entry
+            if memo is not None:
+                memo.put_many([strings[j] for j in misses], parsed)
+        for i, entry in zip(texts, known):
+            results[i] = entry
+
+    dollars = np.array([dollars for dollars, _ in results], dtype=np.int64)
+    reasons = np.array([reason for _, reason in results], dtype=object)
+    return dollars[codes], reasons[codes]
@@ -0,0 +1,164 @@
+"""Filters over a HomesFrame: sorted indexes for ranges, value indexes for equality, combined by intersection."""
+import numpy as np
+import pandas as pd
+
+from utils.homes_frame import HomesFrame, py_number
+
+
+# numeric keys filtered by range, through a sorted index
+RANGE_KEYS = ("price", "sqft", "price_per_sqft", "days_listed")
+# keys filtered by value, through a `value_index`
+VALUE_KEYS = ("city", "state", "zip", "beds", "baths")
+# a bitmap costs n/8 bytes per distinct value, a row list 4 bytes per row: past 32 values, row lists are smaller
+BITMAP_MAX_VALUES = 32
+
+
+class SortedIndex:
+    """The rows having a value for one key, in value order: a range is two binary searches."""
+
+    def __init__(self, values: np.ndarray, present: np.ndarray):
+        rows = np.flatnonzero(present)
+        order = np.argsort(values[rows], kind="stable")
+        self.rows = rows[order].astype(np.int32)
+        self.values = np.asarray(values[rows][order], dtype=np.float64)
+
+    def __len__(self):
+        return self.rows.size
+
+    def nbytes(self) -> int:
+        return self.rows.nbytes + self.values.nbytes
+
+    def bounds(self) -> tuple[float, float] | None:
+        """(min, max) value, None if no row has one."""
+        return (float(self.values[0]), float(self.values[-1])) if self.rows.size else None
+
+    def range(self, lo: float | None = None, hi: float | None = None) -> np.ndarray:
+        """Rows with lo <= value <= hi (None = unbounded), in value order."""
+        start = 0 if lo is None else np.searchsorted(self.values, lo, side="left")
+        end = self.rows.size if hi is None else np.searchsorted(self.values, hi, side="right")
+        return self.rows[start:end]
+
+
+class ValueIndex:
+    """The rows of each distinct value of a key (sorted `values`, `counts` rows each), as packed bitmaps on demand."""
+
+    def __init__(self, size: int, rows: np.ndarray, codes: np.ndarray, uniques):
+        self.size = size
+        self.values = [py_number(v) if isinstance(v, (float, np.floating)) else v for v in uniques]
+        self.counts = np.bincount(codes, minlength=len(uniques))
+
+    def _positions(self, values) -> list[int]:
+        positions = {v: i for i, v in enumerate(self.values)}
+        return [positions[v] for v in values if v in positions]
+
+    def between(self, lo=None, hi=None) -> np.ndarray:
+        """Bitmap of the rows whose value is within [lo, hi] (None = unbounded), e.g. beds >= 3."""
+        return self.any_of([v for v in self.values if (lo is None or v >= lo) and (hi is None or v <= hi)])
+
+
+class BitmapIndex(ValueIndex):
+    """One packed bitmap (a bit per frame row) per distinct value of a key."""
+
+    def __init__(self, size: int, rows: np.ndarray, codes: np.ndarray, uniques):
+        super().__init__(size, rows, codes, uniques)
+        self.bitmaps = np.zeros((len(uniques), (size + 7) // 8), dtype=np.uint8)
+        # every row's bit set in one go, instead of one pass over the rows per value
+        np.bitwise_or.at(self.bitmaps, (codes, rows >> 3), (0x80 >> (rows & 7)).astype(np.uint8))
+
+    def nbytes(self) -> int:
+        return self.bitmaps.nbytes + self.counts.nbytes
+
+    def any_of(self, values) -> np.ndarray:
+        """Bitmap of the rows having any of `values`."""
+        picked = self._positions(values)
+        if not picked:
+            return np.zeros(self.bitmaps.shape[1], dtype=np.uint8)
+        return np.bitwise_or.reduce(self.bitmaps[picked], axis=0)
+
+
+class RowsIndex(ValueIndex):
+    """The rows of every distinct value of a key in one array, grouped by value: 4 bytes per row."""
+
+    def __init__(self, size: int, rows: np.ndarray, codes: np.ndarray, uniques):
+        super().__init__(size, rows, codes, uniques)
+        self.rows = rows[np.argsort(codes, kind="stable")].astype(np.int32)
+        self.starts = np.concatenate([[0], np.cumsum(self.counts)])
+
+    def nbytes(self) -> int:
+        return self.rows.nbytes + self.starts.nbytes + self.counts.nbytes
+
+    def any_of(self, values) -> np.ndarray:
+        """Bitmap of the rows having any of `values`."""
+        mask = np.zeros(self.size, dtype=bool)
+        for i in self._positions(values):
+            mask[self.rows[self.starts[i]:self.starts[i + 1]]] = True
+        return np.packbits(mask)
+
+
+def value_index(values: np.ndarray, present: np.ndarray) -> ValueIndex:
+    """Equality index of one key: bitmaps up to `BITMAP_MAX_VALUES` distinct values (beds, state), row lists past it (zip, city)."""
+    rows = np.flatnonzero(present)
+    codes, uniques = pd.factorize(values[rows], sort=True)
+    kind = BitmapIndex if len(uniques) <= BITMAP_MAX_VALUES else RowsIndex
+    return kind(len(values), rows, codes, uniques)
+
+
+class QueryIndex:
+    """Indexes over one frame, built once, answering `select()` without scanning the columns.
+
+    Each filter gives a bitmap of the rows it keeps (a sorted-index range or
+    the rows of the wanted values are turned into one, or those values'
+    bitmaps are OR-ed), and the filters combine by AND-ing those bitmaps, 8
+    rows per byte.
+    """
+
+    def __init__(self, frame: HomesFrame):
+        self.size = len(frame)
+        price = frame["price"].astype(np.float64)
+        sqft = frame["sqft"].astype(np.float64)
+        has_price, has_sqft = frame.present("price"), frame.present("sqft")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            price_per_sqft = price / sqft
+        self.sorted = {
+            "price": SortedIndex(price, has_price),
+            "sqft": SortedIndex(sqft, has_sqft),
+            "price_per_sqft": SortedIndex(price_per_sqft, has_price & has_sqft),
+            "days_listed": SortedIndex(frame["days_listed"], ~np.isnan(frame["days_listed"])),
+        }
+        self.by_value = {key: value_index(frame[key], frame.present(key)) for key in VALUE_KEYS}
+
+    def __len__(self):
+        return self.size
+
+    def nbytes(self) -> int:
+        return sum(i.nbytes() for i in self.sorted.values()) + sum(i.nbytes() for i in self.by_value.values())
+
+    def _bitmap(self, rows: np.ndarray) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        mask[rows] = True
+        return np.packbits(mask)
+
+    def select(self, **filters) -> np.ndarray:
+        """Rows (ascending) passing every filter; a filter of None is ignored.
+
+        `key=(lo, hi)` keeps lo <= value <= hi (either end None = open), on a
+        `RANGE_KEYS` key or over the values of a `VALUE_KEYS` one (e.g.
+        `beds=(3, None)`); `key=[value, ...]` keeps rows having any of the
+        values of a `VALUE_KEYS` key (e.g. `city=["Cary", "Durham"]`).
+        """
+        selected = None
+        for key, wanted in filters.items():
+            if wanted is None or (isinstance(wanted, tuple) and wanted == (None, None)):
+                continue
+            if key in self.sorted:
+                bits = self._bitmap(self.sorted[key].range(*wanted))
+            elif key in self.by_value:
+                index = self.by_value[key]
+                bits = index.between(*wanted) if isinstance(wanted, tuple) else index.any_of(wanted)
+            else:
+                raise KeyError(f"No index on {key!r}; filterable keys: {', '.join(RANGE_KEYS + VALUE_KEYS)}")
+            selected = bits if selected is None else selected & bits
+
+        if selected is None:
+            return np.arange(self.size)
+        return np.flatnonzero(np.unpackbits(selected, count=self.size))
@@ -0,0 +1,93 @@
+"""On-disk cache of normalized scrape results, keyed by canonical search (SQLite)."""
+import json
+import os
+import sqlite3
+import time
+import zlib
+from contextlib import contextmanager
+
+
+CACHE_PATH = os.getenv("SCRAPE_CACHE_PATH") or os.path.join(os.path.expanduser("~"), ".cache", "homefinder", "scrapes.sqlite")
+CACHE_TTL_SECONDS = int(os.getenv("SCRAPE_CACHE_TTL", 6 * 60 * 60))
+CACHE_MAX_BYTES = int(os.getenv("SCRAPE_CACHE_MAX_BYTES", 500 * 1024 * 1024))
+
+
+class ResultCache:
+    """Normalized homes per search key, zlib-compressed JSON in one SQLite table.
+
+    Entries expire after `ttl` seconds; past `max_bytes` the least recently
+    read entries are evicted first. A connection is opened per call, so one
+    instance can be shared by every Streamlit session thread.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, ttl: int = CACHE_TTL_SECONDS, max_bytes: int = CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    url TEXT,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    payload BLOB NOT NULL
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+
+    @contextmanager
+    def _connect(self):
+        """Connection that commits on success and is always closed."""
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def __contains__(self, key: str) -> bool:
+        with self._connect() as db:
+            row = db.execute("SELECT created FROM results WHERE key = ?", (key,)).fetchone()
+        return row is not None and time.time() - row[0] <= self.ttl
+
+    def get(self, key: str) -> list[dict] | None:
+        """Cached homes for `key`, or None if missing or expired."""
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute("SELECT created, payload FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            created, payload = row
+            if now - created > self.ttl:
+                db.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+            db.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(zlib.decompress(payload))
+
+    def put(self, key: str, homes: list[dict], url: str | None = None):
+        payload = zlib.compress(json.dumps(homes, separators=(",", ":")).encode(), 6)
+        if len(payload) > self.max_bytes:
+            return
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO results (key, url, created, accessed, size, payload) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, url, now, now, len(payload), payload),
+            )
+            self._evict(db, now)
+
+    def _evict(self, db: sqlite3.Connection, now: float):
+        db.execute("DELETE FROM results WHERE created < ?", (now - self.ttl,))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # least recently read first, until back under budget
+        for key, size in db.execute("SELECT key, size FROM results ORDER BY accessed").fetchall():
+            db.execute("DELETE FROM results WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
@@ -0,0 +1,207 @@
+"""Normalized homes of past runs as Arrow IPC files, reopened memory-mapped.
+
+NumPy, pyarrow and the frame module load on the first save/load, so listing
+past runs (the sidebar of every page) only touches SQLite.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+
+from utils.lazy import lazy_module
+from utils.zillow_converter import search_key
+
+np = lazy_module("numpy")
+pa = lazy_module("pyarrow")
+homes_frame = lazy_module("utils.homes_frame")
+
+
+RUN_STORE_PATH = os.getenv("RUN_STORE_PATH") or os.path.join(os.path.expanduser("~"), ".cache", "homefinder", "runs")
+
+
+def _positions(idx, n: int) -> np.ndarray:
+    """Row positions for an int, slice, bool mask or index array."""
+    if isinstance(idx, slice):
+        return np.arange(*idx.indices(n))
+    idx = np.asarray(idx)
+    return np.flatnonzero(idx) if idx.dtype == bool else idx.astype(np.intp, copy=False)
+
+
+class ArrowText:
+    """Read-only text column over an Arrow string array.
+
+    Stands in for an object array in a `HomesFrame`: indexing returns
+    object arrays, but only the selected rows become Python strings, so
+    showing the top 5 homes of a mapped run never decodes the other rows.
+    """
+
+    def __init__(self, array: pa.Array):
+        self.array = array
+
+    def __len__(self):
+        return len(self.array)
+
+    @property
+    def dtype(self):
+        return np.dtype(object)
+
+    @property
+    def nbytes(self) -> int:
+        return self.array.nbytes
+
+    def __getitem__(self, idx):
+        if isinstance(idx, (int, np.integer)):
+            return self.array[int(idx)].as_py()
+        values = self.array.take(pa.array(_positions(idx, len(self)))).to_pylist()
+        out = np.empty(len(values), dtype=object)
+        out[:] = values
+        return out
+
+    def __array__(self, dtype=None, copy=None):
+        return self[:] if dtype is None else self[:].astype(dtype)
+
+    def astype(self, dtype):
+        if dtype is bool:
+            import pyarrow.compute as pc
+
+            # truthy like a str: present and non-empty, without decoding
+            return pc.fill_null(pc.greater(pc.utf8_length(self.array), 0), False).to_numpy(zero_copy_only=False)
+        return np.asarray(self).astype(dtype)
+
+
+def _text_array(col, dictionary: bool) -> pa.Array:
+    values = [v if v is None or type(v) is str else str(v) for v in np.asarray(col).tolist()]
+    array = pa.array(values, type=pa.string())
+    return array.dictionary_encode() if dictionary else array
+
+def frame_table(frame: homes_frame.HomesFrame) -> pa.Table:
+    """The frame as an Arrow table: numeric columns as-is, interned text dictionary-encoded."""
+    columns = {}
+    for key in homes_frame.COLUMNS:
+        if key in homes_frame.NUMERIC_COLUMNS:
+            columns[key] = pa.array(np.asarray(frame[key]))
+        else:
+            columns[key] = _text_array(frame[key], dictionary=key in homes_frame.INTERNED_COLUMNS)
+    return pa.table(columns)
+
+def _interned_column(array: pa.DictionaryArray) -> np.ndarray:
+    """Dictionary column -> object array sharing one str per distinct value (None for nulls)."""
+    import pyarrow.compute as pc
+
+    categories = np.empty(len(array.dictionary) + 1, dtype=object)
+    categories[:-1] = [sys.intern(v) for v in array.dictionary.to_pylist()]
+    categories[-1] = None
+    codes = pc.fill_null(array.indices, len(array.dictionary)).to_numpy()
+    return categories[codes]
+
+
+class RunStore:
+    """One uncompressed Arrow IPC file per run, plus a SQLite index by run id and search.
+
+    `load()` maps the file instead of reading it: numeric columns are NumPy
+    views straight onto the mapped pages (read-only), and the OS shares those
+    pages between every worker process that opens the same run. Text columns
+    stay Arrow arrays (`ArrowText`), except the few-valued interned ones.
+    """
+
+    def __init__(self, root: str = RUN_STORE_PATH):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    search_key TEXT,
+                    url TEXT,
+                    rows INTEGER NOT NULL,
+                    created REAL NOT NULL
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS runs_search ON runs (search_key, created)")
+
+    @contextmanager
+    def _connect(self):
+        """Connection that commits on success and is always closed."""
+        db = sqlite3.connect(os.path.join(self.root, "runs.sqlite"), timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _path(self, run_id: str) -> str:
+        if not run_id or os.sep in run_id or run_id.startswith("."):
+            raise ValueError(f"Invalid run id: {run_id!r}")
+        return os.path.join(self.root, f"{run_id}.arrow")
+
+    def __contains__(self, run_id: str) -> bool:
+        return os.path.exists(self._path(run_id))
+
+    def save(self, run_id: str, frame: homes_frame.HomesFrame, url: str | None = None):
+        table = frame_table(frame)
+
+        # written aside and renamed, so a reader never maps a half-written file
+        tmp = f"{self._path(run_id)}.{os.getpid()}.tmp"
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, self._path(run_id))
+
+        try:
+            key = search_key(url) if url else None
+        except ValueError:
+            key = None
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO runs (run_id, search_key, url, rows, created) VALUES (?, ?, ?, ?, ?)",
+                (run_id, key, url, len(frame), time.time()),
+            )
+
+    def load(self, run_id: str) -> homes_frame.HomesFrame | None:
+        """The run's homes, memory-mapped, or None if it isn't stored."""
+        if run_id not in self:
+            return None
+        table = pa.ipc.open_file(pa.memory_map(self._path(run_id), "r")).read_all()
+
+        columns = {}
+        for key in homes_frame.COLUMNS:
+            chunked = table.column(key)
+            # one chunk as written; combining would copy it out of the map
+            array = chunked.chunk(0) if chunked.num_chunks == 1 else chunked.combine_chunks()
+            if key in homes_frame.NUMERIC_COLUMNS:
+                # NaN marks missing values, so the buffers have no nulls and convert without a copy
+                columns[key] = array.to_numpy(zero_copy_only=True)
+            elif key in homes_frame.INTERNED_COLUMNS:
+                columns[key] = _interned_column(array)
+            else:
+                columns[key] = ArrowText(array)
+        return homes_frame.HomesFrame(columns)
+
+    def latest(self, url: str) -> str | None:
+        """Id of the most recent stored run of this search."""
+        try:
+            key = search_key(url)
+        except ValueError:
+            return None
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT run_id FROM runs WHERE search_key = ? ORDER BY created DESC LIMIT 1", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def runs(self, limit: int = 20) -> list[dict]:
+        """Most recent stored runs first."""
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT run_id, url, rows, created FROM runs ORDER BY created DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [{"run_id": r[0], "url": r[1], "rows": r[2], "created": r[3]} for r in rows if r[0] in self]
+
+    def delete(self, run_id: str):
+        if run_id in self:
+            os.remove(self._path(run_id))
+        with self._connect() as db:
+            db.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
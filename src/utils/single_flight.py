@@ -0,0 +1,189 @@
+"""Single-flight searches: one run per canonical search at a time, shared by every session that confirms it.
+
+The first session to confirm a search claims it and starts the run; later
+sessions confirming the same search (by `search_key`) wait for that run to
+be started and attach to it instead of starting their own. Claims live in
+this process, and with a `path` also in a SQLite table, so worker processes
+on one host share them too.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+
+# e.g. ~/.cache/homefinder/flights.sqlite; unset = coalesce within this process only
+FLIGHTS_PATH = os.getenv("SEARCH_FLIGHTS_PATH")
+# a claimed search must have its run started within this long, or the claim is taken over
+CLAIM_TIMEOUT_SECONDS = 90
+# a started run is joined for at most this long (longer runs are left to the result cache)
+FLIGHT_TTL_SECONDS = 60 * 60
+POLL_SECONDS = 0.5
+
+
+@dataclass
+class Flight:
+    key: str
+    run_data: dict | None = None
+    claimed: float = field(default_factory=time.time)
+    started: threading.Event = field(default_factory=threading.Event)
+
+    def expired(self, now: float) -> bool:
+        if self.run_data is None:
+            return now - self.claimed > CLAIM_TIMEOUT_SECONDS
+        return now - self.claimed > FLIGHT_TTL_SECONDS
+
+
+class SearchFlights:
+    """In-flight runs by search key.
+
+    `join(key)` returns the `run_data` to attach to, or None when the caller
+    now holds the claim: it must then call `started()` with the run it
+    started, or `abandon()` if it didn't start one. `poll(key, since)` is
+    the same without waiting, for callers that check back later (e.g. a
+    Streamlit fragment while `pending(key)`). `finish()` ends the
+    flight once the run is over, so the next confirmation starts afresh
+    (or is served from the result cache).
+    """
+
+    def __init__(self, path: str | None = FLIGHTS_PATH):
+        self.path = path
+        self._flights = {}
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with self._connect() as db:
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute("""
+                    CREATE TABLE IF NOT EXISTS flights (
+                        key TEXT PRIMARY KEY,
+                        run_data TEXT,
+                        claimed REAL NOT NULL
+                    )
+                """)
+
+    @contextmanager
+    def _connect(self):
+        """Connection that commits on success and is always closed."""
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def join(self, key: str, timeout: float = CLAIM_TIMEOUT_SECONDS) -> dict | None:
+        """`poll` until it settles, waiting for another session's claimed run to start."""
+        since = time.time()
+        while True:
+            settled, run_data = self.poll(key, since, timeout)
+            if settled:
+                return run_data
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.started.wait(min(POLL_SECONDS, max(since + timeout - time.time(), 0)))
+            else:
+                time.sleep(POLL_SECONDS)
+
+    def poll(self, key: str, since: float, timeout: float = CLAIM_TIMEOUT_SECONDS) -> tuple[bool, dict | None]:
+        """One `join` attempt that never waits, by a caller waiting since `since`: (settled, run_data).
+
+        Unsettled while another session holds the claim and hasn't started
+        its run yet, for up to `timeout` after `since`; then the claim is
+        taken over.
+        """
+        deadline = since + timeout
+        with self._lock:
+            now = time.time()
+            flight = self._flights.get(key)
+            if flight is not None and flight.expired(now):
+                del self._flights[key]
+                flight = None
+            if flight is not None and flight.run_data is not None:
+                return True, flight.run_data
+            if flight is None:
+                claimed, run_data = self._claim_shared(key, now, force=now >= deadline)
+                if run_data is not None:
+                    return True, run_data
+                if claimed:
+                    self._flights[key] = Flight(key)
+                    return True, None
+            elif now >= deadline:
+                # the claimer never reported back; take the search over
+                self._flights[key] = Flight(key)
+                self._claim_shared(key, now, force=True)
+                return True, None
+        return False, None
+
+    def pending(self, key: str) -> bool:
+        """Whether `key` is claimed by a session that hasn't started its run yet (`poll` would not settle)."""
+        now = time.time()
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and not flight.expired(now):
+                return flight.run_data is None
+        if not self.path:
+            return False
+        with self._connect() as db:
+            row = db.execute("SELECT run_data, claimed FROM flights WHERE key = ?", (key,)).fetchone()
+        return row is not None and row[0] is None and row[1] >= now - CLAIM_TIMEOUT_SECONDS
+
+    def _claim_shared(self, key: str, now: float, force: bool = False) -> tuple[bool, dict | None]:
+        """(claimed, run_data of another process's started run) from the shared table."""
+        if not self.path:
+            return True, None
+        with self._connect() as db:
+            db.execute(
+                "DELETE FROM flights WHERE key = ? AND (claimed < ? OR (run_data IS NULL AND claimed < ?) OR ?)",
+                (key, now - FLIGHT_TTL_SECONDS, now - CLAIM_TIMEOUT_SECONDS, force),
+            )
+            if db.execute("INSERT OR IGNORE INTO flights (key, claimed) VALUES (?, ?)", (key, now)).rowcount:
+                return True, None
+            row = db.execute("SELECT run_data FROM flights WHERE key = ?", (key,)).fetchone()
+        return False, json.loads(row[0]) if row and row[0] else None
+
+    def started(self, key: str, run_data: dict):
+        """Publish the run the claimer started; waiting sessions attach to it."""
+        with self._lock:
+            flight = self._flights.setdefault(key, Flight(key))
+            flight.run_data = run_data
+            flight.started.set()
+        if self.path:
+            with self._connect() as db:
+                db.execute(
+                    "INSERT OR REPLACE INTO flights (key, run_data, claimed) VALUES (?, ?, ?)",
+                    (key, json.dumps(run_data), flight.claimed),
+                )
+
+    def abandon(self, key: str):
+        """Drop a claim that didn't start a run; the next session to confirm the search claims it.
+
+        A no-op once the run was started, so it is safe on every error path.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None or flight.run_data is not None:
+                return
+            del self._flights[key]
+        flight.started.set()
+        if self.path:
+            with self._connect() as db:
+                db.execute("DELETE FROM flights WHERE key = ? AND run_data IS NULL", (key,))
+
+    def finish(self, key: str):
+        """End the flight of a run that is over."""
+        with self._lock:
+            flight = self._flights.pop(key, None)
+        if flight is not None:
+            # wake anyone still waiting; they find no flight and claim it themselves
+            flight.started.set()
+        if self.path:
+            with self._connect() as db:
+                db.execute("DELETE FROM flights WHERE key = ?", (key,))
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return sum(f.run_data is not None for f in self._flights.values())
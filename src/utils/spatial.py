@@ -0,0 +1,168 @@
+"""Grid index over listing coordinates: bounding-box, radius and nearest-neighbour queries."""
+import numpy as np
+import pandas as pd
+
+from utils.homes_frame import HomesFrame
+
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE = EARTH_RADIUS_MILES * np.pi / 180  # along a meridian, ~69.1
+# cells per indexed home; finer cells mean fewer exact distance checks per query
+CELLS_PER_HOME = 4
+# heatmap cell size, ~3.5 miles north-south
+HEATMAP_CELL_DEGREES = 0.05
+
+
+def haversine_miles(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Great-circle distance in miles, broadcasting over arrays."""
+    lat1, lng1, lat2, lng2 = (np.radians(v) for v in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GridIndex:
+    """Homes bucketed into a uniform lat/lng grid, stored cell by cell.
+
+    Points are sorted by cell id (row-major), with `starts[c]` the position
+    of cell c's first point, so the cells of one grid row that overlap a
+    query are one contiguous slice. Homes without coordinates aren't indexed.
+    Query results are row indices into the frame the index was built from.
+    """
+
+    def __init__(self, lat, lng, cell_degrees: float | None = None):
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        rows = np.flatnonzero(np.isfinite(lat) & np.isfinite(lng))
+        lat, lng = lat[rows], lng[rows]
+
+        if rows.size:
+            self.lat0, self.lng0 = float(lat.min()), float(lng.min())
+            lat_span, lng_span = float(lat.max()) - self.lat0, float(lng.max()) - self.lng0
+        else:
+            self.lat0 = self.lng0 = lat_span = lng_span = 0.0
+        if cell_degrees is None:
+            area = max(lat_span, 1e-6) * max(lng_span, 1e-6)
+            cell_degrees = np.sqrt(area / (CELLS_PER_HOME * max(rows.size, 1)))
+        self.cell_degrees = float(cell_degrees)
+        self.n_lat = int(lat_span / self.cell_degrees) + 1
+        self.n_lng = int(lng_span / self.cell_degrees) + 1
+
+        cells = self._lat_cell(lat) * self.n_lng + self._lng_cell(lng)
+        order = np.argsort(cells, kind="stable")
+        self.rows = rows[order]
+        self.lat = lat[order]
+        self.lng = lng[order]
+        self.starts = np.searchsorted(cells[order], np.arange(self.n_lat * self.n_lng + 1))
+
+    @classmethod
+    def from_frame(cls, frame: HomesFrame, cell_degrees: float | None = None) -> "GridIndex":
+        return cls(frame["lat"], frame["lng"], cell_degrees)
+
+    def __len__(self):
+        return self.rows.size
+
+    def nbytes(self) -> int:
+        return self.rows.nbytes + self.lat.nbytes + self.lng.nbytes + self.starts.nbytes
+
+    def _cell(self, value: float, origin: float, n: int) -> int:
+        return min(max(int((value - origin) / self.cell_degrees), 0), n - 1)
+
+    def _lat_cell(self, lat):
+        return np.clip(((np.asarray(lat) - self.lat0) / self.cell_degrees).astype(np.int64), 0, self.n_lat - 1)
+
+    def _lng_cell(self, lng):
+        return np.clip(((np.asarray(lng) - self.lng0) / self.cell_degrees).astype(np.int64), 0, self.n_lng - 1)
+
+    def _candidates(self, south: float, west: float, north: float, east: float) -> np.ndarray:
+        """Positions (into the sorted points) of every point in a cell overlapping the box."""
+        if not len(self) or north < south or east < west:
+            return np.empty(0, dtype=np.intp)
+        lat_end = self.lat0 + self.n_lat * self.cell_degrees
+        lng_end = self.lng0 + self.n_lng * self.cell_degrees
+        if north < self.lat0 or south > lat_end or east < self.lng0 or west > lng_end:
+            return np.empty(0, dtype=np.intp)
+
+        r0, r1 = self._cell(south, self.lat0, self.n_lat), self._cell(north, self.lat0, self.n_lat)
+        c0, c1 = self._cell(west, self.lng0, self.n_lng), self._cell(east, self.lng0, self.n_lng)
+        # one [first, last) slice per grid row, expanded into positions without a python loop
+        first_cells = np.arange(r0, r1 + 1) * self.n_lng + c0
+        first = self.starts[first_cells]
+        lengths = self.starts[first_cells + (c1 - c0 + 1)] - first
+        offsets = np.cumsum(lengths) - lengths
+        return np.repeat(first - offsets, lengths) + np.arange(lengths.sum())
+
+    def bbox(self, south: float, west: float, north: float, east: float) -> np.ndarray:
+        """Rows inside the box (edges included), in frame order."""
+        pos = self._candidates(south, west, north, east)
+        lat, lng = self.lat[pos], self.lng[pos]
+        inside = (lat >= south) & (lat <= north) & (lng >= west) & (lng <= east)
+        return np.sort(self.rows[pos[inside]])
+
+    def map_bounds(self, bounds: dict) -> np.ndarray:
+        """Rows inside a Zillow `mapBounds` dict ({"west", "east", "south", "north"})."""
+        return self.bbox(bounds["south"], bounds["west"], bounds["north"], bounds["east"])
+
+    def _box_around(self, lat: float, lng: float, miles: float) -> tuple[float, float, float, float]:
+        dlat = miles / MILES_PER_DEGREE
+        dlng = dlat / max(np.cos(np.radians(lat)), 1e-6)
+        return lat - dlat, lng - dlng, lat + dlat, lng + dlng
+
+    def radius(self, lat: float, lng: float, miles: float) -> tuple[np.ndarray, np.ndarray]:
+        """(rows, distances in miles) of homes within `miles` of the point, nearest first."""
+        pos = self._candidates(*self._box_around(lat, lng, miles))
+        dist = haversine_miles(lat, lng, self.lat[pos], self.lng[pos])
+        within = dist <= miles
+        pos, dist = pos[within], dist[within]
+        order = np.argsort(dist, kind="stable")
+        return self.rows[pos[order]], dist[order]
+
+    def nearest(self, lat: float, lng: float, k: int = 5) -> tuple[np.ndarray, np.ndarray]:
+        """(rows, distances in miles) of the `k` homes closest to the point, nearest first."""
+        k = min(k, len(self))
+        if k <= 0:
+            return np.empty(0, dtype=self.rows.dtype), np.empty(0)
+
+        # grow the search box until it holds k homes, all closer than the box's inscribed circle
+        miles = self.cell_degrees * MILES_PER_DEGREE
+        while True:
+            box = self._box_around(lat, lng, miles)
+            pos = self._candidates(*box)
+            # (k <= len(self), so a box covering the whole grid always has enough candidates)
+            covers_all = (
+                box[0] <= self.lat0 and box[1] <= self.lng0
+                and box[2] >= self.lat0 + self.n_lat * self.cell_degrees
+                and box[3] >= self.lng0 + self.n_lng * self.cell_degrees
+            )
+            if pos.size >= k:
+                dist = haversine_miles(lat, lng, self.lat[pos], self.lng[pos])
+                kth = np.partition(dist, k - 1)[k - 1]
+                if kth <= miles or covers_all:
+                    break
+            miles *= 2
+
+        order = np.argsort(dist, kind="stable")[:k]
+        return self.rows[pos[order]], dist[order]
+
+    def cell_medians(self, values, cell_degrees: float = HEATMAP_CELL_DEGREES) -> list[dict]:
+        """Count & median of `values` (one per frame row, NaN = missing) per heatmap cell, e.g. a price map.
+
+        Cells are `cell_degrees` squares (the role geohash prefixes play);
+        `lat`/`lng` of each result is the cell's center.
+        """
+        values = np.asarray(values, dtype=np.float64)[self.rows]
+        has_value = ~np.isnan(values)
+        lat_cell = np.floor(self.lat[has_value] / cell_degrees).astype(np.int64)
+        lng_cell = np.floor(self.lng[has_value] / cell_degrees).astype(np.int64)
+        if not lat_cell.size:
+            return []
+
+        grouped = pd.Series(values[has_value]).groupby([lat_cell, lng_cell]).agg(["count", "median"])
+        return [
+            {
+                "lat": (la + 0.5) * cell_degrees,
+                "lng": (ln + 0.5) * cell_degrees,
+                "count": int(count),
+                "median": float(median),
+            }
+            for (la, ln), count, median in zip(grouped.index, grouped["count"], grouped["median"])
+        ]
@@ -0,0 +1,130 @@
+"""Split a map-bound Zillow search into a quadtree of tiles, each small enough to come back whole."""
+import asyncio
+import copy
+import os
+import urllib.parse
+from dataclasses import dataclass, field
+
+from utils.zillow_converter import search_state_from_url, url_from_data
+
+
+# a search returns at most this many homes; a tile that hits it is split in four
+RESULT_CAP = int(os.getenv("ZILLOW_RESULT_CAP", 500))
+TILE_CONCURRENCY = int(os.getenv("TILE_CONCURRENCY", 8))
+# 4**6 = 4096 tiles at most below one search
+MAX_TILE_DEPTH = 6
+
+
+@dataclass
+class Tile:
+    bounds: dict  # {"west", "east", "south", "north"}
+    depth: int
+    url: str
+    items: int = 0
+    split: bool = False
+
+
+@dataclass
+class TiledResult:
+    """Homes of every tile, one per zpid, plus the tiles that were scraped."""
+    homes: list[dict] = field(default_factory=list)
+    tiles: list[Tile] = field(default_factory=list)
+    duplicates: int = 0
+    # tiles still at the cap at `max_depth`: their area may be missing homes
+    capped: int = 0
+
+
+def quadrants(bounds: dict) -> list[dict]:
+    """The four quarters of a `mapBounds` box: SW, SE, NW, NE."""
+    mid_lat = (bounds["south"] + bounds["north"]) / 2
+    mid_lng = (bounds["west"] + bounds["east"]) / 2
+    return [
+        {"west": w, "east": e, "south": s, "north": n}
+        for s, n in ((bounds["south"], mid_lat), (mid_lat, bounds["north"]))
+        for w, e in ((bounds["west"], mid_lng), (mid_lng, bounds["east"]))
+    ]
+
+def tile_url(url: str, bounds: dict, depth: int = 0) -> str:
+    """`url`'s search restricted to `bounds`, zoomed in one level per split."""
+    state = copy.deepcopy(search_state_from_url(url))
+    state["mapBounds"] = dict(bounds)
+    state["pagination"] = {}
+    if depth and isinstance(state.get("mapZoom"), int):
+        state["mapZoom"] += depth
+    parsed = urllib.parse.urlparse(url)
+    return url_from_data(state, base_url=f"{parsed.scheme}://{parsed.netloc}{parsed.path}")
+
+def is_tileable(url: str) -> bool:
+    """True if the search has `mapBounds` to split."""
+    try:
+        bounds = search_state_from_url(url).get("mapBounds") or {}
+    except (ValueError, AttributeError):
+        return False
+    return all(isinstance(bounds.get(k), (int, float)) for k in ("west", "east", "south", "north"))
+
+def property_status(url: str) -> str:
+    """The actor's `property_status` for a search URL's path (/sold/, /rentals/, else for sale)."""
+    path = urllib.parse.urlparse(url).path.lower()
+    if "sold" in path:
+        return "sold"
+    if "rent" in path:
+        return "for_rent"
+    return "for_sale"
+
+
+async def scrape_tiles(
+    url: str,
+    run_tile,
+    cap: int = RESULT_CAP,
+    concurrency: int = TILE_CONCURRENCY,
+    max_depth: int = MAX_TILE_DEPTH,
+    on_tile=None,
+) -> TiledResult:
+    """Scrape `url` as a quadtree of tiles, at most `concurrency` at a time.
+
+    `run_tile(tile_url)` is awaited per tile and returns its raw items. A
+    tile that returns `cap` or more is split into quadrants, scraped in turn;
+    its own items are kept too, since they are real homes of the area.
+    Homes are deduplicated by zpid (first one wins; items without a zpid are
+    all kept). `on_tile(tile, result)` is called after each tile finishes.
+    The first tile to fail cancels every other one, and its error is raised.
+    """
+    result = TiledResult()
+    seen = set()
+    slots = asyncio.Semaphore(concurrency)
+
+    def add(items: list[dict]):
+        for h in items:
+            zpid = h.get("zpid") if isinstance(h, dict) else None
+            if zpid is not None:
+                if zpid in seen:
+                    result.duplicates += 1
+                    continue
+                seen.add(zpid)
+            result.homes.append(h)
+
+    async def visit(bounds: dict, depth: int, group: asyncio.TaskGroup):
+        tile = Tile(bounds, depth, tile_url(url, bounds, depth))
+        result.tiles.append(tile)
+        async with slots:
+            items = await run_tile(tile.url)
+        tile.items = len(items)
+        add(items)
+        if on_tile:
+            on_tile(tile, result)
+
+        if tile.items >= cap:
+            if depth >= max_depth:
+                result.capped += 1
+                return
+            tile.split = True
+            for quadrant in quadrants(bounds):
+                group.create_task(visit(quadrant, depth + 1, group))
+
+    try:
+        async with asyncio.TaskGroup() as group:
+            group.create_task(visit(search_state_from_url(url)["mapBounds"], 0, group))
+    except ExceptionGroup as e:
+        # tiles run in one group, so these are the tiles' own errors; the first is the cause
+        raise e.exceptions[0] from None
+    return result
@@ -0,0 +1,47 @@
+"""Top-k selection without sorting everything: heaps for lists, argpartition for columns."""
+import heapq
+
+import numpy as np
+
+
+def smallest(items, k: int, key) -> list:
+    """Same as `sorted(items, key=key)[:k]`, in O(n log k)."""
+    return heapq.nsmallest(k, items, key=key)
+
+def smallest_indices(values: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k smallest values, ordered like the first k of a stable argsort."""
+    values = np.asarray(values)
+    if k >= values.size:
+        return np.argsort(values, kind="stable")
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    kth = np.partition(values, k - 1)[k - 1]
+    below = np.flatnonzero(values < kth)
+    # equal values at the cut: the earliest rows win, as in a stable sort
+    ties = np.flatnonzero(values == kth)[: k - below.size]
+    chosen = np.concatenate([below, ties])
+    return chosen[np.lexsort((chosen, values[chosen]))]
+
+def smallest_many(items, k: int, keys: dict) -> dict[str, list]:
+    """One pass over `items` keeping a bounded heap per named key.
+
+    A key returning None leaves the item out of that ranking. Each result
+    equals `sorted(included, key=key)[:k]`.
+    """
+    heaps = {name: [] for name in keys}
+    for i, item in enumerate(items):
+        for name, key in keys.items():
+            value = key(item)
+            if value is None:
+                continue
+            # max-heap on (value, position) by negating both; positions are unique,
+            # so items themselves are never compared
+            entry = (-value, -i, item)
+            heap = heaps[name]
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+    return {name: [entry[2] for entry in sorted(heap, reverse=True)] for name, heap in heaps.items()}